@@ -0,0 +1,361 @@
+"""
+Benchmark de los parsers sobre el corpus de modales ``debug_modal_*.html``.
+
+Para cada parser mide la latencia por documento (p50/p90/p99/máx), el
+throughput, el pico de memoria por documento (tracemalloc), las colecciones
+del GC cada 1000 documentos y los bloques de memoria que quedan retenidos al
+terminar. La medición de memoria se hace en una pasada aparte para no inflar
+los tiempos.
+
+Los resultados se pueden guardar como baseline JSON y comparar entre commits:
+
+    python bench_parsers.py --save bench_baseline.json
+    python bench_parsers.py --compare bench_baseline.json
+
+``parse_nutrition_table`` trabaja sobre un locator de Playwright: se mide
+cargando cada modal con ``page.set_content`` en un Chromium headless, y se
+omite si el navegador no está instalado.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Optional
+
+import pandas as pd
+
+import parse_cache
+from clean_nutrition import parse_document, parse_table_from_html, process_csv
+from crawl_metrics import percentile
+from modal_parser import parse_modal_html
+from parse_cache import ParseCache
+from reparse import expand_inputs
+
+# Métricas donde un número más chico es mejor (el resto, más grande es mejor)
+LOWER_IS_BETTER = ["p50_ms", "p90_ms", "p99_ms", "peak_kib_max", "retained_blocks"]
+HIGHER_IS_BETTER = ["docs_per_s"]
+
+
+@dataclass
+class Target:
+    """Un parser a medir: ``run`` procesa un documento o, si ``batch``, todos."""
+
+    name: str
+    run: Callable[[Any], Any]
+    batch: bool = False
+
+
+def load_corpus(inputs: list[str], limit: Optional[int] = None) -> list[str]:
+    docs = []
+    for path in expand_inputs(inputs)[:limit]:
+        with open(path, "r", encoding="utf-8") as f:
+            docs.append(f.read())
+    return docs
+
+
+def _gc_collections() -> int:
+    return sum(gen["collections"] for gen in gc.get_stats())
+
+
+def _time_pass(target: Target, units: list[Any]) -> tuple[list[float], int]:
+    """Latencias en ms de una pasada y colecciones del GC que disparó."""
+    latencies = []
+    collections = _gc_collections()
+    for unit in units:
+        start = time.perf_counter_ns()
+        target.run(unit)
+        latencies.append((time.perf_counter_ns() - start) / 1e6)
+    return latencies, _gc_collections() - collections
+
+
+def _memory_pass(target: Target, units: list[Any]) -> tuple[list[float], int]:
+    """Pico de memoria (KiB) por unidad y bloques retenidos al final de la pasada."""
+    peaks = []
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    try:
+        for unit in units:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            target.run(unit)
+            peaks.append((tracemalloc.get_traced_memory()[1] - base) / 1024)
+    finally:
+        tracemalloc.stop()
+    return peaks, sys.getallocatedblocks() - blocks
+
+
+def bench(target: Target, docs: list[str], repeat: int = 3) -> dict[str, Any]:
+    """Mide un parser sobre ``docs`` (``repeat`` pasadas cronometradas)."""
+    units: list[Any] = [docs] if target.batch else docs
+    # Calentamiento: imports perezosos, caches de regex, etc.
+    target.run(units[0])
+
+    latencies: list[float] = []
+    collections = 0
+    for _ in range(repeat):
+        lat, gcs = _time_pass(target, units)
+        latencies += lat
+        collections += gcs
+    peaks, blocks = _memory_pass(target, units)
+
+    documents = len(docs) * repeat
+    total_s = sum(latencies) / 1000
+    return {
+        "documents": len(docs),
+        "samples": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies), 4),
+        "p50_ms": round(percentile(latencies, 50), 4),
+        "p90_ms": round(percentile(latencies, 90), 4),
+        "p99_ms": round(percentile(latencies, 99), 4),
+        "max_ms": round(max(latencies), 4),
+        "docs_per_s": round(documents / total_s, 1) if total_s else None,
+        "peak_kib_max": round(max(peaks), 1),
+        "peak_kib_mean": round(statistics.fmean(peaks), 1),
+        "gc_collections_per_1k_docs": round(collections * 1000 / documents, 2),
+        "retained_blocks": blocks,
+    }
+
+
+def _corpus_csv(docs: list[str], directory: str) -> str:
+    path = os.path.join(directory, "corpus.csv")
+    pd.DataFrame(
+        {
+            "titulo": [f"debug_modal_{i}" for i in range(len(docs))],
+            "modal_html": docs,
+        }
+    ).to_csv(path, index=False)
+    return path
+
+
+def _playwright_target() -> Optional[tuple[Target, Callable[[], None]]]:
+    """Target de ``parse_nutrition_table`` con su función de cierre, o None."""
+    try:
+        from playwright.sync_api import sync_playwright
+
+        from simple_automation import parse_nutrition_table
+
+        manager = sync_playwright()
+        playwright = manager.start()
+        try:
+            browser = playwright.chromium.launch(headless=True)
+        except Exception:
+            manager.__exit__(None, None, None)
+            raise
+    except Exception as e:
+        print(f"⚠️  parse_nutrition_table omitido (sin Chromium): {e}".splitlines()[0])
+        return None
+    page = browser.new_page()
+
+    def run(html: str) -> dict:
+        page.set_content(html)
+        return parse_nutrition_table(page.locator("body"))
+
+    def close() -> None:
+        browser.close()
+        manager.__exit__(None, None, None)
+
+    return Target("parse_nutrition_table", run), close
+
+
+def build_targets(
+    workdir: str, docs: list[str], warm_cache: ParseCache
+) -> dict[str, Target]:
+    for html in docs:
+        parse_modal_html(html, cache=warm_cache)
+    warm_cache.flush()
+    csv_path = _corpus_csv(docs, workdir)
+    out_long = os.path.join(workdir, "long.csv")
+    out_wide = os.path.join(workdir, "wide.csv")
+
+    targets = [
+        Target("parse_modal_html[lxml]", lambda h: parse_modal_html(h, "lxml")),
+        Target(
+            "parse_modal_html[html.parser]",
+            lambda h: parse_modal_html(h, "html.parser"),
+        ),
+        Target(
+            "parse_modal_html[cache]",
+            lambda h: parse_modal_html(h, cache=warm_cache),
+        ),
+        Target("parse_table_from_html", parse_table_from_html),
+        Target("parse_document", parse_document),
+        Target(
+            "process_csv",
+            lambda _: process_csv(csv_path, out_long, out_wide),
+            batch=True,
+        ),
+    ]
+    return {t.name: t for t in targets}
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], threshold: float = 0.10
+) -> list[str]:
+    """
+    Imprime la diferencia contra un baseline y devuelve las regresiones
+    (métricas que empeoraron más que ``threshold``).
+    """
+    regressions = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        print(f"\n{name}")
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            new, old = result.get(metric), base.get(metric)
+            if not new or not old:
+                continue
+            change = (new - old) / old
+            worse = (
+                change > threshold if metric in LOWER_IS_BETTER else -change > threshold
+            )
+            mark = "⚠️ " if worse else "  "
+            print(f"  {mark}{metric:<14} {old:>12} -> {new:>12} ({change:+.1%})")
+            if worse:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(
+    docs: list[str],
+    names: Optional[list[str]] = None,
+    repeat: int = 3,
+    browser: bool = True,
+) -> dict[str, Any]:
+    """Corre los targets pedidos (default: todos) y devuelve el reporte."""
+    # Se mide el parseo real: el cache compartido no tiene que intervenir,
+    # pero se deja como estaba para quien llama
+    with parse_cache.disabled():
+        return _run_benchmarks(docs, names, repeat, browser)
+
+
+def _run_benchmarks(
+    docs: list[str], names: Optional[list[str]], repeat: int, browser: bool
+) -> dict[str, Any]:
+    report: dict[str, Any] = {
+        "meta": {
+            "commit": _git_commit(),
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "documents": len(docs),
+            "repeat": repeat,
+        },
+        "results": {},
+    }
+    with tempfile.TemporaryDirectory() as workdir:
+        warm_cache = ParseCache(os.path.join(workdir, "cache.sqlite"))
+        targets = build_targets(workdir, docs, warm_cache)
+        closers = [warm_cache.close]
+        if browser and (names is None or "parse_nutrition_table" in names):
+            found = _playwright_target()
+            if found:
+                targets[found[0].name] = found[0]
+                closers.append(found[1])
+        try:
+            for name, target in targets.items():
+                if names is not None and name not in names:
+                    continue
+                result = bench(target, docs, repeat)
+                report["results"][name] = result
+                print(
+                    f"⏱️  {name:<30} p50 {result['p50_ms']:>9.3f} ms  "
+                    f"p99 {result['p99_ms']:>9.3f} ms  "
+                    f"{result['docs_per_s']:>9} docs/s  "
+                    f"pico {result['peak_kib_max']:>8} KiB"
+                )
+        finally:
+            for close in closers:
+                close()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de los parsers sobre el corpus de modales."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Archivos, globs o directorios con HTML (default: debug_modal_*.html)",
+    )
+    parser.add_argument(
+        "--targets",
+        default=None,
+        help="Parsers a medir, separados por coma (default: todos)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Pasadas cronometradas sobre el corpus"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=None, help="Usar solo los primeros N documentos"
+    )
+    parser.add_argument(
+        "--no-browser",
+        action="store_true",
+        help="No medir parse_nutrition_table (evita levantar Chromium)",
+    )
+    parser.add_argument("--save", default=None, help="Guardar el reporte como JSON")
+    parser.add_argument(
+        "--compare", default=None, help="Comparar contra un reporte JSON guardado"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="Empeoramiento relativo que cuenta como regresión (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    docs = load_corpus(args.inputs or ["debug_modal_*.html"], args.limit)
+    if not docs:
+        parser.error("No se encontraron documentos para medir")
+    names = [n.strip() for n in args.targets.split(",")] if args.targets else None
+
+    print(f"📚 {len(docs)} documentos, {args.repeat} pasadas")
+    report = run_benchmarks(docs, names, args.repeat, browser=not args.no_browser)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 Reporte guardado en {args.save}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(
+            f"\n📊 Comparación contra {args.compare} ({baseline['meta'].get('commit')})"
+        )
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regresiones: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
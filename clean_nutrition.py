@@ -4,10 +4,16 @@ import re
 import sys
 import json
 import argparse
+import numpy as np
 import pandas as pd
 from bs4 import BeautifulSoup
 from typing import Tuple, Dict, List, Optional
-from unidecode import unidecode
+
+import columnar
+import parse_cache
+from nutrient_names import canonical_name
+from nutrient_units import to_canonical
+from parse_cache import ParseCache, cached
 
 # ---------- Utilidades ----------
 
@@ -15,6 +21,27 @@ NUM_RE = re.compile(r"([\d.,]+)")
 VD_RE = re.compile(r"(\d+)\s*%")
 
 
+def detect_html_parser() -> str:
+    """Usa lxml si está disponible, sino el parser de la biblioteca estándar."""
+    try:
+        BeautifulSoup("<html></html>", "lxml")
+        return "lxml"
+    except Exception:
+        return "html.parser"
+
+
+# Se detecta una sola vez por proceso
+HTML_PARSER = detect_html_parser()
+
+# Subir cuando cambie la salida de parse_document/parse_table_from_html
+# (invalida el cache de parseo)
+PARSER_VERSION = "4"
+
+
+# Un único punto seguido de tres dígitos es de miles: "1.234" -> 1234
+THOUSANDS_RE = re.compile(r"\d{1,3}\.\d{3}")
+
+
 def norm_spaces(s: str) -> str:
     return " ".join(s.split()) if isinstance(s, str) else s
 
@@ -24,11 +51,18 @@ def get_text(el) -> str:
 
 
 def comma_to_dot(num: str) -> str:
-    """Convierte '1.234,56' -> '1234.56' y '0,8' -> '0.8' conservando enteros."""
+    """
+    Convierte '1.234,56' -> '1234.56', '0,8' -> '0.8', '1.234' -> '1234' y
+    '1.234.567' -> '1234567'. Como en los rótulos argentinos, el punto es
+    separador de miles; solo es decimal si no lo siguen exactamente tres
+    dígitos ('0.5', '12.5').
+    """
     if not isinstance(num, str):
         return num
-    # quita separadores de miles europeos y normaliza coma decimal
-    return num.replace(".", "").replace(",", ".")
+    if "," in num or num.count(".") > 1 or THOUSANDS_RE.fullmatch(num):
+        # coma decimal: los puntos son separadores de miles
+        return num.replace(".", "").replace(",", ".")
+    return num
 
 
 def safe_int(x) -> Optional[int]:
@@ -39,34 +73,10 @@ def safe_int(x) -> Optional[int]:
 
 
 def standardize_name(name: str) -> str:
-    """Normaliza rotulos: capitaliza, quita tildes opcional, y homologa variantes."""
+    """Normaliza rótulos con el índice canónico de ``nutrient_names``."""
     if not name:
         return name
-    base = norm_spaces(name.strip(" .:"))
-    # Capitalización primera letra
-    base = base[0].upper() + base[1:] if base else base
-
-    # Mapeo de equivalencias comunes
-    plain = unidecode(base.lower())
-    mapping = {
-        "valor energetico": "Valor energético",
-        "carbohidratos": "Carbohidratos",
-        "azucares": "Azúcares",
-        "proteinas": "Proteínas",
-        "grasas totales": "Grasas totales",
-        "grasas saturadas": "Grasas saturadas",
-        "grasas trans": "Grasas trans",
-        "fibra": "Fibra",
-        "sodio": "Sodio",
-    }
-    if plain in mapping:
-        return mapping[plain]
-
-    # Subnutrientes con prefijo "de los/las cuales" u otros textos
-    base = re.sub(r"(?i)^\s*de\s+los?\s+cuales:?\s*", "", base)
-    base = re.sub(r"(?i)^\s*de\s+las?\s+cuales:?\s*", "", base)
-    base = re.sub(r"(?i)^margen-subnutrientes\s*", "", base)
-    return base
+    return canonical_name(name)
 
 
 def is_noise_left_cell(text: str) -> bool:
@@ -105,26 +115,27 @@ def extract_portion_from_soup(soup: BeautifulSoup) -> Optional[str]:
     return None
 
 
-def parse_table_from_html(html: str) -> List[Dict]:
+def parse_table_from_html(html: str, cache: Optional[ParseCache] = None) -> List[Dict]:
     """Devuelve lista de dicts con Nutriente, Cantidad, Unidad, %VD."""
-    out = []
     if not isinstance(html, str) or not html.strip():
-        return out
-    # try to use lxml if available, else fallback to built-in parser
-    parser_to_use = "lxml"
-    try:
-        BeautifulSoup("<html></html>", "lxml")
-    except Exception:
-        parser_to_use = "html.parser"
-    soup = BeautifulSoup(html, parser_to_use)
+        return []
+    return cached(
+        html,
+        f"clean_nutrition.table/{HTML_PARSER}",
+        PARSER_VERSION,
+        lambda h: parse_table_from_soup(BeautifulSoup(h, HTML_PARSER)),
+        cache,
+    )
+
+
+def parse_table_from_soup(soup: BeautifulSoup) -> List[Dict]:
+    """Igual que ``parse_table_from_html`` pero sobre un documento ya parseado."""
+    out = []
+    # algunos CSV traen ya solo el <table> en columna 'tabla_nutricional';
+    # el parser lo encuentra igual sin necesidad de envolverlo
     table = soup.find("table")
     if not table:
-        # algunos CSV traen ya solo el <table> en columna 'tabla_nutricional'
-        # si no hay <table> en modal_html, intenta parsear bloque suelto
-        soup2 = BeautifulSoup(f"<div>{html}</div>", "lxml")
-        table = soup2.find("table")
-        if not table:
-            return out
+        return out
 
     for tr in table.find_all("tr"):
         tds = tr.find_all("td")
@@ -148,17 +159,16 @@ def parse_table_from_html(html: str) -> List[Dict]:
     return out
 
 
-def pick_html_source(row: pd.Series) -> Tuple[Optional[str], Optional[str]]:
+def pick_html_source(
+    modal_html: Optional[str], tabla_nutricional: Optional[str]
+) -> Tuple[Optional[str], Optional[str]]:
     """
     Devuelve (html_para_parsear, origen) priorizando modal_html, sino tabla_nutricional.
     """
-    if isinstance(row.get("modal_html"), str) and row["modal_html"].strip():
-        return row["modal_html"], "modal_html"
-    if (
-        isinstance(row.get("tabla_nutricional"), str)
-        and row["tabla_nutricional"].strip()
-    ):
-        return row["tabla_nutricional"], "tabla_nutricional"
+    if isinstance(modal_html, str) and modal_html.strip():
+        return modal_html, "modal_html"
+    if isinstance(tabla_nutricional, str) and tabla_nutricional.strip():
+        return tabla_nutricional, "tabla_nutricional"
     return None, None
 
 
@@ -170,114 +180,227 @@ def product_title_from_soup(soup: BeautifulSoup) -> Optional[str]:
     return None
 
 
+def _parse_document(html: str) -> list:
+    soup = BeautifulSoup(html, HTML_PARSER)
+    return [
+        extract_portion_from_soup(soup),
+        product_title_from_soup(soup),
+        parse_table_from_soup(soup),
+    ]
+
+
+def parse_document(
+    html: str, cache: Optional[ParseCache] = None
+) -> Tuple[Optional[str], Optional[str], List[Dict]]:
+    """
+    Parsea el HTML una única vez y devuelve (porción, título, nutrientes).
+
+    Con un cache de parseo (el compartido, si no se pasa ``cache``) un HTML ya
+    visto no se vuelve a parsear.
+    """
+    if not isinstance(html, str) or not html.strip():
+        return None, None, []
+    portion, title, nutrients = cached(
+        html,
+        f"clean_nutrition.document/{HTML_PARSER}",
+        PARSER_VERSION,
+        _parse_document,
+        cache,
+    )
+    return portion, title, nutrients
+
+
 # ---------- Pipeline ----------
 
+DEFAULT_KEEP_COLS = [
+    "titulo",
+    "descripcion",
+    "imagen",
+    "ingredientes",
+    "fecha",
+    "fuente",
+]
+HTML_COLUMNS = ["modal_html", "tabla_nutricional"]
+
+
+LONG_COLUMNS = [
+    "Producto",
+    "Porción",
+    "Nutriente",
+    "Cantidad",
+    "Unidad",
+    "Unidad_original",
+    "%VD",
+    "Cantidad_num",
+    "_origen_html",
+    "_row",
+]
+
+
+def _column(df: pd.DataFrame, name: str) -> np.ndarray:
+    if name in df.columns:
+        return df[name].to_numpy(dtype=object)
+    return np.full(len(df), None, dtype=object)
+
+
+def build_long(df: pd.DataFrame, present_keep: List[str]) -> pd.DataFrame:
+    """
+    Parsea el HTML de cada fila y arma el long form de forma columnar.
 
-def process_csv(
-    input_csv: str,
-    out_long: str = "nutricional_long.csv",
-    out_wide: str = "nutricional_wide.csv",
-    keep_cols: Optional[List[str]] = None,
-) -> Dict[str, str]:
-    df = pd.read_csv(input_csv)
-
-    keep_cols = keep_cols or [
-        "titulo",
-        "descripcion",
-        "imagen",
-        "ingredientes",
-        "fecha",
-        "fuente",
-    ]
-    present_keep = [c for c in keep_cols if c in df.columns]
+    El loop solo junta arrays planos (posición de fila, nutriente, cantidad,
+    unidad, %VD); las columnas de contexto se toman de ``df`` por posición y
+    ``Cantidad`` se convierte con un único ``to_numeric``.
 
-    records = []
-    for idx, row in df.iterrows():
-        html, origen = pick_html_source(row)
+    ``Cantidad`` y ``Unidad_original`` quedan como en el rótulo;
+    ``Cantidad_num`` está expresada en ``Unidad``, la unidad canónica del
+    nutriente (ver ``nutrient_units``).
+    """
+    modal = _column(df, "modal_html")
+    tabla = _column(df, "tabla_nutricional")
+    titulos = _column(df, "titulo")
+
+    # por producto (indexado por posición de fila)
+    product = np.full(len(df), None, dtype=object)
+    portion = np.full(len(df), None, dtype=object)
+    origen = np.full(len(df), None, dtype=object)
+    # por nutriente
+    positions: List[int] = []
+    names: List[str] = []
+    amounts: List[str] = []
+    units: List[str] = []
+    vds: List[float] = []
+
+    for pos in range(len(df)):
+        html, source = pick_html_source(modal[pos], tabla[pos])
         if not html:
             continue
 
-        # choose parser similarly here
-        parser_to_use = "lxml"
-        try:
-            BeautifulSoup("<html></html>", "lxml")
-        except Exception:
-            parser_to_use = "html.parser"
-        soup = BeautifulSoup(html, parser_to_use)
-        portion = extract_portion_from_soup(soup)
-        product = product_title_from_soup(soup) or (
-            row["titulo"] if "titulo" in row else None
-        )
+        # un solo árbol para porción, título y tabla
+        portion[pos], title, nutrients = parse_document(html)
+        product[pos] = title or titulos[pos]
+        origen[pos] = source
 
-        nutrients = parse_table_from_html(html)
         if not nutrients:
             # intenta también si la columna alternativa existe
-            alt = "tabla_nutricional" if origen == "modal_html" else "modal_html"
-            if alt in row and isinstance(row[alt], str):
-                nutrients = parse_table_from_html(row[alt])
-
-        base = {k: row.get(k) for k in present_keep}
-        base.update(
-            {
-                "Producto": product,
-                "Porción": portion,
-                "_origen_html": origen,
-                "_row": idx,
-            }
-        )
+            alt = tabla[pos] if source == "modal_html" else modal[pos]
+            if isinstance(alt, str):
+                nutrients = parse_table_from_html(alt)
 
         for n in nutrients:
-            rec = dict(base)
-            rec.update(n)
-            # agrega numérico cuando es viable
-            rec["Cantidad_num"] = pd.to_numeric(rec["Cantidad"], errors="coerce")
-            records.append(rec)
-
-    long_df = pd.DataFrame.from_records(records)
+            positions.append(pos)
+            names.append(n["Nutriente"])
+            amounts.append(n["Cantidad"])
+            units.append(n["Unidad"])
+            vds.append(np.nan if n["%VD"] is None else n["%VD"])
+
+    take = np.asarray(positions, dtype=np.intp)
+    long_df = df[present_keep].iloc[take].reset_index(drop=True)
+    long_df["Producto"] = product[take]
+    long_df["Porción"] = portion[take]
+    long_df["Nutriente"] = pd.Categorical(names)
+    long_df["Cantidad"] = amounts
+    # numérico en la unidad canónica cuando es viable
+    amounts_num, canonical_units = to_canonical(names, units, amounts)
+    long_df["Unidad"] = pd.Categorical(canonical_units)
+    long_df["Unidad_original"] = pd.Categorical(units)
+    long_df["%VD"] = np.asarray(vds, dtype=float)
+    long_df["Cantidad_num"] = amounts_num
+    long_df["_origen_html"] = origen[take]
+    long_df["_row"] = df.index.to_numpy()[take]
+    return long_df
+
+
+def finish_long(long_df: pd.DataFrame, present_keep: List[str]) -> pd.DataFrame:
     # orden de columnas
-    col_order = present_keep + [
-        "Producto",
-        "Porción",
-        "Nutriente",
-        "Cantidad",
-        "Unidad",
-        "%VD",
-        "Cantidad_num",
-        "_origen_html",
-        "_row",
+    long_df = long_df.reindex(columns=present_keep + LONG_COLUMNS)
+    # Wide: pivotea cantidades por Nutriente, preserva unidad en nombre para evitar ambigüedad
+    long_df["Nutriente_unidad"] = (
+        long_df["Nutriente"].astype(str) + " [" + long_df["Unidad"].astype(str) + "]"
+    )
+    return long_df
+
+
+def build_wide(long_df: pd.DataFrame, id_cols: List[str]) -> pd.DataFrame:
+    """
+    Wide form en un único reshape: columnas "Nutriente [Unidad]" con la
+    cantidad y "Nutriente (%VD)" con el %VD, una fila por producto (``_row``).
+    """
+    if long_df.empty:
+        return pd.DataFrame()
+
+    value_key = long_df["Nutriente_unidad"].astype(str)
+    vd_key = long_df["Nutriente"].astype(str) + " (%VD)"
+    stacked = pd.DataFrame(
+        {
+            "_row": np.concatenate([long_df["_row"].to_numpy()] * 2),
+            "columna": np.concatenate([value_key.to_numpy(), vd_key.to_numpy()]),
+            "valor": np.concatenate(
+                [long_df["Cantidad_num"].to_numpy(), long_df["%VD"].to_numpy()]
+            ),
+        }
+    )
+    # primer valor no nulo por (producto, columna), como aggfunc="first"
+    stacked = stacked.dropna(subset=["valor"]).drop_duplicates(["_row", "columna"])
+    values = stacked.set_index(["_row", "columna"])["valor"].unstack("columna")
+
+    value_names = set(value_key)
+    value_cols = sorted(c for c in values.columns if c in value_names)
+    vd_cols = sorted(c for c in values.columns if c not in value_names)
+    ids = long_df.drop_duplicates("_row").set_index("_row")[
+        [c for c in id_cols if c != "_row"]
     ]
-    long_df = long_df.reindex(columns=[c for c in col_order if c in long_df.columns])
+    wide_df = ids.join(values[value_cols + vd_cols], how="inner")
+    wide_df = wide_df.reset_index()
+    return wide_df[id_cols + value_cols + vd_cols]
 
-    # Wide: pivotea cantidades por Nutriente, preserva unidad en nombre para evitar ambigüedad
-    if not long_df.empty:
-        long_df["Nutriente_unidad"] = (
-            long_df["Nutriente"].astype(str)
-            + " ["
-            + long_df["Unidad"].astype(str)
-            + "]"
-        )
-        id_cols = present_keep + ["Producto", "Porción", "_row"]
-        id_cols = [c for c in id_cols if c in long_df.columns]
-        wide_df = long_df.pivot_table(
-            index=id_cols,
-            columns="Nutriente_unidad",
-            values="Cantidad_num",
-            aggfunc="first",
-        ).reset_index()
-        # %VD en wide: columnas separadas con sufijo (_%VD)
-        vd_df = (
-            long_df.pivot_table(
-                index=id_cols, columns="Nutriente", values="%VD", aggfunc="first"
-            )
-            .add_suffix(" (%VD)")
-            .reset_index()
-        )
-        wide_df = pd.merge(wide_df, vd_df, on=id_cols, how="left")
+
+def read_source(path: str, keep_cols: List[str]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Lee de la entrada (CSV o Parquet) solo las columnas de contexto pedidas y
+    las del HTML. Devuelve el DataFrame y las columnas de contexto presentes.
+    """
+    if columnar.is_parquet(path):
+        header = columnar.parquet_columns(path)
     else:
-        wide_df = pd.DataFrame()
+        header = list(pd.read_csv(path, nrows=0).columns)
+    present_keep = [c for c in keep_cols if c in header]
+    usecols = present_keep + [c for c in HTML_COLUMNS if c in header]
+    if columnar.is_parquet(path):
+        return columnar.read_table(path, usecols), present_keep
+    # sin ninguna columna conocida se lee todo para contar las filas
+    return pd.read_csv(path, usecols=usecols or None), present_keep
+
+
+def write_output(df: pd.DataFrame, path: str) -> None:
+    """CSV o, si ``path`` termina en .parquet, Parquet."""
+    if columnar.is_parquet(path):
+        columnar.write_table(df, path)
+    else:
+        df.to_csv(path, index=False, encoding="utf-8")
+
 
-    long_df.to_csv(out_long, index=False, encoding="utf-8")
-    wide_df.to_csv(out_wide, index=False, encoding="utf-8")
+def process_csv(
+    input_csv: str,
+    out_long: str = "nutricional_long.csv",
+    out_wide: str = "nutricional_wide.csv",
+    keep_cols: Optional[List[str]] = None,
+) -> Dict[str, str]:
+    """
+    Genera el long y el wide form. La entrada y cada salida pueden ser CSV o
+    Parquet (por extensión); el long form en Parquet se normaliza en una
+    tabla de productos y otra de nutrientes (ver ``columnar``).
+    """
+    df, present_keep = read_source(input_csv, keep_cols or DEFAULT_KEEP_COLS)
+
+    long_df = finish_long(build_long(df, present_keep), present_keep)
+    id_cols = present_keep + ["Producto", "Porción", "_row"]
+    wide_df = build_wide(long_df, id_cols)
+
+    if columnar.is_parquet(out_long):
+        columnar.write_long(long_df, out_long)
+    else:
+        long_df.to_csv(out_long, index=False, encoding="utf-8")
+    write_output(wide_df, out_wide)
 
     return {
         "long_csv": out_long,
@@ -287,6 +410,84 @@ def process_csv(
     }
 
 
+def process_csv_streaming(
+    input_csv: str,
+    out_long: str = "nutricional_long.csv",
+    out_wide: str = "nutricional_wide.csv",
+    keep_cols: Optional[List[str]] = None,
+    chunksize: int = 200,
+) -> Dict[str, str]:
+    """
+    Igual que ``process_csv`` pero con memoria acotada por ``chunksize``.
+
+    1. Lee la entrada de a ``chunksize`` filas (solo las columnas necesarias),
+       parsea y agrega el long form al CSV de salida. En esta pasada solo se
+       acumulan los nombres de las columnas del wide.
+    2. Relee el long form por chunks y escribe el wide. Las filas de un mismo
+       producto son contiguas; el último producto de cada chunk se arrastra al
+       siguiente por si quedó partido.
+    """
+    keep_cols = keep_cols or DEFAULT_KEEP_COLS
+    header = list(pd.read_csv(input_csv, nrows=0).columns)
+    present_keep = [c for c in keep_cols if c in header]
+    usecols = present_keep + [c for c in HTML_COLUMNS if c in header]
+    id_cols = present_keep + ["Producto", "Porción", "_row"]
+
+    rows_source = rows_long = 0
+    value_cols: set = set()
+    vd_cols: set = set()
+    with open(out_long, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(
+            pd.read_csv(input_csv, usecols=usecols, chunksize=chunksize)
+        ):
+            rows_source += len(chunk)
+            long_df = finish_long(build_long(chunk, present_keep), present_keep)
+            long_df.to_csv(f, index=False, header=(i == 0))
+            rows_long += len(long_df)
+            value_cols.update(
+                long_df.loc[long_df["Cantidad_num"].notna(), "Nutriente_unidad"]
+            )
+            vd_cols.update(
+                long_df.loc[long_df["%VD"].notna(), "Nutriente"].astype(str) + " (%VD)"
+            )
+    if rows_source == 0:
+        # entrada sin filas: igual deja el encabezado del long form
+        finish_long(pd.DataFrame(columns=present_keep), present_keep).to_csv(
+            out_long, index=False, encoding="utf-8"
+        )
+
+    wide_cols = id_cols + sorted(value_cols) + sorted(vd_cols)
+    rows_wide = 0
+    with open(out_wide, "w", encoding="utf-8", newline="") as f:
+        if rows_long == 0:
+            pd.DataFrame().to_csv(f, index=False)
+        else:
+            carry = pd.DataFrame()
+            first = True
+            for chunk in pd.read_csv(out_long, chunksize=chunksize * 20):
+                chunk = pd.concat([carry, chunk], ignore_index=True)
+                last = chunk["_row"].iloc[-1]
+                carry = chunk[chunk["_row"] == last]
+                ready = chunk[chunk["_row"] != last]
+                if ready.empty:
+                    continue
+                wide_df = build_wide(ready, id_cols).reindex(columns=wide_cols)
+                wide_df.to_csv(f, index=False, header=first)
+                first = False
+                rows_wide += len(wide_df)
+            if not carry.empty:
+                wide_df = build_wide(carry, id_cols).reindex(columns=wide_cols)
+                wide_df.to_csv(f, index=False, header=first)
+                rows_wide += len(wide_df)
+
+    return {
+        "long_csv": out_long,
+        "wide_csv": out_wide,
+        "rows_long": str(rows_long),
+        "rows_source": str(rows_source),
+    }
+
+
 # ---------- CLI ----------
 
 
@@ -300,17 +501,34 @@ def main():
         help="Ruta al CSV de entrada (ej: productos_galletitas.csv). Si se omite, se intentará usar 'productos_galletitas.csv' en el directorio de trabajo.",
     )
     parser.add_argument(
-        "--out-long", default="nutricional_long.csv", help="Salida long form"
+        "--out-long",
+        default="nutricional_long.csv",
+        help="Salida long form (.csv, o .parquet normalizado en productos y nutrientes)",
     )
     parser.add_argument(
-        "--out-wide", default="nutricional_wide.csv", help="Salida wide form"
+        "--out-wide",
+        default="nutricional_wide.csv",
+        help="Salida wide form (.csv o .parquet)",
     )
     parser.add_argument(
         "--keep-cols",
         default="titulo,descripcion,imagen,ingredientes,fecha,fuente",
         help="Columnas del CSV a conservar como contexto, separadas por coma",
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=0,
+        help="Procesa la entrada de a N filas con memoria acotada (0 = todo en memoria)",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        default=None,
+        help="Base SQLite del cache de parseo (reusa el HTML ya parseado entre corridas)",
+    )
     args = parser.parse_args()
+    if args.parse_cache:
+        parse_cache.configure(args.parse_cache)
 
     # decide input path: prefer explicit arg, else try default file in CWD
     input_csv = args.input_csv
@@ -333,7 +551,20 @@ def main():
             )
 
     keep = [c.strip() for c in args.keep_cols.split(",") if c.strip()]
-    info = process_csv(input_csv, args.out_long, args.out_wide, keep_cols=keep)
+    if args.chunksize and any(
+        columnar.is_parquet(p) for p in (input_csv, args.out_long, args.out_wide)
+    ):
+        parser.error("--chunksize solo trabaja con CSV")
+    if args.chunksize:
+        info = process_csv_streaming(
+            input_csv,
+            args.out_long,
+            args.out_wide,
+            keep_cols=keep,
+            chunksize=args.chunksize,
+        )
+    else:
+        info = process_csv(input_csv, args.out_long, args.out_wide, keep_cols=keep)
     print(json.dumps(info, ensure_ascii=False, indent=2))
 
 
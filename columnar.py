@@ -0,0 +1,167 @@
+"""
+Salida columnar (Parquet) del scraper y del pipeline de limpieza.
+
+El long form en CSV repite el título, la descripción, la imagen y los
+ingredientes en cada fila de nutriente. En Parquet se normaliza en dos
+tablas:
+
+- ``<salida>_productos.parquet``: una fila por producto con ``product_id``
+  (entero denso, en orden de aparición) y los atributos del producto.
+- ``<salida>.parquet``: una fila por nutriente con el ``product_id``,
+  ``Nutriente`` y las unidades como diccionarios (categóricos) y los valores.
+
+``load_long`` las vuelve a juntar leyendo solo las columnas pedidas de cada
+archivo: una consulta sobre nutrientes no toca los textos del producto.
+
+pyarrow es opcional: se importa recién al leer o escribir Parquet.
+"""
+
+import json
+import os
+from typing import Iterable, Optional
+
+import pandas as pd
+
+PRODUCT_ID = "product_id"
+PRODUCTS_SUFFIX = "_productos"
+
+# Columnas del long form que van en la tabla de nutrientes (el resto es del
+# producto)
+NUTRIENT_COLUMNS = [
+    "Nutriente",
+    "Cantidad",
+    "Unidad",
+    "Unidad_original",
+    "%VD",
+    "Cantidad_num",
+]
+# Columnas con pocos valores distintos: se guardan como diccionario
+DICTIONARY_COLUMNS = ["Nutriente", "Unidad", "Unidad_original"]
+# Columna derivada que no se guarda: se recalcula al cargar
+DERIVED_COLUMN = "Nutriente_unidad"
+
+# Orden de columnas del long form original, guardado en el schema
+METADATA_KEY = b"long_columns"
+
+
+def require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("La salida Parquet necesita pyarrow: pip install pyarrow")
+    return pa, pq
+
+
+def is_parquet(path: str) -> bool:
+    return str(path).lower().endswith(".parquet")
+
+
+def products_path(path: str) -> str:
+    """Tabla de productos de un long form: "x.parquet" -> "x_productos.parquet"."""
+    root, ext = os.path.splitext(str(path))
+    return f"{root}{PRODUCTS_SUFFIX}{ext or '.parquet'}"
+
+
+def split_long(long_df: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Separa el long form en (productos, nutrientes) unidos por ``product_id``.
+
+    Un producto es un ``_row`` de la entrada: sus atributos son los mismos en
+    todas sus filas, así que se toma la primera.
+    """
+    codes, _ = pd.factorize(long_df["_row"], sort=False)
+    ids = codes.astype("int32")
+    product_cols = [
+        c for c in long_df.columns if c not in NUTRIENT_COLUMNS + [DERIVED_COLUMN]
+    ]
+    first = ~long_df["_row"].duplicated().to_numpy()
+    products = long_df.loc[first, product_cols].reset_index(drop=True)
+    products.insert(0, PRODUCT_ID, ids[first])
+
+    nutrients = pd.DataFrame({PRODUCT_ID: ids})
+    for col in NUTRIENT_COLUMNS:
+        values = long_df[col].reset_index(drop=True)
+        if col in DICTIONARY_COLUMNS and values.dtype != "category":
+            values = values.astype("category")
+        nutrients[col] = values
+    return products, nutrients
+
+
+def write_table(
+    df: pd.DataFrame, path: str, metadata: Optional[dict[bytes, bytes]] = None
+) -> None:
+    """
+    Escribe un DataFrame a Parquet. Las columnas categóricas quedan como
+    diccionarios y vuelven a leerse como ``category``.
+    """
+    pa, pq = require_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if metadata:
+        table = table.replace_schema_metadata({**table.schema.metadata, **metadata})
+    pq.write_table(table, path)
+
+
+def write_long(long_df: pd.DataFrame, path: str) -> int:
+    """
+    Escribe el long form normalizado en ``path`` (nutrientes) y
+    ``products_path(path)`` (productos). Devuelve la cantidad de productos.
+    """
+    products, nutrients = split_long(long_df)
+    write_table(products, products_path(path))
+    columns = json.dumps(list(long_df.columns), ensure_ascii=False).encode("utf-8")
+    write_table(nutrients, path, {METADATA_KEY: columns})
+    return len(products)
+
+
+def read_table(path: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """Lee un Parquet leyendo del disco solo ``columns`` (todas si es None)."""
+    _, pq = require_pyarrow()
+    columns = None if columns is None else list(columns)
+    return pq.read_table(path, columns=columns).to_pandas()
+
+
+def parquet_columns(path: str) -> list[str]:
+    """Columnas de un Parquet sin leer los datos."""
+    _, pq = require_pyarrow()
+    return pq.read_schema(path).names
+
+
+def load_long(path: str, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Reconstruye el long form escrito con ``write_long``.
+
+    Con ``columns`` se leen solo esas columnas (y ``product_id`` para unir);
+    si ninguna es del producto, la tabla de productos no se abre. Sin
+    ``columns`` devuelve las columnas originales, en su orden.
+    """
+    _, pq = require_pyarrow()
+    schema = pq.read_schema(path)
+    meta = schema.metadata or {}
+    if columns is None:
+        wanted = json.loads(meta[METADATA_KEY]) if METADATA_KEY in meta else None
+        wanted = wanted or [c for c in schema.names if c != PRODUCT_ID]
+    else:
+        wanted = list(columns)
+    needed = set(wanted)
+    if DERIVED_COLUMN in needed:
+        needed |= {"Nutriente", "Unidad"}
+
+    nutrient_cols = [c for c in schema.names if c in needed and c != PRODUCT_ID]
+    rest = needed - set(nutrient_cols) - {PRODUCT_ID, DERIVED_COLUMN}
+    product_cols = []
+    if rest:
+        product_cols = [c for c in parquet_columns(products_path(path)) if c in rest]
+    missing = rest - set(product_cols)
+    if missing:
+        raise KeyError(f"Columnas inexistentes en {path}: {sorted(missing)}")
+
+    df = read_table(path, [PRODUCT_ID] + nutrient_cols)
+    if product_cols:
+        products = read_table(products_path(path), [PRODUCT_ID] + product_cols)
+        df = df.merge(products, on=PRODUCT_ID, how="left", sort=False)
+    if DERIVED_COLUMN in wanted:
+        df[DERIVED_COLUMN] = (
+            df["Nutriente"].astype(str) + " [" + df["Unidad"].astype(str) + "]"
+        )
+    return df[wanted]
@@ -0,0 +1,205 @@
+"""
+Reciclado del contexto del navegador en crawls largos.
+
+Chromium acumula memoria con cada modal abierto, así que un contexto que
+dura todo el crawl crece sin techo. ``ContextRecycler`` cierra el contexto y
+abre uno nuevo (con las cookies y el storage del anterior) cuando se
+procesaron ``max_products`` productos o cuando el RSS del árbol de procesos
+(este proceso, el driver de Playwright y los procesos de Chromium) supera
+``max_rss_mb``. El reciclado se hace entre páginas del listado: quien lo
+llama vuelve a posicionar la página nueva con el template de URL.
+
+Al reciclar, el ``storage_state`` del contexto viejo se toma en memoria y
+se le pasa al nuevo, así la sesión sobrevive aunque no haya archivo. Si hay
+un path configurado además se guarda en disco al reciclar y al cerrar; la
+próxima corrida lo carga y arranca con las cookies (consentimiento, sesión)
+ya establecidas.
+
+El RSS se mide con psutil si está instalado y, si no, leyendo ``/proc``
+(Linux). En otros sistemas sin psutil solo se recicla por productos. La
+suma por proceso cuenta más de una vez la memoria compartida, así que es
+una cota superior.
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Union
+
+from playwright.sync_api import BrowserContext, Page
+
+from crawl_metrics import NO_METRICS, CrawlMetrics
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - depende del entorno
+    psutil = None
+
+DEFAULT_RECYCLE_EVERY = 500
+
+# Path a un storage_state en disco o el storage_state ya cargado
+StorageState = Union[str, dict, None]
+
+
+@dataclass(frozen=True)
+class RecycleOptions:
+    """
+    Cuándo reciclar el contexto y dónde guardar su ``storage_state``.
+
+    ``max_products=0`` y ``max_rss_mb=0`` desactivan cada criterio. El techo
+    de RSS es para todo el árbol de procesos: en el modo paralelo lo
+    comparten los navegadores de todos los workers.
+    """
+
+    max_products: int = DEFAULT_RECYCLE_EVERY
+    max_rss_mb: float = 0
+    storage_state: Optional[str] = None
+
+
+DEFAULT_RECYCLING = RecycleOptions()
+
+
+def _proc_tree_rss(pid: int) -> Optional[int]:
+    """RSS (bytes) de ``pid`` y sus descendientes leyendo ``/proc``."""
+    if not os.path.isdir("/proc"):
+        return None
+    children: dict[int, list[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # El nombre del comando va entre paréntesis y puede tener espacios
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(entry))
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        try:
+            with open(f"/proc/{current}/statm", "r") as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+        pending += children.get(current, [])
+    return total
+
+
+def process_tree_rss(pid: Optional[int] = None) -> Optional[int]:
+    """RSS (bytes) del proceso y sus descendientes (None si no se puede medir)."""
+    pid = pid or os.getpid()
+    if psutil is None:
+        return _proc_tree_rss(pid)
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+
+def save_storage_state(context: BrowserContext, path: str) -> None:
+    """Escribe el storage_state en forma atómica (lo comparten varios workers)."""
+    write_storage_state(context.storage_state(), path)
+
+
+def write_storage_state(state: dict, path: str) -> None:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class ContextRecycler:
+    """
+    Dueño del contexto y la página de un worker, con reciclado por cantidad
+    de productos o por memoria.
+
+    ``make_context(state)`` crea un contexto nuevo (ya con el bloqueo del
+    perfil liviano) con ``state``: el path de ``options.storage_state`` al
+    arrancar y el ``storage_state`` del contexto anterior al reciclar. Con
+    las opciones en 0 nunca recicla: solo guarda el ``storage_state`` al
+    cerrar.
+    """
+
+    def __init__(
+        self,
+        make_context: Callable[[StorageState], BrowserContext],
+        options: RecycleOptions = DEFAULT_RECYCLING,
+        metrics: CrawlMetrics = NO_METRICS,
+        rss: Callable[[], Optional[int]] = process_tree_rss,
+    ):
+        self.make_context = make_context
+        self.options = options
+        self.metrics = metrics
+        self.rss = rss
+        self.products = 0
+        self.recycles = 0
+        self.context = make_context(options.storage_state)
+        self.page = self.context.new_page()
+
+    def track(self, on_capture: Callable[[Any], None]) -> Callable[[Any], None]:
+        """Envuelve un callback ``on_capture`` para contar los productos."""
+
+        def counted(capture: Any) -> None:
+            on_capture(capture)
+            self.products += 1
+
+        return counted
+
+    def should_recycle(self) -> Optional[str]:
+        """
+        Motivo para reciclar ("products" o "rss") o None. Por memoria solo se
+        recicla si hubo trabajo desde el último reciclado: si el piso ya supera
+        el techo, reciclar en cada página no ayuda.
+        """
+        limit = self.options.max_products
+        if limit and self.products >= limit:
+            return "products"
+        if self.options.max_rss_mb and self.products:
+            rss = self.rss()
+            if rss is not None and rss / 2**20 > self.options.max_rss_mb:
+                return "rss"
+        return None
+
+    def recycle(self, reason: str) -> Page:
+        """Cierra el contexto actual y devuelve la página de uno nuevo."""
+        rss = self.rss()
+        with self.metrics.stage("recycle", reason=reason, products=self.products):
+            # en memoria: sin path configurado la sesión también sobrevive
+            state = self.context.storage_state()
+            if self.options.storage_state:
+                write_storage_state(state, self.options.storage_state)
+            self.context.close()
+            self.context = self.make_context(state)
+            self.page = self.context.new_page()
+        self.recycles += 1
+        self.products = 0
+        self.metrics.count(
+            "recycles", reason=reason, rss_mb=round(rss / 2**20) if rss else None
+        )
+        print(f"♻️  Contexto reciclado ({reason})")
+        return self.page
+
+    def save_state(self) -> None:
+        if self.options.storage_state:
+            save_storage_state(self.context, self.options.storage_state)
+
+    def close(self) -> None:
+        try:
+            self.save_state()
+        except Exception as e:
+            print(f"⚠️  No se pudo guardar el storage_state: {e}")
+        self.context.close()
@@ -0,0 +1,199 @@
+"""
+Instrumentación del crawler: timers por etapa, contadores y log de eventos.
+
+Cada etapa (navegación, filtro de categoría, apertura del modal, lectura del
+outerHTML, parseo, guardado, cierre del modal, esperas) se mide con
+``metrics.stage("nombre")``. Cada medición se agrega como una línea al log
+JSONL (con el thread que la hizo, así se ve el reparto entre workers) y al
+final de la corrida ``write_summary`` escribe percentiles e histogramas por
+etapa.
+
+Uso:
+    metrics = CrawlMetrics("crawl_metrics.jsonl")
+    with metrics.stage("modal_open", page=3, key="1234"):
+        ...
+    metrics.count("products_ok")
+    metrics.write_summary("crawl_metrics.summary.json")
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Iterator, Optional
+
+DEFAULT_METRICS = "crawl_metrics"
+
+# Límites superiores (ms) de los buckets del histograma; el último es abierto
+HISTOGRAM_BOUNDS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Percentil con interpolación lineal (q entre 0 y 100)."""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    pos = (len(ordered) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def histogram(values_ms: list[float]) -> dict[str, int]:
+    """Cuenta de mediciones por bucket ("<=1ms", "<=2ms", ..., ">10000ms")."""
+    buckets = {f"<={b}ms": 0 for b in HISTOGRAM_BOUNDS_MS}
+    buckets[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = 0
+    for value in values_ms:
+        for bound in HISTOGRAM_BOUNDS_MS:
+            if value <= bound:
+                buckets[f"<={bound}ms"] += 1
+                break
+        else:
+            buckets[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] += 1
+    return buckets
+
+
+class CrawlMetrics:
+    """
+    Acumula duraciones por etapa y contadores; es seguro compartirlo entre
+    los threads del modo paralelo.
+
+    Con ``enabled=False`` no mide nada (es el default de las funciones del
+    crawler, así se pueden usar sin instrumentación).
+    """
+
+    def __init__(self, events_path: Optional[str] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.events_path = events_path
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._durations: dict[str, list[float]] = {}
+        self._failures: dict[str, int] = {}
+        self._counters: dict[str, int] = {}
+        self._events = (
+            open(events_path, "w", encoding="utf-8")
+            if enabled and events_path
+            else None
+        )
+
+    def __enter__(self) -> "CrawlMetrics":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+
+    @contextmanager
+    def stage(self, name: str, **fields: Any) -> Iterator[None]:
+        """Mide el bloque como una ejecución de la etapa ``name``."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._record(name, start, fields, error=f"{type(e).__name__}: {e}")
+            raise
+        self._record(name, start, fields)
+
+    def count(self, name: str, n: int = 1, **fields: Any) -> None:
+        """Suma ``n`` al contador ``name`` (reintentos, fallas, productos...)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+            self._write({"event": "count", "name": name, "n": n, **fields})
+
+    def event(self, name: str, **fields: Any) -> None:
+        """Agrega un evento suelto al log (sin duración)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._write({"event": name, **fields})
+
+    def _record(
+        self, name: str, start: float, fields: dict[str, Any], error: str = ""
+    ) -> None:
+        ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._durations.setdefault(name, []).append(ms)
+            event = {"event": "stage", "stage": name, "ms": round(ms, 3), **fields}
+            if error:
+                self._failures[name] = self._failures.get(name, 0) + 1
+                event["error"] = error[:300]
+            self._write(event)
+
+    def _write(self, event: dict[str, Any]) -> None:
+        if self._events is None:
+            return
+        event = {
+            "t": round(time.perf_counter() - self.started, 4),
+            "thread": threading.current_thread().name,
+            **event,
+        }
+        self._events.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+    def summary(self) -> dict[str, Any]:
+        """Totales, percentiles e histograma de cada etapa más los contadores."""
+        with self._lock:
+            durations = {k: list(v) for k, v in self._durations.items()}
+            failures = dict(self._failures)
+            counters = dict(self._counters)
+        wall_s = time.perf_counter() - self.started
+        stages = {}
+        for name, values in sorted(
+            durations.items(), key=lambda kv: sum(kv[1]), reverse=True
+        ):
+            total_s = sum(values) / 1000
+            stages[name] = {
+                "count": len(values),
+                "failed": failures.get(name, 0),
+                "total_s": round(total_s, 3),
+                # Con varios workers la suma de etapas puede superar el 100 %
+                "share_of_wall": round(total_s / wall_s, 4) if wall_s else None,
+                "mean_ms": round(total_s * 1000 / len(values), 3),
+                "p50_ms": round(percentile(values, 50), 3),
+                "p90_ms": round(percentile(values, 90), 3),
+                "p99_ms": round(percentile(values, 99), 3),
+                "max_ms": round(max(values), 3),
+                "histogram": histogram(values),
+            }
+        products = counters.get("products_ok", 0)
+        return {
+            "finished_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "wall_s": round(wall_s, 3),
+            "products_per_min": round(products * 60 / wall_s, 2) if wall_s else None,
+            "counters": counters,
+            "stages": stages,
+        }
+
+    def write_summary(self, path: str) -> dict[str, Any]:
+        """Escribe el resumen en ``path`` (JSON), imprime las etapas y lo devuelve."""
+        summary = self.summary()
+        if not self.enabled:
+            return summary
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"📊 Métricas del crawl en {path}")
+        for name, stage in summary["stages"].items():
+            print(
+                f"   {name:<12} {stage['count']:>6}x  total {stage['total_s']:>9.1f} s  "
+                f"p50 {stage['p50_ms']:>8.1f} ms  p99 {stage['p99_ms']:>8.1f} ms"
+            )
+        return summary
+
+
+# Instancia que no mide nada: default de las funciones del crawler
+NO_METRICS = CrawlMetrics(enabled=False)
+
+
+def metrics_paths(prefix: str) -> tuple[str, str]:
+    """(log de eventos, resumen) para un prefijo como ``crawl_metrics``."""
+    return f"{prefix}.jsonl", f"{prefix}.summary.json"
@@ -0,0 +1,240 @@
+"""
+Etapas concurrentes captura → parseo → escritura del crawler.
+
+Los threads que manejan el navegador solo capturan el HTML de cada modal y lo
+entregan con ``submit``. Un pool de parsers (threads, o procesos con
+``processes=True``) lo convierte en registros, y un único writer los junta en
+lotes: un commit del store y un fsync del archivo de modales por lote, en
+lugar de uno por producto.
+
+Las colas entre etapas son acotadas: si el parseo o el disco se atrasan,
+``submit`` bloquea al navegador (la espera queda medida como la etapa
+"queue_wait") y la memoria no crece con el largo del crawl.
+
+Una página se marca terminada en el store recién cuando todos sus productos
+llegaron a disco, así ``--resume`` nunca saltea productos que quedaron en
+una cola. Con ``parse_workers=0`` no hay threads: ``submit`` parsea y guarda
+en el momento (el comportamiento anterior).
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from crawl_metrics import NO_METRICS, CrawlMetrics
+from modal_archive import ModalArchive
+from modal_parser import parse_modal_html
+from product_store import ProductStore
+
+DEFAULT_PARSE_WORKERS = 2
+
+# Marca de fin de cada cola
+STOP = object()
+
+
+@dataclass
+class PipelineItem:
+    """Un modal capturado en camino al store."""
+
+    data_key: str
+    html: str
+    page_num: int
+    position: int
+    category: str = ""
+
+
+class CrawlPipeline:
+    """
+    Parseo y escritura desacoplados del navegador.
+
+    Es seguro llamar a ``submit`` y ``page_done`` desde varios workers. Hay
+    que llamar a ``close`` (o usarlo como context manager) antes de exportar
+    el store: recién ahí está garantizado que todo llegó a disco.
+    """
+
+    def __init__(
+        self,
+        store: ProductStore,
+        archive: ModalArchive,
+        parse_workers: int = DEFAULT_PARSE_WORKERS,
+        processes: bool = False,
+        queue_size: int = 64,
+        batch_size: int = 50,
+        flush_interval_s: float = 1.0,
+        metrics: CrawlMetrics = NO_METRICS,
+    ):
+        self.store = store
+        self.archive = archive
+        self.parse_workers = parse_workers
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self._pending: dict[tuple[str, int], int] = {}
+        self._waiting_pages: set[tuple[str, int]] = set()
+        self._failed_pages: set[tuple[str, int]] = set()
+        self._errors: list[Exception] = []
+        self._closed = False
+        self._captures: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._records: queue.Queue = queue.Queue(maxsize=queue_size)
+        # spawn: los workers del navegador son threads y fork con threads
+        # vivos puede colgar al proceso hijo
+        self._executor = (
+            ProcessPoolExecutor(
+                parse_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+            if processes and parse_workers
+            else None
+        )
+        self._parsers = [
+            threading.Thread(target=self._parse_loop, name=f"parser_{i}", daemon=True)
+            for i in range(parse_workers)
+        ]
+        self._writer = threading.Thread(
+            target=self._write_loop, name="writer", daemon=True
+        )
+        if parse_workers:
+            for thread in self._parsers:
+                thread.start()
+            self._writer.start()
+
+    def __enter__(self) -> "CrawlPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def submit(self, item: PipelineItem) -> None:
+        """
+        Entrega un modal capturado. Bloquea si la cola está llena, y relanza
+        el error del writer si la escritura a disco falló.
+        """
+        if self._errors:
+            raise self._errors[0]
+        with self._lock:
+            page = (item.category, item.page_num)
+            self._pending[page] = self._pending.get(page, 0) + 1
+        if not self.parse_workers:
+            self._write([(item, self._parse(item))])
+            return
+        with self.metrics.stage("queue_wait", page=item.page_num, key=item.data_key):
+            self._captures.put(item)
+
+    def page_done(self, page_num: int, category: str = "") -> None:
+        """La página ya entregó todos sus productos: se marca al llegar a disco."""
+        page = (category, page_num)
+        with self._lock:
+            if self._pending.get(page, 0):
+                self._waiting_pages.add(page)
+                return
+        self._mark_page(page)
+
+    def close(self) -> None:
+        """Espera a que se vacíen las colas y relanza el primer error de escritura."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.parse_workers:
+            for _ in self._parsers:
+                self._captures.put(STOP)
+            for thread in self._parsers:
+                thread.join()
+            self._writer.join()
+        if self._executor is not None:
+            self._executor.shutdown()
+        if self._errors:
+            raise self._errors[0]
+
+    def _parse(self, item: PipelineItem) -> Optional[dict[str, Any]]:
+        ctx = {"page": item.page_num, "key": item.data_key}
+        try:
+            with self.metrics.stage("parse", **ctx):
+                if self._executor is not None:
+                    return self._executor.submit(parse_modal_html, item.html).result()
+                return parse_modal_html(item.html)
+        except Exception as e:
+            print(f"⚠️  Error parseando producto {item.data_key}: {e}")
+            self.metrics.count("parse_failed", **ctx)
+            return None
+
+    def _parse_loop(self) -> None:
+        while (item := self._captures.get()) is not STOP:
+            self._records.put((item, self._parse(item)))
+        self._records.put(STOP)
+
+    def _write_loop(self) -> None:
+        """Junta registros hasta ``batch_size`` o ``flush_interval_s`` y los escribe."""
+        batch: list[tuple[PipelineItem, Optional[dict[str, Any]]]] = []
+        deadline = 0.0
+        running = len(self._parsers)
+        while running:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                entry = self._records.get(timeout=timeout)
+            except queue.Empty:
+                entry = None
+            if entry is STOP:
+                running -= 1
+            elif entry is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval_s
+                batch.append(entry)
+            if batch and (entry is None or len(batch) >= self.batch_size):
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(
+        self, batch: list[tuple[PipelineItem, Optional[dict[str, Any]]]]
+    ) -> None:
+        parsed = [(item, record) for item, record in batch if record is not None]
+        ok = True
+        try:
+            with self.metrics.stage("save", products=len(parsed)):
+                # Se archiva todo lo capturado, también lo que no se pudo
+                # parsear: es el HTML que hay que re-parsear tras un arreglo
+                self.archive.put_many([(item.html, item.data_key) for item, _ in batch])
+                self.store.add_many(
+                    [
+                        (
+                            item.data_key,
+                            record,
+                            item.page_num,
+                            item.position,
+                            item.category,
+                        )
+                        for item, record in parsed
+                    ]
+                )
+        except Exception as e:
+            # Se sigue vaciando la cola para no trabar a los navegadores;
+            # el próximo submit (o close) relanza el error
+            print(f"❌ Error guardando {len(parsed)} productos: {e}")
+            self._errors.append(e)
+            ok = False
+        for item, record in batch:
+            self._finish(item, ok and record is not None)
+
+    def _finish(self, item: PipelineItem, ok: bool) -> None:
+        page = (item.category, item.page_num)
+        with self._lock:
+            self._pending[page] -= 1
+            if not ok:
+                self._failed_pages.add(page)
+            if self._pending[page] or page not in self._waiting_pages:
+                return
+            self._waiting_pages.discard(page)
+        self._mark_page(page)
+
+    def _mark_page(self, page: tuple[str, int]) -> None:
+        category, page_num = page
+        with self._lock:
+            # Una página con productos perdidos queda pendiente para --resume
+            if page in self._failed_pages:
+                return
+        self.store.mark_page_done(page_num, category)
@@ -0,0 +1,156 @@
+"""
+Planificador del crawl de varias categorías del vademecum.
+
+El trabajo se reparte en unidades (categoría, página) sobre una cola
+compartida que consumen los workers. Al principio se encola la página 1 de
+cada categoría; el worker que carga una página encola la siguiente (si el
+listado tiene link "siguiente") antes de procesarla, así otro worker puede
+tomarla mientras tanto.
+
+Un producto que aparece en varias categorías se descarga una sola vez: el
+primer worker que lo ve lo "reclama" (``claim``) y los demás lo saltean. La
+pertenencia a cada categoría se guarda igual en el store, para exportar un
+CSV por categoría además del combinado.
+"""
+
+import os
+import re
+import threading
+import unicodedata
+from collections import deque
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+import columnar
+from product_store import ProductStore
+
+# CSV combinado cuando se recorren varias categorías
+COMBINED_CSV = "productos_vademecum.csv"
+
+# Template todavía no conocido (None significa "listado de una sola página")
+UNKNOWN = object()
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    category: str
+    page_num: int
+
+
+def category_slug(name: str) -> str:
+    """Nombre apto para un archivo ("Panes y Tostadas" -> "panes_y_tostadas")."""
+    ascii_name = (
+        unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode("ascii")
+    )
+    return re.sub(r"[^a-z0-9]+", "_", ascii_name.lower()).strip("_") or "sin_categoria"
+
+
+def category_csv_path(output_csv: str, category: str) -> str:
+    """
+    Salida de una categoría, en el mismo directorio y formato (.csv o
+    .parquet) que la combinada.
+    """
+    directory = os.path.dirname(output_csv)
+    ext = ".parquet" if columnar.is_parquet(output_csv) else ".csv"
+    return os.path.join(directory, f"productos_{category_slug(category)}{ext}")
+
+
+def parse_categories(value: Optional[str]) -> Optional[list[str]]:
+    """
+    Interpreta ``--categories``: None si no se pidió, [] para descubrirlas
+    todas ("all"/"todas") o la lista separada por comas.
+    """
+    if value is None:
+        return None
+    if value.strip().lower() in ("all", "todas"):
+        return []
+    return [name.strip() for name in value.split(",") if name.strip()]
+
+
+class CrawlScheduler:
+    """
+    Cola compartida de unidades (categoría, página), segura entre threads.
+
+    ``next_unit`` bloquea mientras haya unidades en proceso que todavía
+    puedan encolar la página siguiente, y devuelve None cuando no queda
+    trabajo. Cada unidad entregada debe cerrarse con ``done``.
+    """
+
+    def __init__(
+        self,
+        categories: Iterable[str],
+        done_pages: Optional[dict[str, set[int]]] = None,
+        claimed: Iterable[str] = (),
+    ):
+        self.categories = list(dict.fromkeys(categories))
+        self.done_pages = {k: set(v) for k, v in (done_pages or {}).items()}
+        self._claimed = set(claimed)
+        self._templates: dict[str, object] = {}
+        self._queue: deque[WorkUnit] = deque()
+        self._outstanding = 0
+        self._cond = threading.Condition()
+        for category in self.categories:
+            self.put(WorkUnit(category, 1))
+
+    def put(self, unit: WorkUnit) -> None:
+        with self._cond:
+            self._queue.append(unit)
+            self._outstanding += 1
+            self._cond.notify()
+
+    def next_unit(self) -> Optional[WorkUnit]:
+        """
+        Próxima unidad a procesar (None cuando se terminó todo).
+
+        Las páginas ya terminadas en una corrida anterior no se entregan:
+        se encola directamente la siguiente (si no existe, el worker lo
+        detecta al navegar).
+        """
+        with self._cond:
+            while True:
+                while not self._queue and self._outstanding:
+                    self._cond.wait()
+                if not self._queue:
+                    return None
+                unit = self._queue.popleft()
+                if unit.page_num not in self.done_pages.get(unit.category, ()):
+                    return unit
+                self._queue.append(WorkUnit(unit.category, unit.page_num + 1))
+
+    def done(self, unit: WorkUnit) -> None:
+        with self._cond:
+            self._outstanding -= 1
+            self._cond.notify_all()
+
+    def claim(self, keys: Iterable[str]) -> set[str]:
+        """Reclama los ``data-key`` todavía libres y devuelve los obtenidos."""
+        with self._cond:
+            won = {key for key in keys if key not in self._claimed}
+            self._claimed |= won
+            return won
+
+    def template(self, category: str) -> object:
+        """Template de URL de la categoría (``UNKNOWN`` si nadie lo vio aún)."""
+        with self._cond:
+            return self._templates.get(category, UNKNOWN)
+
+    def set_template(self, category: str, template: Optional[str]) -> None:
+        with self._cond:
+            self._templates[category] = template
+
+
+def export_outputs(
+    store: ProductStore, categories: list[str], output_csv: str
+) -> dict[str, int]:
+    """
+    Exporta un CSV por categoría y el combinado (cada producto una sola vez,
+    con la columna ``categorias``). Devuelve los productos por categoría.
+    """
+    counts = {}
+    for category in categories:
+        path = category_csv_path(output_csv, category)
+        counts[category] = store.export(path, category)
+        print(f"💾 {category}: {counts[category]} productos en {path}")
+    total = store.export(output_csv, with_categories=True)
+    print(f"💾 {total} productos (sin repetir) en {output_csv}")
+    return counts
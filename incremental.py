@@ -0,0 +1,108 @@
+"""
+Actualización incremental del dataset usando la fecha "Actualizado" de cada
+producto como detector de cambios.
+
+Este módulo no depende del navegador: decide qué productos hay que pedir,
+detecta cambios sobre el HTML crudo sin parsearlo y escribe el archivo de
+delta. El recorrido del sitio está en ``run_incremental_update``
+(simple_automation.py).
+"""
+
+import json
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Iterable, Optional
+
+DATE_RE = re.compile(r"\b(\d{2}-\d{2}-\d{4})\b")
+# "Actualizado:" puede venir envuelto en tags (<b>, <strong>) antes de la fecha
+UPDATED_RE = re.compile(r"Actualizado:\s*(?:<[^>]+>\s*)*(\d{2}-\d{2}-\d{4})")
+
+
+@dataclass
+class ListingEntry:
+    """Lo que el listado dice de un producto sin abrir su modal."""
+
+    data_key: str
+    title: str = ""
+    updated: Optional[str] = None
+
+    @classmethod
+    def from_card(cls, data_key: str, title: str, card_text: str) -> "ListingEntry":
+        m = DATE_RE.search(card_text or "")
+        return cls(data_key, title, m.group(1) if m else None)
+
+
+def extract_updated(html: str) -> Optional[str]:
+    """Fecha "Actualizado" de un modal, leída con una regex (sin parsear el HTML)."""
+    m = UPDATED_RE.search(html or "")
+    return m.group(1) if m else None
+
+
+def needs_fetch(entry: ListingEntry, stored: Optional[dict[str, Any]]) -> bool:
+    """
+    True si hay que pedir el modal del producto.
+
+    Solo se evita el pedido cuando el listado informa una fecha de
+    actualización igual a la guardada; si el card no muestra fecha, la
+    comparación se hace después sobre el HTML del modal.
+    """
+    if stored is None:
+        return True
+    return entry.updated is None or entry.updated != stored.get("Actualizado")
+
+
+def is_changed(html: str, stored: Optional[dict[str, Any]]) -> bool:
+    """True si el modal es de un producto nuevo o con otra fecha "Actualizado"."""
+    if stored is None:
+        return True
+    updated = extract_updated(html)
+    return updated is None or updated != stored.get("Actualizado")
+
+
+def removed_keys(stored_keys: Iterable[str], seen_keys: Iterable[str]) -> list[str]:
+    """Productos guardados que ya no aparecen en el listado."""
+    return sorted(set(stored_keys) - set(seen_keys))
+
+
+def default_delta_path() -> str:
+    return f"delta_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+
+
+class DeltaWriter:
+    """
+    Escribe el delta como JSON Lines: una línea por producto agregado,
+    modificado o eliminado.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.counts = {"added": 0, "changed": 0, "removed": 0}
+        self._f = open(path, "w", encoding="utf-8")
+
+    def __enter__(self) -> "DeltaWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._f.close()
+
+    def write(
+        self,
+        change: str,
+        data_key: str,
+        record: Optional[dict[str, Any]] = None,
+        previous: Optional[dict[str, Any]] = None,
+    ) -> None:
+        self.counts[change] += 1
+        event = {
+            "change": change,
+            "data_key": data_key,
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "record": record,
+            "previous": previous,
+        }
+        self._f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        self._f.flush()
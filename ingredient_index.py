@@ -0,0 +1,473 @@
+"""
+Índice invertido de ingredientes y búsqueda de alérgenos/aditivos.
+
+``Ingredientes`` llega como un texto libre por producto. ``analyze`` lo
+pliega (sin tildes, en minúsculas), normaliza los códigos INS ("INS-471",
+"ins471", "E 471" -> "ins 471"), lo corta en ingredientes (comas, paréntesis,
+dos puntos, punto y coma, " y ") y recorre el texto una sola vez con un
+autómata Aho-Corasick que reconoce a la vez todos los términos de
+``GROUPS`` (gluten, edulcorantes, cafeína, ...).
+
+``IngredientIndex`` guarda en SQLite, por producto (``data_key`` del
+store), los términos resultantes: ingredientes, códigos INS, términos
+reconocidos y grupos. Las consultas ("INS 471 pero no gluten") son
+búsquedas por clave en la tabla ``postings``.
+
+Uso:
+    python ingredient_index.py --con "INS 471" --sin gluten
+    python ingredient_index.py --con edulcorante --flags contiene.csv
+"""
+
+import argparse
+import json
+import re
+import sqlite3
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+from unidecode import unidecode
+
+from product_store import ProductStore
+
+# Subir cuando cambie lo que produce ``analyze`` (se reindexa al abrir)
+INDEX_VERSION = "2"
+
+DEFAULT_INDEX = "ingredientes.sqlite"
+
+# Grupo -> términos que lo indican (ya plegados; los INS en forma "ins NNN")
+GROUPS: dict[str, tuple[str, ...]] = {
+    "gluten": (
+        "gluten",
+        "trigo",
+        "avena",
+        "cebada",
+        "centeno",
+        "malta",
+        "espelta",
+        "triticale",
+        "tacc",
+    ),
+    "leche": (
+        "leche",
+        "lactosa",
+        "lacteo",
+        "lacteos",
+        "suero de leche",
+        "caseina",
+        "caseinato",
+    ),
+    "huevo": ("huevo", "huevos", "albumina", "ovoalbumina", "yema"),
+    "soja": ("soja", "soya"),
+    "mani": ("mani", "cacahuate", "cacahuete"),
+    "edulcorante": (
+        "edulcorante",
+        "edulcorantes",
+        "sucralosa",
+        "acesulfame",
+        "acesulfame k",
+        "aspartamo",
+        "sacarina",
+        "ciclamato",
+        "stevia",
+        "estevia",
+        "esteviol",
+        "glucosidos de esteviol",
+        "neotame",
+        "ins 950",
+        "ins 951",
+        "ins 952",
+        "ins 954",
+        "ins 955",
+        "ins 960",
+        "ins 961",
+    ),
+    "cafeina": (
+        "cafeina",
+        "cafe",
+        "guarana",
+        "te verde",
+        "te negro",
+        "extracto de te",
+        "yerba mate",
+    ),
+}
+
+# Columnas "CONTIENE ..." de la planilla -> grupo
+FLAG_GROUPS = {
+    "CONTIENE EDULCORANTE": "edulcorante",
+    "CONTIENE CAFEÍNA": "cafeina",
+}
+
+# Código INS/E con sufijo de letra o romano: "ins 471", "e-322", "ins500i".
+# La "e" suelta con espacio ("E 330") solo cuenta dentro de una lista o un
+# paréntesis, y nunca después de "vitamina" ("Vitamina E 1000 UI")
+INS_RE = re.compile(
+    r"(?:\bins\s*-?\s*|(?<!vitamina )\be-?|(?:(?<=[(,;:])|(?<=[(,;:] ))e\s)"
+    r"(\d{3,4})(iv|i{1,3}|[a-d])?\b"
+)
+# Declaraciones "sin gluten" que no deben marcar el grupo
+NEGATION_RE = re.compile(r"\b(?:sin|libre de|no contiene)\s+(?:gluten|tacc)\b")
+SPLIT_RE = re.compile(r"[,;:()\[\]]|\.(?=\s|$)|\s+y\s+")
+NOISE_RE = re.compile(r"^[\d\s.,%*-]*$")
+# Código ya normalizado por ``fold_text``
+CODE_RE = re.compile(r"ins \d{3,4}[a-z]*")
+
+
+def fold_text(text: str) -> str:
+    """Sin tildes, en minúsculas y con los códigos INS normalizados."""
+    folded = " ".join(unidecode(text).lower().split())
+    return INS_RE.sub(lambda m: f"ins {m.group(1)}{m.group(2) or ''}", folded)
+
+
+class AhoCorasick:
+    """
+    Autómata de Aho-Corasick: encuentra todas las apariciones de un conjunto
+    de patrones recorriendo el texto una sola vez.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[list[str]] = [[]]
+        for pattern in patterns:
+            self._insert(pattern)
+        self._link()
+
+    def _insert(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append(pattern)
+
+    def _link(self) -> None:
+        pending = deque(self._goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, nxt in self._goto[state].items():
+                pending.append(nxt)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find(self, text: str) -> Iterator[tuple[int, str]]:
+        """Pares (posición de inicio, patrón) en orden de aparición."""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for pattern in self._out[state]:
+                yield i - len(pattern) + 1, pattern
+
+    def find_words(self, text: str) -> Iterator[tuple[int, str]]:
+        """Como ``find`` pero solo palabras completas ("te" no matchea "aceite")."""
+        for start, pattern in self.find(text):
+            end = start + len(pattern)
+            before = text[start - 1] if start else " "
+            after = text[end] if end < len(text) else " "
+            if not before.isalnum() and not after.isalnum():
+                yield start, pattern
+
+
+PATTERN_GROUPS: dict[str, set[str]] = {}
+for _group, _terms in GROUPS.items():
+    for _term in _terms:
+        PATTERN_GROUPS.setdefault(_term, set()).add(_group)
+
+MATCHER = AhoCorasick(PATTERN_GROUPS)
+
+
+@dataclass(frozen=True)
+class Analysis:
+    """Resultado de analizar el texto de ingredientes de un producto."""
+
+    tokens: tuple[str, ...]
+    codes: tuple[str, ...]
+    matches: frozenset[str]
+    groups: frozenset[str]
+
+    def terms(self) -> set[str]:
+        """Términos con los que se indexa el producto."""
+        base_codes = {re.sub(r"(\d)[a-z]+$", r"\1", code) for code in self.codes}
+        return (
+            set(self.tokens) | set(self.codes) | base_codes | self.matches | self.groups
+        )
+
+
+def tokenize(folded: str) -> tuple[list[str], list[str]]:
+    """(ingredientes, códigos INS) de un texto ya plegado, sin repetir."""
+    tokens: dict[str, None] = {}
+    codes: dict[str, None] = {}
+    for part in SPLIT_RE.split(folded):
+        for code in CODE_RE.findall(part):
+            codes[code] = None
+        part = CODE_RE.sub(" ", part)
+        part = " ".join(part.split()).strip(" .-*")
+        if part and not NOISE_RE.match(part):
+            tokens[part] = None
+    return list(tokens), list(codes)
+
+
+def analyze(ingredients: Optional[str]) -> Analysis:
+    """Tokeniza y marca grupos en una sola pasada del autómata."""
+    if not isinstance(ingredients, str) or not ingredients.strip():
+        return Analysis((), (), frozenset(), frozenset())
+    folded = fold_text(ingredients)
+    tokens, codes = tokenize(folded)
+    matches = {p for _, p in MATCHER.find_words(NEGATION_RE.sub(" ", folded))}
+    groups = {g for p in matches for g in PATTERN_GROUPS[p]}
+    return Analysis(tuple(tokens), tuple(codes), frozenset(matches), frozenset(groups))
+
+
+def contains_flags(ingredients: Optional[str]) -> dict[str, int]:
+    """Columnas "CONTIENE ..." de la planilla (0/1) para un producto."""
+    groups = analyze(ingredients).groups
+    return {column: int(group in groups) for column, group in FLAG_GROUPS.items()}
+
+
+def normalize_term(term: str) -> str:
+    """Término de consulta en la forma del índice ("INS-471" -> "ins 471")."""
+    return fold_text(term).strip(" .-*")
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    name  TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS products (
+    data_key    TEXT PRIMARY KEY,
+    ingredients TEXT NOT NULL,
+    groups      TEXT NOT NULL,
+    indexed_at  TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term     TEXT NOT NULL,
+    data_key TEXT NOT NULL,
+    PRIMARY KEY (term, data_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_key ON postings (data_key);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class IngredientIndex:
+    """
+    Índice invertido término -> productos en SQLite, seguro entre threads.
+
+    Si ``INDEX_VERSION`` cambió desde que se armó, al abrirlo se reindexa a
+    partir del texto de ingredientes guardado.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        row = self._conn.execute(
+            "SELECT value FROM meta WHERE name = 'version'"
+        ).fetchone()
+        if row is None or row[0] != INDEX_VERSION:
+            self._reindex()
+
+    def __enter__(self) -> "IngredientIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _reindex(self) -> None:
+        stored = self._conn.execute(
+            "SELECT data_key, ingredients FROM products"
+        ).fetchall()
+        self._conn.execute("DELETE FROM postings")
+        self.add_many(stored)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('version', ?)", (INDEX_VERSION,)
+            )
+            self._conn.commit()
+
+    def add(self, data_key: str, ingredients: Optional[str]) -> None:
+        self.add_many([(data_key, ingredients)])
+
+    def add_many(self, items: Iterable[tuple[str, Optional[str]]]) -> int:
+        """(Re)indexa varios productos (data_key, ingredientes) con un commit."""
+        products = []
+        postings = []
+        for data_key, ingredients in items:
+            analysis = analyze(ingredients)
+            products.append(
+                (
+                    data_key,
+                    ingredients or "",
+                    json.dumps(sorted(analysis.groups)),
+                    _now(),
+                )
+            )
+            postings += [(term, data_key) for term in analysis.terms()]
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM postings WHERE data_key = ?",
+                [(row[0],) for row in products],
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?)", products
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO postings VALUES (?, ?)", postings
+            )
+            self._conn.commit()
+        return len(products)
+
+    def remove(self, data_key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM postings WHERE data_key = ?", (data_key,))
+            self._conn.execute("DELETE FROM products WHERE data_key = ?", (data_key,))
+            self._conn.commit()
+
+    def sync(self, store: ProductStore) -> int:
+        """
+        Pone el índice al día con el store: indexa los productos nuevos o con
+        ingredientes distintos y borra los que ya no están. Devuelve cuántos
+        productos se (re)indexaron.
+        """
+        with self._lock:
+            indexed = dict(
+                self._conn.execute("SELECT data_key, ingredients FROM products")
+            )
+        current = {
+            key: record.get("Ingredientes") or "" for key, record in store.items()
+        }
+        for key in indexed.keys() - current.keys():
+            self.remove(key)
+        changed = [(k, v) for k, v in current.items() if indexed.get(k) != v]
+        return self.add_many(changed) if changed else 0
+
+    def products(self, term: str) -> set[str]:
+        """Productos que tienen el término (ingrediente, código INS o grupo)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_key FROM postings WHERE term = ?", (normalize_term(term),)
+            )
+            return {row[0] for row in rows}
+
+    def all_products(self) -> set[str]:
+        with self._lock:
+            return {
+                row[0] for row in self._conn.execute("SELECT data_key FROM products")
+            }
+
+    def query(
+        self,
+        include: Iterable[str] = (),
+        exclude: Iterable[str] = (),
+        any_of: Iterable[str] = (),
+    ) -> list[str]:
+        """
+        Productos con todos los términos de ``include``, al menos uno de
+        ``any_of`` (si se da) y ninguno de ``exclude``. Ej.:
+        ``query(include=["INS 471"], exclude=["gluten"])``.
+        """
+        include, exclude, any_of = list(include), list(exclude), list(any_of)
+        result = self.all_products() if not include else None
+        for term in include:
+            found = self.products(term)
+            result = found if result is None else result & found
+        if any_of:
+            result &= set().union(*(self.products(term) for term in any_of))
+        for term in exclude:
+            result -= self.products(term)
+        return sorted(result)
+
+    def flags(self) -> pd.DataFrame:
+        """Columnas "CONTIENE ..." de la planilla por producto."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_key, groups FROM products ORDER BY data_key"
+            ).fetchall()
+        return pd.DataFrame(
+            [
+                {
+                    "data_key": key,
+                    **{
+                        column: int(group in json.loads(groups))
+                        for column, group in FLAG_GROUPS.items()
+                    },
+                }
+                for key, groups in rows
+            ],
+            columns=["data_key", *FLAG_GROUPS],
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Busca productos por ingredientes, códigos INS o grupos."
+    )
+    parser.add_argument(
+        "--store",
+        default="productos_galletitas.sqlite",
+        help="Store de productos del scraper",
+    )
+    parser.add_argument("--index", default=DEFAULT_INDEX, help="Base del índice")
+    parser.add_argument(
+        "--con",
+        action="append",
+        default=[],
+        help="Término que debe estar (repetible): 'INS 471', 'soja', 'gluten'",
+    )
+    parser.add_argument(
+        "--sin", action="append", default=[], help="Término que no debe estar"
+    )
+    parser.add_argument(
+        "--alguno",
+        action="append",
+        default=[],
+        help="Basta con que esté uno de estos términos",
+    )
+    parser.add_argument(
+        "--flags", default=None, help="CSV con las columnas CONTIENE ... por producto"
+    )
+    args = parser.parse_args()
+
+    with ProductStore(args.store) as store, IngredientIndex(args.index) as index:
+        updated = index.sync(store)
+        keys = index.query(args.con, args.sin, args.alguno)
+        if args.flags:
+            index.flags().to_csv(args.flags, index=False, encoding="utf-8")
+        titles = {
+            key: record.get("GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)", "")
+            for key, record in store.items()
+        }
+
+    for key in keys:
+        print(f"{key}\t{titles.get(key, '')}")
+    info = {"indexed": updated, "matches": len(keys), "flags": args.flags}
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Perfil "liviano" del navegador para las corridas de scraping.
+
+El parser solo necesita el markup de los modales (y la URL de la imagen del
+producto como texto), así que el perfil corre headless y aborta con
+``context.route`` las imágenes, media, fuentes y los requests de analytics y
+publicidad. Las hojas de estilo se dejan pasar: Bootstrap las necesita para
+que el modal quede visible (``div.modal.show``).
+
+Al final de la corrida ``report()`` resume lo bloqueado por tipo y los bytes
+descargados y ahorrados. Los bytes de un request abortado no se conocen; se
+estiman con el tamaño medio por tipo de recurso (el observado en la misma
+corrida si hubo requests de ese tipo permitidos, o ``AVG_BYTES`` si no).
+"""
+
+import threading
+from typing import Any, Iterable, Optional
+from urllib.parse import urlsplit
+
+from playwright.sync_api import BrowserContext, Request, Response, Route
+
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font"})
+
+# Dominios (o fragmentos de dominio) de analytics, tags y publicidad
+BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "googlesyndication.com",
+    "googleadservices.com",
+    "doubleclick.net",
+    "adservice.google.",
+    "facebook.net",
+    "connect.facebook.",
+    "hotjar.com",
+    "clarity.ms",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.",
+    "taboola.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "quantserve.com",
+    "pubmatic.com",
+    "rubiconproject.com",
+    "onesignal.com",
+    "nr-data.net",
+)
+
+# Tamaño medio estimado (bytes) de un recurso bloqueado cuando la corrida no
+# tiene una medición propia de ese tipo
+AVG_BYTES = {
+    "image": 35_000,
+    "media": 250_000,
+    "font": 45_000,
+    "script": 30_000,
+    "xhr": 2_000,
+    "fetch": 2_000,
+    "other": 5_000,
+}
+
+
+def block_reason(
+    resource_type: str,
+    url: str,
+    allow: Iterable[str] = (),
+    block_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+    block_hosts: Iterable[str] = BLOCKED_HOSTS,
+) -> Optional[str]:
+    """
+    Motivo por el que se bloquea un request ("image", "ads", ...) o None si
+    pasa. Un request que contiene algún patrón de ``allow`` nunca se bloquea.
+    """
+    if any(pattern in url for pattern in allow):
+        return None
+    host = urlsplit(url).hostname or ""
+    if any(blocked in host for blocked in block_hosts):
+        return "ads"
+    if resource_type in block_types:
+        return resource_type
+    return None
+
+
+class LeanProfile:
+    """
+    Bloqueo de recursos y contabilidad de bytes para uno o varios contextos.
+
+    Se puede compartir entre los workers del modo paralelo: los contadores
+    están protegidos por un lock.
+    """
+
+    def __init__(
+        self,
+        allow: Iterable[str] = (),
+        block_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+        block_hosts: Iterable[str] = BLOCKED_HOSTS,
+    ):
+        self.allow = tuple(allow)
+        self.block_types = frozenset(block_types)
+        self.block_hosts = tuple(block_hosts)
+        self._lock = threading.Lock()
+        self._blocked: dict[str, dict[str, int]] = {}
+        self._loaded: dict[str, dict[str, int]] = {}
+
+    def install(self, context: BrowserContext) -> None:
+        """Registra el bloqueo y la medición en un contexto recién creado."""
+        context.route("**/*", self._handle)
+        context.on("response", self._on_response)
+
+    def _handle(self, route: Route) -> None:
+        request = route.request
+        reason = block_reason(
+            request.resource_type,
+            request.url,
+            self.allow,
+            self.block_types,
+            self.block_hosts,
+        )
+        if reason is None:
+            route.continue_()
+            return
+        with self._lock:
+            entry = self._blocked.setdefault(
+                request.resource_type, {"requests": 0, "ads": 0}
+            )
+            entry["requests"] += 1
+            entry["ads"] += reason == "ads"
+        route.abort("blockedbyclient")
+
+    def _on_response(self, response: Response) -> None:
+        request: Request = response.request
+        try:
+            size = int(response.headers.get("content-length", 0))
+        except ValueError:
+            size = 0
+        with self._lock:
+            entry = self._loaded.setdefault(
+                request.resource_type, {"requests": 0, "bytes": 0}
+            )
+            entry["requests"] += 1
+            entry["bytes"] += size
+
+    def report(self) -> dict[str, Any]:
+        """Requests bloqueados y bytes descargados/ahorrados (estimados) por tipo."""
+        with self._lock:
+            blocked = {k: dict(v) for k, v in self._blocked.items()}
+            loaded = {k: dict(v) for k, v in self._loaded.items()}
+        saved_total = 0
+        for kind, entry in blocked.items():
+            seen = loaded.get(kind)
+            if seen and seen["requests"] and seen["bytes"]:
+                avg = seen["bytes"] / seen["requests"]
+            else:
+                avg = AVG_BYTES.get(kind, AVG_BYTES["other"])
+            entry["bytes_saved_est"] = round(entry["requests"] * avg)
+            saved_total += entry["bytes_saved_est"]
+        return {
+            "requests_blocked": sum(e["requests"] for e in blocked.values()),
+            "requests_loaded": sum(e["requests"] for e in loaded.values()),
+            "bytes_loaded": sum(e["bytes"] for e in loaded.values()),
+            "bytes_saved_est": saved_total,
+            "blocked": blocked,
+            "loaded": loaded,
+        }
+
+    def print_report(self) -> dict[str, Any]:
+        report = self.report()
+        print(
+            f"🪶 Perfil liviano: {report['requests_blocked']} requests bloqueados, "
+            f"~{report['bytes_saved_est'] / 1e6:.1f} MB ahorrados, "
+            f"{report['bytes_loaded'] / 1e6:.1f} MB descargados"
+        )
+        return report
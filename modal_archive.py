@@ -0,0 +1,263 @@
+"""
+Archivo direccionado por contenido del HTML crudo de los modales.
+
+Reemplaza el volcado ``debug_modal_N.html``: cada modal se guarda una sola vez
+(clave = sha256 del HTML), comprimido con zstd si ``zstandard`` está instalado
+o gzip si no, dentro de un único archivo pack. Un índice SQLite al lado del
+pack mapea ``data-key`` + fecha de captura al blob.
+
+Uso:
+    python modal_archive.py import debug_modal_*.html
+    python modal_archive.py cat debug_modal_1
+    python modal_archive.py stats
+"""
+
+import argparse
+import gzip
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+try:
+    import zstandard
+except ImportError:  # zstd es opcional, gzip siempre está disponible
+    zstandard = None
+
+DEFAULT_ARCHIVE = "modals.pack"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256   TEXT PRIMARY KEY,
+    offset   INTEGER NOT NULL,
+    length   INTEGER NOT NULL,
+    codec    TEXT NOT NULL,
+    raw_size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entries (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    data_key   TEXT NOT NULL,
+    fetched_at TEXT NOT NULL,
+    sha256     TEXT NOT NULL REFERENCES blobs(sha256)
+);
+CREATE INDEX IF NOT EXISTS entries_key ON entries (data_key, id);
+"""
+
+
+def _compress(data: bytes) -> tuple[bytes, str]:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data), "zstd"
+    return gzip.compress(data, compresslevel=6), "gzip"
+
+
+def _decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("El blob está comprimido con zstd: instalar zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode("utf-8")).hexdigest()
+
+
+class ModalArchive:
+    """
+    Pack append-only de modales + índice SQLite (``<pack>.idx``).
+
+    Es seguro compartir una instancia entre threads.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path + ".idx", check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._pack = open(path, "a+b")
+
+    def __enter__(self) -> "ModalArchive":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._pack.close()
+            self._conn.close()
+
+    def put(self, html: str, data_key: str, fetched_at: Optional[str] = None) -> str:
+        """
+        Guarda el HTML de un modal y registra la captura para ``data_key``.
+
+        Si el mismo contenido ya estaba archivado solo se agrega la entrada
+        del índice. Devuelve el sha256 del contenido.
+        """
+        return self.put_many([(html, data_key)], fetched_at)[0]
+
+    def put_many(
+        self, items: list[tuple[str, str]], fetched_at: Optional[str] = None
+    ) -> list[str]:
+        """
+        Guarda varios (html, data_key) con un solo fsync del pack y un solo
+        commit del índice. Devuelve los sha256 en el mismo orden.
+        """
+        fetched_at = fetched_at or datetime.now(timezone.utc).isoformat(
+            timespec="seconds"
+        )
+        shas = []
+        with self._lock:
+            written = False
+            for html, data_key in items:
+                sha = content_hash(html)
+                known = self._conn.execute(
+                    "SELECT 1 FROM blobs WHERE sha256 = ?", (sha,)
+                ).fetchone()
+                if not known:
+                    raw = html.encode("utf-8")
+                    blob, codec = _compress(raw)
+                    self._pack.seek(0, os.SEEK_END)
+                    offset = self._pack.tell()
+                    self._pack.write(blob)
+                    written = True
+                    self._conn.execute(
+                        "INSERT INTO blobs VALUES (?, ?, ?, ?, ?)",
+                        (sha, offset, len(blob), codec, len(raw)),
+                    )
+                self._conn.execute(
+                    "INSERT INTO entries (data_key, fetched_at, sha256) VALUES (?, ?, ?)",
+                    (data_key, fetched_at, sha),
+                )
+                shas.append(sha)
+            if written:
+                self._pack.flush()
+                # Los blobs quedan en disco antes de que el índice los referencie
+                os.fsync(self._pack.fileno())
+            self._conn.commit()
+        return shas
+
+    def get(self, sha: str) -> str:
+        """HTML de un blob por su sha256."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT offset, length, codec FROM blobs WHERE sha256 = ?", (sha,)
+            ).fetchone()
+            if row is None:
+                raise KeyError(sha)
+            offset, length, codec = row
+            self._pack.seek(offset)
+            blob = self._pack.read(length)
+        return _decompress(blob, codec).decode("utf-8")
+
+    def latest_sha(self, data_key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256 FROM entries WHERE data_key = ? ORDER BY id DESC LIMIT 1",
+                (data_key,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def latest(self, data_key: str) -> Optional[str]:
+        """Última captura del modal de ``data_key`` (None si no está archivado)."""
+        sha = self.latest_sha(data_key)
+        return self.get(sha) if sha else None
+
+    def history(self, data_key: str) -> list[tuple[str, str]]:
+        """Capturas de un producto: lista de (fetched_at, sha256), más viejas primero."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT fetched_at, sha256 FROM entries WHERE data_key = ? ORDER BY id",
+                (data_key,),
+            ).fetchall()
+
+    def keys(self) -> list[str]:
+        """``data-key`` archivados, en orden de primera captura."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data_key FROM entries GROUP BY data_key ORDER BY MIN(id)"
+            )
+            return [row[0] for row in rows]
+
+    def iter_latest(self) -> Iterator[tuple[str, str]]:
+        """Pares (data_key, HTML) con la última captura de cada producto."""
+        for data_key in self.keys():
+            html = self.latest(data_key)
+            if html is not None:
+                yield data_key, html
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            blobs, packed, raw = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(raw_size), 0) FROM blobs"
+            ).fetchone()
+            entries, keys = self._conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT data_key) FROM entries"
+            ).fetchone()
+        return {
+            "keys": keys,
+            "entries": entries,
+            "blobs": blobs,
+            "raw_bytes": raw,
+            "packed_bytes": packed,
+        }
+
+
+def load_modal_html(name: str, archive_path: str = DEFAULT_ARCHIVE) -> str:
+    """
+    Devuelve el HTML de un modal archivado bajo ``name`` (p. ej. "debug_modal_1").
+
+    Si no hay archivo pack o no contiene esa clave, lee ``<name>.html`` del
+    directorio de trabajo, así los tests funcionan con o sin migrar.
+    """
+    if os.path.exists(archive_path):
+        with ModalArchive(archive_path) as archive:
+            html = archive.latest(name)
+        if html is not None:
+            return html
+    with open(f"{name}.html", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Archivo direccionado por contenido de los modales scrapeados."
+    )
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE, help="Archivo pack")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser(
+        "import", help="Importa archivos HTML (clave = nombre sin extensión)"
+    )
+    imp.add_argument("files", nargs="+")
+    cat = sub.add_parser("cat", help="Imprime la última captura de un data-key")
+    cat.add_argument("data_key")
+    sub.add_parser("stats", help="Resumen del archivo")
+    args = parser.parse_args()
+
+    with ModalArchive(args.archive) as archive:
+        if args.command == "import":
+            for path in args.files:
+                with open(path, "r", encoding="utf-8") as f:
+                    html = f.read()
+                fetched_at = datetime.fromtimestamp(
+                    os.path.getmtime(path), timezone.utc
+                ).isoformat(timespec="seconds")
+                key = os.path.splitext(os.path.basename(path))[0]
+                archive.put(html, key, fetched_at=fetched_at)
+            print(f"📦 {len(args.files)} archivos importados")
+            print(archive.stats())
+        elif args.command == "cat":
+            html = archive.latest(args.data_key)
+            if html is None:
+                sys.exit(f"No hay capturas para {args.data_key}")
+            print(html)
+        else:
+            print(archive.stats())
+
+
+if __name__ == "__main__":
+    main()
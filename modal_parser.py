@@ -0,0 +1,236 @@
+"""
+Parseo del HTML de un modal del vademecum a las columnas de la planilla.
+
+Hay dos backends que devuelven exactamente el mismo dict:
+
+- "lxml": una sola pasada sobre el árbol de lxml (rápido, default si lxml
+  está instalado).
+- "html.parser": BeautifulSoup con el parser de la biblioteca estándar
+  (implementación original, queda como referencia).
+
+Los resultados pasan por el cache de parseo compartido (parse_cache.py)
+cuando está configurado.
+"""
+
+import re
+from typing import Any, Optional
+
+from bs4 import BeautifulSoup
+
+from nutrient_names import resolve
+from nutrient_units import DECIMALS, conversion
+from parse_cache import ParseCache, cached
+
+try:
+    import lxml.html
+    from lxml.etree import ParserError
+except ImportError:  # sin lxml se usa siempre BeautifulSoup
+    lxml = None
+
+DEFAULT_BACKEND = "lxml" if lxml is not None else "html.parser"
+
+# Subir cuando cambie el dict que devuelve parse_modal_html (invalida el cache)
+PARSER_VERSION = "3"
+
+RESULT_TEMPLATE: dict[str, Any] = {
+    "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "",
+    "MARCA": "",
+    "DENOMINACIÓN DE VENTA": "",
+    "CANTIDAD PORCIÓN (g)": None,
+    "VALOR ENERGÉTICO (Kcal/ porción)": None,
+    "CARBOHIDRATOS (g/porción)": None,
+    "AZÚCARES TOTALES  (g/ porción)": None,
+    "AZÚCARES AÑADIDOS (g/ porción)": None,
+    "PROTEÍNAS  (g/ porción)": None,
+    "GRASAS TOTALES (g/ porción)": None,
+    "GRASAS SATURADAS (g/ porción)": None,
+    "GRASAS TRANS (g/ porción)": None,
+    "GRASAS MONOINSATURADAS (g/ porción)": None,
+    "GRASAS POLINSATURADAS (g/ porción)": None,
+    "COLESTEROL (g/ porción)": None,
+    "FIBRA ALIMENTARIA  (g/ porción)": None,
+    "SODIO  (mg/ porción)": None,
+    "Ingredientes": "",
+    "Actualizado": "",
+    "Fuente": "",
+}
+
+SPACES_RE = re.compile(r"\s+")
+PORTION_RE = re.compile(r"Porción[:\s]*(\d+)\s*g")
+NUTRIENT_RE = re.compile(
+    r"([A-Za-zÁÉÍÓÚáéíóúÑñ\s]+?)\s+(\d+(?:[.,]\d+)?)\s*(kcal|kj|mg|µg|μg|mcg|g)?",
+    re.IGNORECASE,
+)
+
+
+def _set_title(result: dict[str, Any], title: str) -> None:
+    if " - " in title:
+        name, marca = title.split(" - ", 1)
+    else:
+        # assume last word is marca
+        parts = title.rsplit(" ", 1)
+        if len(parts) == 2:
+            name, marca = parts
+        else:
+            name = title
+            marca = ""
+    result["GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)"] = name.strip()
+    result["MARCA"] = marca.strip(".").strip()
+    # Corrección de errores comunes en el HTML
+    if result["MARCA"] == "Golsfish":
+        result["MARCA"] = "Goldfish"
+
+
+def _set_paragraph_field(result: dict[str, Any], text: str) -> None:
+    """Ingredientes, Actualizado y Fuente (gana el último párrafo que coincide)."""
+    if "INGREDIENTES:" in text:
+        result["Ingredientes"] = SPACES_RE.sub(
+            " ", text.replace("INGREDIENTES:", "").strip()
+        )
+    elif "Actualizado:" in text:
+        result["Actualizado"] = text.replace("Actualizado:", "").strip()
+    elif "Fuente:" in text:
+        result["Fuente"] = text.replace("Fuente:", "").strip()
+
+
+def _set_portion(result: dict[str, Any], text: str) -> None:
+    m = PORTION_RE.search(text)
+    if m:
+        result["CANTIDAD PORCIÓN (g)"] = int(m.group(1))
+
+
+def _set_nutrient(result: dict[str, Any], left: str, right: str) -> None:
+    # normalize
+    left = SPACES_RE.sub(" ", left.strip())
+    right = SPACES_RE.sub(" ", right.strip())
+    # extract name from left, remove "de las cuales:" if present
+    name_part = left.split("de las cuales:")[0].strip()
+    m = NUTRIENT_RE.search(name_part + " " + right)
+    if not m:
+        return
+    nutrient = resolve(m.group(1))
+    if nutrient is None or nutrient.column is None:
+        return
+    val_str = m.group(2).replace(",", ".")
+    try:
+        val = float(val_str) if "." in val_str else int(val_str)
+    except Exception:
+        val = val_str
+    # a la unidad de la columna (colesterol en mg -> g, kJ -> kcal)
+    factor, _ = conversion(nutrient.name, m.group(3))
+    if factor != 1 and isinstance(val, (int, float)):
+        val = round(val * factor, DECIMALS)
+    result[nutrient.column] = val
+
+
+def _parse_with_soup(html: str) -> dict[str, Any]:
+    soup = BeautifulSoup(html, "html.parser")
+    result = dict(RESULT_TEMPLATE)
+
+    # Title
+    title_elem = soup.find("h5", class_="modal-title")
+    if title_elem:
+        _set_title(result, title_elem.get_text().strip())
+
+    # Description
+    desc_elem = soup.find("div", id="vademecum-item-content")
+    if desc_elem:
+        p = desc_elem.find("p")
+        if p:
+            result["DENOMINACIÓN DE VENTA"] = p.get_text().strip()
+
+    # Ingredientes, Actualizado, Fuente y porción
+    portion_text: Optional[str] = None
+    for p in soup.find_all("p"):
+        text = p.get_text()
+        _set_paragraph_field(result, text)
+        if portion_text is None and "Porción" in text:
+            portion_text = text
+    if portion_text is not None:
+        _set_portion(result, portion_text)
+
+    # Table
+    table = soup.find("table")
+    if table:
+        for row in table.find_all("tr"):
+            tds = row.find_all("td")
+            if len(tds) == 2:
+                _set_nutrient(result, tds[0].get_text(), tds[1].get_text())
+
+    return result
+
+
+def _has_class(el, name: str) -> bool:
+    return name in (el.get("class") or "").split()
+
+
+def _parse_with_lxml(html: str) -> dict[str, Any]:
+    result = dict(RESULT_TEMPLATE)
+    try:
+        root = lxml.html.document_fromstring(html)
+    except ParserError:
+        # Documento vacío
+        return result
+
+    title_elem = desc_elem = table = None
+    portion_text: Optional[str] = None
+
+    # Una sola pasada en orden de documento; cada elemento se visita una vez
+    for el in root.iter("h5", "div", "p", "table"):
+        tag = el.tag
+        if tag == "p":
+            text = el.text_content()
+            _set_paragraph_field(result, text)
+            if portion_text is None and "Porción" in text:
+                portion_text = text
+        elif tag == "div":
+            if desc_elem is None and el.get("id") == "vademecum-item-content":
+                desc_elem = el
+        elif tag == "h5":
+            if title_elem is None and _has_class(el, "modal-title"):
+                title_elem = el
+        elif table is None:
+            table = el
+
+    if title_elem is not None:
+        _set_title(result, title_elem.text_content().strip())
+
+    if desc_elem is not None:
+        p = next(desc_elem.iter("p"), None)
+        if p is not None:
+            result["DENOMINACIÓN DE VENTA"] = p.text_content().strip()
+
+    if portion_text is not None:
+        _set_portion(result, portion_text)
+
+    if table is not None:
+        for row in table.iter("tr"):
+            tds = list(row.iter("td"))
+            if len(tds) == 2:
+                _set_nutrient(result, tds[0].text_content(), tds[1].text_content())
+
+    return result
+
+
+def parse_modal_html(
+    html: str, backend: Optional[str] = None, cache: Optional[ParseCache] = None
+) -> dict[str, Any]:
+    """
+    Extrae nombre, marca, denominación, porción, nutrientes por porción,
+    ingredientes, fecha de actualización y fuente del HTML de un modal.
+
+    Args:
+        html: outerHTML del modal
+        backend: "lxml" o "html.parser" (default: ``DEFAULT_BACKEND``)
+        cache: cache de resultados (default: el compartido, si está configurado)
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend == "lxml":
+        parse = _parse_with_lxml
+    elif backend == "html.parser":
+        parse = _parse_with_soup
+    else:
+        raise ValueError(f"Backend de parseo desconocido: {backend}")
+    # Una entrada por backend: si compartieran la clave, la comparación de
+    # paridad y el benchmark de un backend leerían el resultado del otro
+    return cached(html, f"modal_parser[{backend}]", PARSER_VERSION, parse, cache)
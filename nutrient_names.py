@@ -0,0 +1,171 @@
+"""
+Índice canónico de nombres de nutrientes, compartido por todos los parsers.
+
+Cada rótulo de la tabla nutricional ("Valor Energético", "de las cuales
+azúcares", "Hidratos de carbono disponibles", ...) se pliega a una clave sin
+tildes, en minúsculas y sin los prefijos de subnutriente, y se busca en un
+dict armado una sola vez al importar el módulo con los nombres y alias de
+``NUTRIENTS``. Delante del índice hay un ``lru_cache``: un catálogo tiene
+unas pocas decenas de rótulos distintos, así que casi todas las celdas se
+resuelven sin plegar el texto de nuevo.
+
+Los nombres devueltos están internados (``sys.intern``): las columnas del
+long form comparten un único objeto por nutriente.
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from unidecode import unidecode
+
+
+@dataclass(frozen=True)
+class Nutrient:
+    """
+    Nutriente canónico: clave snake_case, nombre, columna de la planilla y
+    unidad en la que se expresan sus cantidades (ver ``nutrient_units``).
+    """
+
+    key: str
+    name: str
+    column: Optional[str] = None
+    unit: Optional[str] = None
+    aliases: tuple[str, ...] = ()
+
+
+def _nutrient(
+    key: str, name: str, column: Optional[str], unit: str, *aliases: str
+) -> Nutrient:
+    return Nutrient(sys.intern(key), sys.intern(name), column, unit, aliases)
+
+
+NUTRIENTS = (
+    _nutrient(
+        "valor_energetico",
+        "Valor energético",
+        "VALOR ENERGÉTICO (Kcal/ porción)",
+        "kcal",
+        "energía",
+        "valor calórico",
+    ),
+    _nutrient(
+        "carbohidratos",
+        "Carbohidratos",
+        "CARBOHIDRATOS (g/porción)",
+        "g",
+        "hidratos de carbono",
+        "hidratos de carbono disponibles",
+        "carbohidratos disponibles",
+    ),
+    _nutrient(
+        "azucares",
+        "Azúcares",
+        "AZÚCARES TOTALES  (g/ porción)",
+        "g",
+        "azúcares totales",
+    ),
+    _nutrient(
+        "azucares_anadidos",
+        "Azúcares añadidos",
+        "AZÚCARES AÑADIDOS (g/ porción)",
+        "g",
+        "azúcares agregados",
+    ),
+    _nutrient("proteinas", "Proteínas", "PROTEÍNAS  (g/ porción)", "g"),
+    _nutrient("grasas_totales", "Grasas totales", "GRASAS TOTALES (g/ porción)", "g"),
+    _nutrient(
+        "grasas_saturadas",
+        "Grasas saturadas",
+        "GRASAS SATURADAS (g/ porción)",
+        "g",
+        "ácidos grasos saturados",
+    ),
+    _nutrient(
+        "grasas_trans",
+        "Grasas trans",
+        "GRASAS TRANS (g/ porción)",
+        "g",
+        "ácidos grasos trans",
+    ),
+    _nutrient(
+        "grasas_monoinsaturadas",
+        "Grasas monoinsaturadas",
+        "GRASAS MONOINSATURADAS (g/ porción)",
+        "g",
+        "ácidos grasos monoinsaturados",
+    ),
+    _nutrient(
+        "grasas_poliinsaturadas",
+        "Grasas poliinsaturadas",
+        "GRASAS POLINSATURADAS (g/ porción)",
+        "g",
+        "grasas polinsaturadas",
+        "ácidos grasos poliinsaturados",
+    ),
+    _nutrient("colesterol", "Colesterol", "COLESTEROL (g/ porción)", "g"),
+    _nutrient(
+        "fibra",
+        "Fibra",
+        "FIBRA ALIMENTARIA  (g/ porción)",
+        "g",
+        "fibra alimentaria",
+        "fibra dietaria",
+    ),
+    _nutrient("sodio", "Sodio", "SODIO  (mg/ porción)", "mg"),
+)
+
+# Prefijos de los subnutrientes ("de las cuales azúcares") y restos del HTML
+PREFIX_RE = re.compile(
+    r"^(?:(?:de\s+l[oa]s?\s+cuales:?|margen-subnutrientes)\s*)+", re.IGNORECASE
+)
+STRIP_CHARS = " .:-"
+
+
+def fold(name: str) -> str:
+    """Clave de búsqueda: sin tildes, en minúsculas y sin prefijos."""
+    text = " ".join(unidecode(name).lower().split()).strip(STRIP_CHARS)
+    return PREFIX_RE.sub("", text)
+
+
+def _build_index() -> dict[str, Nutrient]:
+    index: dict[str, Nutrient] = {}
+    for nutrient in NUTRIENTS:
+        for alias in (nutrient.name, nutrient.key.replace("_", " "), *nutrient.aliases):
+            other = index.setdefault(fold(alias), nutrient)
+            if other is not nutrient:
+                raise ValueError(f"Alias repetido: {alias!r} ({other.key})")
+    return index
+
+
+INDEX = _build_index()
+
+
+@lru_cache(maxsize=4096)
+def resolve(name: str) -> Optional[Nutrient]:
+    """Nutriente canónico de un rótulo, o None si no es uno conocido."""
+    return INDEX.get(fold(name))
+
+
+@lru_cache(maxsize=4096)
+def canonical_name(name: str) -> str:
+    """
+    Nombre canónico del rótulo. Un nutriente desconocido (vitaminas,
+    minerales) conserva su texto limpio y con la primera letra en mayúscula.
+    """
+    nutrient = resolve(name)
+    if nutrient is not None:
+        return nutrient.name
+    base = PREFIX_RE.sub("", " ".join(name.split()).strip(STRIP_CHARS))
+    return sys.intern(base[:1].upper() + base[1:])
+
+
+@lru_cache(maxsize=4096)
+def nutrient_key(name: str) -> str:
+    """Clave snake_case ("Valor Energético" -> "valor_energetico")."""
+    nutrient = resolve(name)
+    if nutrient is not None:
+        return nutrient.key
+    return sys.intern(re.sub(r"\W+", "_", fold(name)).strip("_"))
@@ -0,0 +1,102 @@
+"""
+Unidades canónicas de las cantidades de nutrientes.
+
+Los rótulos traen la misma magnitud en distintas unidades: sodio en mg o en
+g, colesterol en mg (la planilla lo pide en g), energía en kcal o kJ, y el
+microgramo escrito con el signo micro (U+00B5) o con la mu griega (U+03BC).
+Este módulo lleva cada cantidad a la unidad canónica de su nutriente
+(``Nutrient.unit`` en ``nutrient_names``) para que el wide form tenga una
+sola columna por nutriente.
+
+La conversión es vectorizada: se calcula un factor por cada par distinto
+(nutriente, unidad), que son pocos, y se aplica a todo el array de una vez.
+Los nutrientes sin unidad canónica (vitaminas, minerales) solo normalizan la
+grafía de la unidad.
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from nutrient_names import resolve
+
+MICRO_SIGN = "µ"
+GREEK_MU = "μ"
+
+# Grafías de una misma unidad (en minúsculas, con el signo micro)
+UNIT_ALIASES = {
+    "g": "g",
+    "gr": "g",
+    "grs": "g",
+    "mg": "mg",
+    "µg": "µg",
+    "ug": "µg",
+    "mcg": "µg",
+    "kcal": "kcal",
+    "kj": "kJ",
+    "%": "%",
+}
+
+# Unidad -> (magnitud, valor en la unidad base de la magnitud)
+SCALES = {
+    "g": ("masa", 1.0),
+    "mg": ("masa", 1e-3),
+    "µg": ("masa", 1e-6),
+    "kcal": ("energía", 1.0),
+    "kJ": ("energía", 1 / 4.184),
+}
+
+# Decimales que se conservan al convertir (evita 0.18000000000000002)
+DECIMALS = 9
+
+
+def normalize_unit(unit: Optional[str]) -> Optional[str]:
+    """Grafía canónica de una unidad ("Mg" -> "mg", "μg" -> "µg", "KJ" -> "kJ")."""
+    if not isinstance(unit, str):
+        return unit
+    text = unit.strip().replace(GREEK_MU, MICRO_SIGN)
+    return UNIT_ALIASES.get(text.lower(), text)
+
+
+def conversion(name: str, unit: Optional[str]) -> tuple[float, Optional[str]]:
+    """
+    (factor, unidad destino) para una cantidad de ``name`` expresada en
+    ``unit``. Si la unidad no es convertible a la canónica del nutriente, el
+    factor es 1 y queda la unidad original normalizada.
+    """
+    source = normalize_unit(unit)
+    nutrient = resolve(name) if isinstance(name, str) else None
+    target = nutrient.unit if nutrient is not None else None
+    if target is None or source not in SCALES or target not in SCALES:
+        return 1.0, source
+    (dim_from, scale_from), (dim_to, scale_to) = SCALES[source], SCALES[target]
+    if dim_from != dim_to:
+        return 1.0, source
+    return scale_from / scale_to, target
+
+
+def to_canonical(
+    names: Sequence, units: Sequence, amounts: Sequence
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Convierte ``amounts`` a la unidad canónica de cada nutriente. Devuelve
+    (cantidades float, unidades) como arrays del mismo largo.
+    """
+    name_codes, name_uniques = pd.factorize(np.asarray(names, dtype=object))
+    unit_codes, unit_uniques = pd.factorize(np.asarray(units, dtype=object))
+    # un código por par (nutriente, unidad); -1 (faltante) queda como par propio
+    pair = (name_codes + 1) * (len(unit_uniques) + 1) + (unit_codes + 1)
+    pair_codes, pair_uniques = pd.factorize(pair)
+
+    factors = np.empty(len(pair_uniques))
+    targets = np.empty(len(pair_uniques), dtype=object)
+    for i, code in enumerate(pair_uniques):
+        n, u = divmod(int(code), len(unit_uniques) + 1)
+        name = name_uniques[n - 1] if n else None
+        unit = unit_uniques[u - 1] if u else None
+        factors[i], targets[i] = conversion(name, unit)
+
+    values = pd.to_numeric(pd.Series(amounts), errors="coerce").to_numpy(float)
+    converted = np.round(values * factors[pair_codes], DECIMALS)
+    return converted, targets[pair_codes]
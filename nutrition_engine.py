@@ -0,0 +1,270 @@
+"""
+Valores cada 100 g y sellos de advertencia del dataset parseado.
+
+``parse_modal_html`` solo informa valores por porción y la porción en
+gramos. La planilla de destino además tiene una columna "(g/ 100 g)" por
+cada nutriente y los sellos "EXCESO EN ..." del etiquetado frontal (Ley
+27.642). Este módulo los calcula para todo el dataset de una vez: los
+nutrientes se apilan en una matriz (productos x nutrientes) y tanto la
+conversión a 100 g como cada criterio son operaciones de NumPy sobre
+columnas enteras, sin loops por producto.
+
+Los umbrales por defecto son los del modelo de perfil de nutrientes de la
+OPS que adopta la ley para alimentos sólidos (``Thresholds``); se pueden
+cambiar para otras etapas o normativas. Un criterio que no se puede evaluar
+porque falta un dato (porción, energía o el nutriente) no genera sello.
+
+Uso:
+    python nutrition_engine.py productos_galletitas.csv -o productos_100g.csv
+    python nutrition_engine.py productos.parquet -o productos_100g.parquet \\
+        --threshold kcal_100g=300 --threshold sodium_mg_100g=500
+"""
+
+import argparse
+import json
+from dataclasses import asdict, dataclass, fields, replace
+
+import numpy as np
+import pandas as pd
+
+import columnar
+
+PORTION_COLUMN = "CANTIDAD PORCIÓN (g)"
+
+# Columna por porción -> columna cada 100 g (nombres de la planilla)
+PER_100G_COLUMNS = {
+    "VALOR ENERGÉTICO (Kcal/ porción)": "VALOR ENERGÉTICO (Kcal/ 100 g)",
+    "CARBOHIDRATOS (g/porción)": "CARBOHIDRATOS (g/ 100 g)",
+    "AZÚCARES TOTALES  (g/ porción)": "AZÚCARES TOTALES  (g/ 100 g)",
+    "AZÚCARES AÑADIDOS (g/ porción)": "AZÚCARES AÑADIDOS (g/ 100 g)",
+    "PROTEÍNAS  (g/ porción)": "PROTEÍNAS  (g/ 100 g)",
+    "GRASAS TOTALES (g/ porción)": "GRASAS TOTALES (g/ 100 g)",
+    "GRASAS SATURADAS (g/ porción)": "GRASAS SATURADAS (g/ 100 g)",
+    "GRASAS TRANS (g/ porción)": "GRASAS TRANS (g/ 100 g)",
+    "GRASAS MONOINSATURADAS (g/ porción)": "GRASAS MONOINSATURADAS (g/ 100 g)",
+    "GRASAS POLINSATURADAS (g/ porción)": "GRASAS POLINSATURADAS (g/ 100 g)",
+    "COLESTEROL (g/ porción)": "COLESTEROL (g/ 100 g)",
+    "FIBRA ALIMENTARIA  (g/ porción)": "FIBRA ALIMENTARIA  (g/ 100 g)",
+    "SODIO  (mg/ porción)": "SODIO  (mg/ 100 g)",
+}
+PORTION_COLUMNS = list(PER_100G_COLUMNS)
+
+# Sellos, con los nombres (y el espacio final) de la planilla
+FLAG_COLUMNS = [
+    "EXCESO DE AZÚCARES",
+    "EXCESO EN GRASAS TOTALES ",
+    "EXCESO EN GRASAS SATURADAS",
+    "EXCESO EN SODIO",
+    "EXCESO EN CALORÍAS",
+]
+
+# kcal por gramo (factores de Atwater)
+KCAL_PER_G = {"carbs": 4.0, "protein": 4.0, "fat": 9.0, "sugar": 4.0}
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    """
+    Umbrales de los sellos. Los ``*_energy_pct`` son el porcentaje de la
+    energía total que aporta el nutriente; los ``*_100g`` son por 100 g de
+    producto. ``sodium_mg_per_kcal`` y ``sodium_mg_100g`` se combinan con "o".
+    """
+
+    sugars_energy_pct: float = 10.0
+    fats_energy_pct: float = 30.0
+    saturated_energy_pct: float = 10.0
+    sodium_mg_per_kcal: float = 1.0
+    sodium_mg_100g: float = 300.0
+    kcal_100g: float = 275.0
+
+
+DEFAULT_THRESHOLDS = Thresholds()
+
+
+def parse_threshold(value: str) -> tuple[str, float]:
+    """Interpreta ``--threshold nombre=valor``."""
+    name, sep, number = value.partition("=")
+    names = {f.name for f in fields(Thresholds)}
+    if not sep or name.strip() not in names:
+        raise argparse.ArgumentTypeError(
+            f"Se espera nombre=valor con nombre en {sorted(names)}"
+        )
+    try:
+        return name.strip(), float(number)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Valor no numérico: {number!r}")
+
+
+def nutrient_matrix(df: pd.DataFrame) -> np.ndarray:
+    """
+    Matriz float (productos x ``PORTION_COLUMNS``). Lo que no es número
+    ("", None, texto) y las columnas que faltan quedan en NaN.
+    """
+    matrix = np.full((len(df), len(PORTION_COLUMNS)), np.nan)
+    for j, col in enumerate(PORTION_COLUMNS):
+        if col in df.columns:
+            matrix[:, j] = pd.to_numeric(df[col], errors="coerce").to_numpy(float)
+    return matrix
+
+
+def per_100g(matrix: np.ndarray, portion: np.ndarray) -> np.ndarray:
+    """Escala cada fila a 100 g (NaN si la porción falta o no es positiva)."""
+    factor = np.full(len(portion), np.nan)
+    np.divide(100.0, portion, out=factor, where=portion > 0)
+    return matrix * factor[:, None]
+
+
+def _ratio(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    out = np.full(len(num), np.nan)
+    np.divide(num, den, out=out, where=den > 0)
+    return out
+
+
+def total_fat(matrix: np.ndarray) -> np.ndarray:
+    """
+    Grasas totales o, si faltan, las saturadas (una cota inferior: las
+    totales nunca son menos que las saturadas).
+    """
+    col = PORTION_COLUMNS.index
+    return np.fmax(
+        matrix[:, col("GRASAS TOTALES (g/ porción)")],
+        matrix[:, col("GRASAS SATURADAS (g/ porción)")],
+    )
+
+
+def energy_kcal(matrix: np.ndarray) -> np.ndarray:
+    """
+    Energía declarada o, si falta, la estimada con Atwater a partir de los
+    carbohidratos, proteínas y grasas (``total_fat``) que estén informados.
+    Sin energía ni ningún macronutriente queda en NaN.
+    """
+    col = PORTION_COLUMNS.index
+    declared = matrix[:, col("VALOR ENERGÉTICO (Kcal/ porción)")]
+    macros = np.column_stack(
+        [
+            KCAL_PER_G["carbs"] * matrix[:, col("CARBOHIDRATOS (g/porción)")],
+            KCAL_PER_G["protein"] * matrix[:, col("PROTEÍNAS  (g/ porción)")],
+            KCAL_PER_G["fat"] * total_fat(matrix),
+        ]
+    )
+    missing = np.isnan(macros).all(axis=1)
+    estimated = np.where(missing, np.nan, np.nansum(macros, axis=1))
+    return np.where(np.isnan(declared), estimated, declared)
+
+
+def excess_flags(
+    matrix: np.ndarray,
+    per100: np.ndarray,
+    thresholds: Thresholds = DEFAULT_THRESHOLDS,
+) -> np.ndarray:
+    """
+    Sellos (productos x ``FLAG_COLUMNS``) como 0/1. Los criterios por
+    porcentaje de energía son cocientes, así que se evalúan por porción y no
+    dependen de conocer la porción en gramos.
+    """
+    col = PORTION_COLUMNS.index
+    kcal = energy_kcal(matrix)
+    sugars = matrix[:, col("AZÚCARES AÑADIDOS (g/ porción)")]
+    fats = total_fat(matrix)
+    saturated = matrix[:, col("GRASAS SATURADAS (g/ porción)")]
+    sodium = matrix[:, col("SODIO  (mg/ porción)")]
+    sodium_100g = per100[:, col("SODIO  (mg/ porción)")]
+    kcal_100g = energy_kcal(per100)
+
+    def pct(grams: np.ndarray, kcal_per_g: float) -> np.ndarray:
+        return 100.0 * _ratio(grams * kcal_per_g, kcal)
+
+    # Las comparaciones con NaN dan False: un dato faltante no genera sello
+    with np.errstate(invalid="ignore"):
+        flags = np.column_stack(
+            [
+                pct(sugars, KCAL_PER_G["sugar"]) >= thresholds.sugars_energy_pct,
+                pct(fats, KCAL_PER_G["fat"]) >= thresholds.fats_energy_pct,
+                pct(saturated, KCAL_PER_G["fat"]) >= thresholds.saturated_energy_pct,
+                (_ratio(sodium, kcal) >= thresholds.sodium_mg_per_kcal)
+                | (sodium_100g >= thresholds.sodium_mg_100g),
+                kcal_100g >= thresholds.kcal_100g,
+            ]
+        )
+    return flags.astype(np.int8)
+
+
+def enrich(
+    df: pd.DataFrame, thresholds: Thresholds = DEFAULT_THRESHOLDS
+) -> pd.DataFrame:
+    """
+    Devuelve una copia de ``df`` con cada columna "(.../ 100 g)" a
+    continuación de su columna por porción y los sellos después del último
+    nutriente, como en la planilla. Las columnas ya existentes con esos
+    nombres se recalculan.
+    """
+    matrix = nutrient_matrix(df)
+    portion = (
+        pd.to_numeric(df[PORTION_COLUMN], errors="coerce").to_numpy(float)
+        if PORTION_COLUMN in df.columns
+        else np.full(len(df), np.nan)
+    )
+    per100 = per_100g(matrix, portion)
+    flags = excess_flags(matrix, per100, thresholds)
+
+    computed = {
+        **{PER_100G_COLUMNS[c]: per100[:, j] for j, c in enumerate(PORTION_COLUMNS)},
+        **{c: flags[:, j] for j, c in enumerate(FLAG_COLUMNS)},
+    }
+    base = [c for c in df.columns if c not in computed]
+    order: list[str] = []
+    for c in base:
+        order.append(c)
+        if c in PER_100G_COLUMNS:
+            order.append(PER_100G_COLUMNS[c])
+    # columnas cada 100 g de nutrientes que no vinieron en la entrada
+    order += [c for c in PER_100G_COLUMNS.values() if c not in order]
+    last = max(order.index(c) for c in PER_100G_COLUMNS.values())
+    order[last + 1 : last + 1] = FLAG_COLUMNS
+
+    out = df[base].copy()
+    for name, values in computed.items():
+        out[name] = values
+    return out[order]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Agrega los valores cada 100 g y los sellos de advertencia."
+    )
+    parser.add_argument("input", help="Dataset parseado (.csv o .parquet)")
+    parser.add_argument(
+        "-o", "--output", default="productos_100g.csv", help="Salida .csv o .parquet"
+    )
+    parser.add_argument(
+        "--threshold",
+        action="append",
+        type=parse_threshold,
+        default=[],
+        metavar="NOMBRE=VALOR",
+        help=f"Cambia un umbral (default: {asdict(DEFAULT_THRESHOLDS)})",
+    )
+    args = parser.parse_args()
+    thresholds = replace(DEFAULT_THRESHOLDS, **dict(args.threshold))
+
+    if columnar.is_parquet(args.input):
+        df = columnar.read_table(args.input)
+    else:
+        df = pd.read_csv(args.input)
+    out = enrich(df, thresholds)
+    if columnar.is_parquet(args.output):
+        columnar.write_table(out, args.output)
+    else:
+        out.to_csv(args.output, index=False, encoding="utf-8")
+
+    info = {
+        "output": args.output,
+        "products": len(out),
+        "flags": {c: int(out[c].sum()) for c in FLAG_COLUMNS},
+        "thresholds": asdict(thresholds),
+    }
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
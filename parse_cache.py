@@ -0,0 +1,258 @@
+"""
+Cache persistente de resultados de parseo.
+
+La clave es (sha256 del HTML, nombre del parser, versión del parser): si el
+HTML no cambió y el parser tampoco, el resultado se lee de disco sin construir
+ningún árbol HTML. Cuando cambia la salida de un parser hay que subir su
+``PARSER_VERSION`` y las entradas viejas dejan de usarse solas.
+
+El cache es una base SQLite con tamaño acotado (desalojo LRU). Se activa para
+todo el proceso con ``configure(path)`` o con la variable de entorno
+``NUTRINFO_PARSE_CACHE``; así lo comparten el scraper, clean_nutrition.py,
+reparse.py (incluidos sus procesos worker) y los benchmarks.
+"""
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional
+
+ENV_VAR = "NUTRINFO_PARSE_CACHE"
+DEFAULT_PATH = ".parse_cache.sqlite"
+DEFAULT_MAX_ENTRIES = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key       TEXT PRIMARY KEY,
+    parser    TEXT NOT NULL,
+    value     TEXT NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_lru ON cache (last_used);
+"""
+
+
+def cache_key(html: str, parser: str, version: str) -> str:
+    digest = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    return f"{parser}:{version}:{digest}"
+
+
+class ParseCache:
+    """
+    Cache LRU en SQLite para resultados serializables a JSON.
+
+    Un hit es solo una lectura: el ``last_used`` se anota en memoria. Las
+    entradas nuevas también esperan en memoria y se escriben, junto con los
+    ``last_used``, en una transacción corta cuando se juntan ``commit_every``
+    o pasan ``commit_interval_s`` desde la última escritura, y al cerrar. Así
+    ningún proceso retiene el lock de escritura entre documentos y los
+    workers de reparse.py no se traban entre sí.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        commit_every: int = 500,
+        commit_interval_s: float = 1.0,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.commit_every = commit_every
+        self.commit_interval_s = commit_interval_s
+        self.hits = 0
+        self.misses = 0
+        # key -> (parser, valor JSON); key -> last_used
+        self._writes: dict[str, tuple[str, str]] = {}
+        self._touched: dict[str, int] = {}
+        self._last_write = time.monotonic()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self) -> "ParseCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._write()
+            self._conn.close()
+
+    def get(self, html: str, parser: str, version: str) -> Optional[Any]:
+        key = cache_key(html, parser, version)
+        with self._lock:
+            pending = self._writes.get(key)
+            if pending is not None:
+                value = pending[1]
+            else:
+                row = self._conn.execute(
+                    "SELECT value FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                value = row[0]
+            self.hits += 1
+            self._touched[key] = time.time_ns()
+        return json.loads(value)
+
+    def put(self, html: str, parser: str, version: str, value: Any) -> None:
+        key = cache_key(html, parser, version)
+        with self._lock:
+            self._writes[key] = (parser, json.dumps(value, ensure_ascii=False))
+            self._touched[key] = time.time_ns()
+            self._maybe_write()
+
+    def get_or_compute(
+        self, html: str, parser: str, version: str, compute: Callable[[str], Any]
+    ) -> Any:
+        """Devuelve el resultado cacheado o lo calcula con ``compute(html)`` y lo guarda."""
+        value = self.get(html, parser, version)
+        if value is None:
+            value = compute(html)
+            self.put(html, parser, version, value)
+        return value
+
+    def __len__(self) -> int:
+        """Entradas en disco, contando las que todavía esperan en memoria."""
+        with self._lock:
+            self._write()
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def _maybe_write(self) -> None:
+        elapsed = time.monotonic() - self._last_write
+        if len(self._writes) >= self.commit_every or elapsed >= self.commit_interval_s:
+            self._write()
+
+    def _write(self) -> None:
+        """Escribe lo pendiente y desaloja en una sola transacción corta."""
+        self._last_write = time.monotonic()
+        if not self._writes and not self._touched:
+            return
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)",
+                [
+                    (key, parser, value, self._touched.get(key, time.time_ns()))
+                    for key, (parser, value) in self._writes.items()
+                ],
+            )
+            self._conn.executemany(
+                "UPDATE cache SET last_used = ? WHERE key = ?",
+                [
+                    (used, key)
+                    for key, used in self._touched.items()
+                    if key not in self._writes
+                ],
+            )
+            self._evict()
+        self._writes.clear()
+        self._touched.clear()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            # Libera un 10 % extra para no desalojar en cada commit
+            excess += self.max_entries // 10
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def flush(self) -> None:
+        """Escribe las entradas y los ``last_used`` pendientes y desaloja."""
+        with self._lock:
+            self._write()
+
+
+_default: Optional[ParseCache] = None
+_default_pid: Optional[int] = None
+
+
+def configure(path: Optional[str] = DEFAULT_PATH) -> None:
+    """
+    Activa (o con ``None`` desactiva) el cache compartido del proceso.
+
+    La ruta se exporta en ``NUTRINFO_PARSE_CACHE`` para que la hereden los
+    procesos hijos.
+    """
+    global _default, _default_pid
+    if _default is not None and _default_pid == os.getpid():
+        _default.close()
+    _default = _default_pid = None
+    if path:
+        os.environ[ENV_VAR] = path
+    else:
+        os.environ.pop(ENV_VAR, None)
+
+
+@contextmanager
+def disabled() -> Iterator[None]:
+    """
+    Desactiva el cache compartido mientras dura el bloque, sin cerrarlo: al
+    salir quedan la variable de entorno y la conexión que había.
+    """
+    global _default, _default_pid
+    saved = os.environ.pop(ENV_VAR, None), _default, _default_pid
+    _default = _default_pid = None
+    try:
+        yield
+    finally:
+        path, _default, _default_pid = saved
+        if path is not None:
+            os.environ[ENV_VAR] = path
+
+
+def default_cache() -> Optional[ParseCache]:
+    """Cache compartido del proceso, o None si no está configurado."""
+    global _default, _default_pid
+    path = os.environ.get(ENV_VAR)
+    if not path:
+        return None
+    if _default is None or _default_pid != os.getpid():
+        # Una conexión SQLite no se puede heredar entre procesos
+        _default = ParseCache(path)
+        _default_pid = os.getpid()
+        atexit.register(flush_default)
+    return _default
+
+
+def flush_default() -> None:
+    """
+    Confirma lo pendiente del cache compartido.
+
+    Los procesos worker de multiprocessing no corren ``atexit``: tienen que
+    llamarla al terminar cada tarea.
+    """
+    if _default is not None and _default_pid == os.getpid():
+        try:
+            _default.flush()
+        except sqlite3.ProgrammingError:
+            # ya estaba cerrado
+            pass
+
+
+def cached(
+    html: str,
+    parser: str,
+    version: str,
+    compute: Callable[[str], Any],
+    cache: Optional[ParseCache] = None,
+) -> Any:
+    """Aplica ``compute`` pasando por ``cache`` (o el compartido, si hay uno)."""
+    cache = cache if cache is not None else default_cache()
+    if cache is None:
+        return compute(html)
+    return cache.get_or_compute(html, parser, version, compute)
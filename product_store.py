@@ -0,0 +1,303 @@
+"""
+Almacenamiento persistente de productos scrapeados (SQLite).
+
+Cada producto se guarda apenas se parsea, indexado por su ``data-key``, y se
+registra qué páginas del listado quedaron completas. Así un crawl que se
+corta puede retomarse sin repetir trabajo (ver ``--resume`` en
+simple_automation.py).
+
+Un producto se guarda una sola vez aunque aparezca en varias categorías; la
+tabla ``memberships`` registra en qué categorías (y en qué posición del
+listado de cada una) figura, para exportar un CSV por categoría.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import pandas as pd
+
+import columnar
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    data_key   TEXT PRIMARY KEY,
+    category   TEXT NOT NULL DEFAULT '',
+    page_num   INTEGER NOT NULL,
+    position   INTEGER NOT NULL,
+    record     TEXT NOT NULL,
+    scraped_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    category    TEXT NOT NULL,
+    page_num    INTEGER NOT NULL,
+    finished_at TEXT NOT NULL,
+    PRIMARY KEY (category, page_num)
+);
+CREATE TABLE IF NOT EXISTS memberships (
+    data_key TEXT NOT NULL,
+    category TEXT NOT NULL,
+    page_num INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (data_key, category)
+);
+"""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+class ProductStore:
+    """
+    Store de productos respaldado por SQLite, seguro para usar desde varios
+    threads (los workers del modo paralelo comparten una instancia).
+    """
+
+    def __init__(self, path: str = "productos_galletitas.sqlite"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+
+    def __enter__(self) -> "ProductStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def add(
+        self,
+        data_key: str,
+        record: dict[str, Any],
+        page_num: int,
+        position: int,
+        category: str = "",
+    ) -> None:
+        """Guarda (o reemplaza) un producto y hace commit inmediatamente."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    data_key,
+                    category,
+                    page_num,
+                    position,
+                    json.dumps(record, ensure_ascii=False),
+                    _now(),
+                ),
+            )
+            self._conn.commit()
+
+    def add_many(self, rows: list[tuple[str, dict[str, Any], int, int, str]]) -> None:
+        """
+        Guarda varios productos (data_key, producto, página, posición,
+        categoría) con un solo commit.
+        """
+        scraped_at = _now()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO products VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        data_key,
+                        category,
+                        page_num,
+                        position,
+                        json.dumps(record, ensure_ascii=False),
+                        scraped_at,
+                    )
+                    for data_key, record, page_num, position, category in rows
+                ],
+            )
+            self._conn.commit()
+
+    def remove(self, data_key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM products WHERE data_key = ?", (data_key,))
+            self._conn.execute(
+                "DELETE FROM memberships WHERE data_key = ?", (data_key,)
+            )
+            self._conn.commit()
+
+    def add_memberships(self, category: str, page_num: int, keys: list[str]) -> None:
+        """Registra que los ``keys`` (en ese orden) figuran en una página de ``category``."""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO memberships VALUES (?, ?, ?, ?)",
+                [(key, category, page_num, pos) for pos, key in enumerate(keys)],
+            )
+            self._conn.commit()
+
+    def categories_by_key(self) -> dict[str, list[str]]:
+        """Categorías en las que figura cada producto (la de ``add`` incluida)."""
+        query = """
+            SELECT data_key, category FROM products WHERE category != ''
+            UNION
+            SELECT data_key, category FROM memberships
+            ORDER BY data_key, category
+        """
+        result: dict[str, list[str]] = {}
+        with self._lock:
+            for key, category in self._conn.execute(query):
+                result.setdefault(key, []).append(category)
+        return result
+
+    def get(self, data_key: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM products WHERE data_key = ?", (data_key,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def category_of(self, data_key: str) -> Optional[str]:
+        """Categoría con la que se guardó el producto (None si no está)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT category FROM products WHERE data_key = ?", (data_key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def keys(self, category: Optional[str] = None) -> set[str]:
+        query = "SELECT data_key FROM products"
+        params: tuple = ()
+        if category is not None:
+            query += " WHERE category = ?"
+            params = (category,)
+        with self._lock:
+            return {row[0] for row in self._conn.execute(query, params)}
+
+    def listing_keys(self, *categories: str) -> set[str]:
+        """
+        Productos que figuran en el listado de alguna de ``categories``: los
+        guardados con esa categoría y los que tienen una membership en ella.
+        """
+        marks = ", ".join("?" * len(categories))
+        query = f"""
+            SELECT data_key FROM products WHERE category IN ({marks})
+            UNION
+            SELECT data_key FROM memberships WHERE category IN ({marks})
+        """
+        with self._lock:
+            return {row[0] for row in self._conn.execute(query, categories * 2)}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    def mark_page_done(self, page_num: int, category: str = "") -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?)",
+                (category, page_num, _now()),
+            )
+            self._conn.commit()
+
+    def finished_pages(self, category: str = "") -> set[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT page_num FROM pages WHERE category = ?", (category,)
+            )
+            return {row[0] for row in rows}
+
+    def last_finished_page(self, category: str = "") -> int:
+        """
+        Última página completa de un tramo contiguo desde la página 1
+        (0 si todavía no terminó ninguna).
+        """
+        finished = self.finished_pages(category)
+        page_num = 0
+        while page_num + 1 in finished:
+            page_num += 1
+        return page_num
+
+    def reset_pages(self, category: str = "") -> None:
+        """Olvida el progreso por páginas (los productos se conservan)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE category = ?", (category,))
+            self._conn.commit()
+
+    def records(self, category: Optional[str] = None) -> list[dict[str, Any]]:
+        """Productos guardados en el orden del listado (página, posición)."""
+        return [record for _, record in self.items(category)]
+
+    def items(self, category: Optional[str] = None) -> list[tuple[str, dict[str, Any]]]:
+        """
+        Pares (data_key, producto) en el orden del listado.
+
+        Con ``category`` incluye también los productos guardados desde otra
+        categoría que figuran en esta, en su posición dentro de esta.
+        """
+        query = "SELECT data_key, record FROM products ORDER BY page_num, position"
+        params: tuple = ()
+        if category is not None:
+            query = """
+                SELECT p.data_key, p.record FROM products p
+                LEFT JOIN memberships m
+                    ON m.data_key = p.data_key AND m.category = ?
+                WHERE p.category = ? OR m.data_key IS NOT NULL
+                ORDER BY COALESCE(m.page_num, p.page_num),
+                         COALESCE(m.position, p.position)
+            """
+            params = (category, category)
+        with self._lock:
+            return [
+                (row[0], json.loads(row[1]))
+                for row in self._conn.execute(query, params)
+            ]
+
+    def export_csv(
+        self,
+        path: str,
+        category: Optional[str] = None,
+        with_categories: bool = False,
+    ) -> int:
+        """
+        Exporta los productos a CSV con el ``data_key`` como primera columna.
+
+        Con ``with_categories`` agrega la columna ``categorias`` (separadas
+        por "|"), útil en el CSV combinado de varias categorías.
+        """
+        df = self.frame(category, with_categories)
+        df.to_csv(path, index=False, encoding="utf-8")
+        return len(df)
+
+    def export_parquet(
+        self,
+        path: str,
+        category: Optional[str] = None,
+        with_categories: bool = False,
+    ) -> int:
+        """Igual que ``export_csv`` pero a Parquet (tabla de productos tipada)."""
+        df = self.frame(category, with_categories)
+        columnar.write_table(df, path)
+        return len(df)
+
+    def export(
+        self,
+        path: str,
+        category: Optional[str] = None,
+        with_categories: bool = False,
+    ) -> int:
+        """Exporta a Parquet si ``path`` termina en .parquet, si no a CSV."""
+        if columnar.is_parquet(path):
+            return self.export_parquet(path, category, with_categories)
+        return self.export_csv(path, category, with_categories)
+
+    def frame(
+        self, category: Optional[str] = None, with_categories: bool = False
+    ) -> pd.DataFrame:
+        rows = [{"data_key": key, **record} for key, record in self.items(category)]
+        if with_categories:
+            by_key = self.categories_by_key()
+            for row in rows:
+                row["categorias"] = "|".join(by_key.get(row["data_key"], []))
+        return pd.DataFrame(rows)
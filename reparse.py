@@ -0,0 +1,245 @@
+"""
+Re-parseo en lote del HTML de modales ya guardados, sin volver a scrapear.
+
+Reparte los documentos en un ProcessPoolExecutor (en chunks) y va escribiendo
+los resultados a CSV o Parquet en el mismo orden de entrada. Los errores de
+cada archivo quedan en la columna ``_error`` en lugar de cortar la corrida.
+
+Uso:
+    python reparse.py "debug_modal_*.html" -o productos_reparse.csv
+    python reparse.py carpeta_con_modales/ -o productos.parquet --workers 8
+    python reparse.py --archive modals.pack -o productos.csv
+    python reparse.py --parse-cache .parse_cache.sqlite -o productos.csv
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator, Optional
+
+import columnar
+import parse_cache
+from modal_archive import ModalArchive
+from modal_parser import DEFAULT_BACKEND, RESULT_TEMPLATE, parse_modal_html
+
+COLUMNS = ["_source"] + list(RESULT_TEMPLATE) + ["_error"]
+# Columnas numéricas de la planilla (las que arrancan en None)
+NUMERIC_COLUMNS = [k for k, v in RESULT_TEMPLATE.items() if v is None]
+
+# (origen, ruta del archivo o None, HTML o None)
+WorkItem = tuple[str, Optional[str], Optional[str]]
+
+
+def natural_key(path: str) -> list:
+    """Orden natural: debug_modal_2 antes que debug_modal_10."""
+    return [int(t) if t.isdigit() else t for t in re.split(r"(\d+)", path)]
+
+
+def expand_inputs(inputs: Iterable[str]) -> list[str]:
+    """Expande directorios y globs a una lista ordenada y sin duplicados."""
+    files: set[str] = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            files.update(glob.glob(os.path.join(item, "*.html")))
+        else:
+            matches = glob.glob(item)
+            files.update(matches if matches else [item])
+    return sorted(files, key=natural_key)
+
+
+def parse_item(item: WorkItem, backend: str = DEFAULT_BACKEND) -> dict[str, Any]:
+    """Parsea un documento; nunca lanza excepciones (se devuelven en ``_error``)."""
+    source, path, html = item
+    row: dict[str, Any] = {"_source": source}
+    try:
+        if html is None:
+            with open(path, "r", encoding="utf-8") as f:
+                html = f.read()
+        row.update(parse_modal_html(html, backend=backend))
+        row["_error"] = ""
+    except Exception as e:
+        row["_error"] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def _parse_chunk(items: list[WorkItem], backend: str) -> list[dict[str, Any]]:
+    rows = [parse_item(item, backend) for item in items]
+    # Los workers no corren atexit: se confirma el cache en cada chunk
+    parse_cache.flush_default()
+    return rows
+
+
+def _chunks(items: Iterable[WorkItem], size: int) -> Iterator[list[WorkItem]]:
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def parse_all(
+    items: Iterable[WorkItem],
+    workers: Optional[int] = None,
+    chunksize: int = 32,
+    backend: str = DEFAULT_BACKEND,
+) -> Iterator[dict[str, Any]]:
+    """
+    Parsea ``items`` en paralelo y devuelve los resultados en el orden de entrada.
+
+    Como mucho ``2 * workers`` chunks están en vuelo a la vez, así la memoria
+    no depende de la cantidad de documentos.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for item in items:
+            yield parse_item(item, backend)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = []
+        for chunk in _chunks(items, chunksize):
+            pending.append(executor.submit(_parse_chunk, chunk, backend))
+            if len(pending) >= 2 * workers:
+                yield from pending.pop(0).result()
+        for future in pending:
+            yield from future.result()
+
+
+def file_items(files: Iterable[str]) -> Iterator[WorkItem]:
+    # Solo viaja la ruta al worker; cada proceso lee su archivo
+    for path in files:
+        yield path, path, None
+
+
+def archive_items(archive: ModalArchive) -> Iterator[WorkItem]:
+    for data_key, html in archive.iter_latest():
+        yield data_key, None, html
+
+
+def write_csv(rows: Iterable[dict[str, Any]], path: str) -> tuple[int, int]:
+    total = errors = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+            total += 1
+            errors += bool(row["_error"])
+    return total, errors
+
+
+def write_parquet(
+    rows: Iterable[dict[str, Any]], path: str, batch_size: int = 1000
+) -> tuple[int, int]:
+    # Por lotes con ParquetWriter (``columnar.write_table`` necesita todo el
+    # DataFrame en memoria)
+    pa, pq = columnar.require_pyarrow()
+
+    schema = pa.schema(
+        [
+            (col, pa.float64() if col in NUMERIC_COLUMNS else pa.string())
+            for col in COLUMNS
+        ]
+    )
+    total = errors = 0
+
+    def to_batch(batch: list[dict[str, Any]]):
+        columns = {}
+        for col in COLUMNS:
+            values = [row.get(col) for row in batch]
+            if col in NUMERIC_COLUMNS:
+                values = [_to_float(v) for v in values]
+            columns[col] = values
+        return pa.Table.from_pydict(columns, schema=schema)
+
+    with pq.ParquetWriter(path, schema) as writer:
+        batch: list[dict[str, Any]] = []
+        for row in rows:
+            batch.append(row)
+            total += 1
+            errors += bool(row["_error"])
+            if len(batch) >= batch_size:
+                writer.write_table(to_batch(batch))
+                batch = []
+        if batch:
+            writer.write_table(to_batch(batch))
+    return total, errors
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Re-parsea en paralelo modales guardados y genera el dataset."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Archivos, globs o directorios con HTML de modales (default: debug_modal_*.html)",
+    )
+    parser.add_argument(
+        "--archive", default=None, help="Leer los modales de un archivo pack"
+    )
+    parser.add_argument(
+        "-o", "--output", default="productos_reparse.csv", help="Salida .csv o .parquet"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Procesos (default: todos los cores)"
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=32,
+        help="Documentos por tarea enviada a cada proceso",
+    )
+    parser.add_argument(
+        "--backend", choices=["lxml", "html.parser"], default=DEFAULT_BACKEND
+    )
+    parser.add_argument(
+        "--parse-cache",
+        default=None,
+        help="Base SQLite del cache de parseo, compartida con los workers",
+    )
+    args = parser.parse_args()
+    if args.parse_cache:
+        parse_cache.configure(args.parse_cache)
+
+    start = time.perf_counter()
+    archive = None
+    if args.archive:
+        archive = ModalArchive(args.archive)
+        items: Iterable[WorkItem] = archive_items(archive)
+    else:
+        files = expand_inputs(args.inputs or ["debug_modal_*.html"])
+        items = file_items(files)
+
+    try:
+        rows = parse_all(items, args.workers, args.chunksize, args.backend)
+        if columnar.is_parquet(args.output):
+            total, errors = write_parquet(rows, args.output)
+        else:
+            total, errors = write_csv(rows, args.output)
+    finally:
+        if archive is not None:
+            archive.close()
+
+    info = {
+        "output": args.output,
+        "documents": total,
+        "errors": errors,
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    print(json.dumps(info, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
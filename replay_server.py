@@ -0,0 +1,423 @@
+"""
+Réplica local del vademecum de Nutrinfo armada con los modales archivados.
+
+Sirve lo mínimo que usa el crawler, con la misma forma que el sitio:
+
+- ``/vademecum``: listado con el filtro "Filtrar por categorias", cards
+  ``article[data-key]`` > ``div.vademecum-item-card`` y paginación
+  ``ul.pagination`` con ``li.active`` y ``li.next`` (una página fuera de
+  rango redirige a la última, como el sitio).
+- ``/vademecum/item?id=<data-key>``: el XHR que llena el modal. Devuelve el
+  HTML del modal archivado; el JS de la página lo muestra como un modal de
+  Bootstrap (``div.modal.show`` + ``div.modal-backdrop``) que se cierra con
+  ``button.btn-close`` o Escape.
+- ``/img/<data-key>.png``: una imagen de relleno por producto (para medir el
+  perfil liviano).
+
+La latencia (fija + jitter) y la tasa de fallas de los XHR se configuran por
+línea de comando. Ambas salen de un RNG sembrado con (semilla, tipo, path,
+intento): el mismo request falla en cada corrida sin importar el orden en que
+los threads del servidor atienden los requests, así las corridas son
+reproducibles.
+
+Uso:
+    python replay_server.py --port 8765 --latency 50 --fail-rate 0.02
+    python simple_automation.py --base-url http://127.0.0.1:8765/vademecum --lean
+    python replay_server.py --bench --workers 2 --engine direct
+"""
+
+import argparse
+import html as html_lib
+import json
+import math
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+from incremental import extract_updated
+from reparse import expand_inputs
+
+DEFAULT_CATEGORY = "Galletitas"
+TITLE_RE = re.compile(r'id="vademecum-item-title"[^>]*>(.*?)</h5>', re.S)
+
+# PNG de relleno (~20 KB) para que las imágenes tengan un peso realista
+FILLER_IMAGE = b"\x89PNG\r\n\x1a\n" + bytes(20_000)
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="es"><head><meta charset="utf-8"><title>Vademecum (réplica)</title>
+<style>
+.modal {{ display: none; }}
+.modal.show {{ display: block; }}
+.modal-backdrop {{ position: fixed; inset: 0; background: rgba(0,0,0,.5); }}
+#cat-options[hidden] {{ display: none; }}
+</style></head>
+<body>
+<input type="text" placeholder="Filtrar por categorias" id="cat-filter">
+<ul id="cat-options" role="listbox" hidden>{options}</ul>
+<div id="vademecum-list">{articles}</div>
+{pagination}
+<div id="modal-holder"></div>
+<script>
+const holder = document.getElementById("modal-holder");
+document.getElementById("cat-filter").addEventListener("click", () => {{
+    document.getElementById("cat-options").hidden = false;
+}});
+function closeModal() {{
+    holder.innerHTML = "";
+    document.querySelectorAll(".modal-backdrop").forEach(b => b.remove());
+}}
+document.addEventListener("click", async (ev) => {{
+    const option = ev.target.closest("[role=option]");
+    if (option) {{
+        location.href = "{base}?categoria=" + encodeURIComponent(option.textContent.trim()) + "&page=1";
+        return;
+    }}
+    if (ev.target.closest(".btn-close")) {{
+        closeModal();
+        return;
+    }}
+    const card = ev.target.closest("div.vademecum-item-card");
+    if (!card) return;
+    const key = card.closest("article").dataset.key;
+    const response = await fetch("{base}/item?id=" + encodeURIComponent(key), {{
+        headers: {{"X-Requested-With": "XMLHttpRequest"}}
+    }});
+    if (!response.ok) return;
+    holder.innerHTML = await response.text();
+    const modal = holder.querySelector(".modal");
+    if (modal) {{
+        modal.classList.add("show");
+        modal.style.display = "block";
+    }}
+    document.body.insertAdjacentHTML("beforeend", '<div class="modal-backdrop fade show"></div>');
+}});
+document.addEventListener("keydown", (ev) => {{
+    if (ev.key === "Escape") closeModal();
+}});
+</script>
+</body></html>"""
+
+ARTICLE_TEMPLATE = """<article data-key="{key}">
+    <div class="vademecum-item-card">
+        <img src="/img/{key}.png" class="card-img-top" alt="">
+        <h3 class="card-title">{title}</h3>
+        <small>Actualizado: {updated}</small>
+    </div>
+</article>"""
+
+
+@dataclass
+class ReplayProduct:
+    data_key: str
+    title: str
+    updated: str
+    html: str
+
+
+def load_catalog(
+    inputs: list[str],
+    categories: Optional[list[str]] = None,
+    shared_every: int = 0,
+) -> dict[str, list[ReplayProduct]]:
+    """
+    Arma el catálogo a partir de archivos de modales.
+
+    El ``data-key`` sale del número del archivo (``debug_modal_17`` ->
+    "10017", con cinco dígitos como en el sitio). Con varias categorías los
+    productos se reparten en forma circular; con ``shared_every`` = N, uno de
+    cada N productos aparece también en la categoría siguiente (como en el
+    sitio, donde un producto puede figurar en más de una).
+    """
+    categories = categories or [DEFAULT_CATEGORY]
+    catalog: dict[str, list[ReplayProduct]] = {name: [] for name in categories}
+    for i, path in enumerate(expand_inputs(inputs)):
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        name = os.path.splitext(os.path.basename(path))[0]
+        suffix = name.rsplit("_", 1)[-1]
+        data_key = str(10000 + int(suffix)) if suffix.isdigit() else name
+        m = TITLE_RE.search(html)
+        title = html_lib.unescape(m.group(1)).strip() if m else name
+        product = ReplayProduct(data_key, title, extract_updated(html) or "", html)
+        catalog[categories[i % len(categories)]].append(product)
+        if shared_every and len(categories) > 1 and i % shared_every == 0:
+            catalog[categories[(i + 1) % len(categories)]].append(product)
+    return catalog
+
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        catalog: dict[str, list[ReplayProduct]],
+        address: tuple[str, int] = ("127.0.0.1", 0),
+        page_size: int = 20,
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        fail_rate: float = 0,
+        seed: int = 0,
+    ):
+        super().__init__(address, ReplayHandler)
+        self.catalog = catalog
+        self.by_key = {p.data_key: p for items in catalog.values() for p in items}
+        self.page_size = page_size
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.counts = {"listing": 0, "item": 0, "item_failed": 0, "image": 0}
+        self.seed = seed
+        self._attempts: dict[tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/vademecum"
+
+    def delay_and_fail(self, kind: str, path: str, can_fail: bool = False) -> bool:
+        """
+        Aplica la latencia configurada y devuelve True si el request falla.
+        Ambas dependen solo de la semilla, el request y su número de intento.
+        """
+        with self._lock:
+            self.counts[kind] += 1
+            attempt = self._attempts.get((kind, path), 0)
+            self._attempts[kind, path] = attempt + 1
+        # Semilla str: a diferencia de hash(), es estable entre procesos
+        rng = random.Random(f"{self.seed}:{kind}:{path}:{attempt}")
+        delay = self.latency_ms + rng.uniform(0, self.jitter_ms)
+        failed = can_fail and rng.random() < self.fail_rate
+        if failed:
+            with self._lock:
+                self.counts[f"{kind}_failed"] += 1
+        if delay:
+            time.sleep(delay / 1000)
+        return failed
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server: ReplayServer
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # Sin una línea por request: en un benchmark son miles
+        pass
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        if parts.path in ("/vademecum", "/vademecum/"):
+            self._listing(query)
+        elif parts.path == "/vademecum/item":
+            self._item(query.get("id", [""])[0])
+        elif parts.path.startswith("/img/"):
+            self.server.delay_and_fail("image", self.path)
+            self._send(200, FILLER_IMAGE, "image/png")
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def _listing(self, query: dict[str, list[str]]) -> None:
+        server = self.server
+        server.delay_and_fail("listing", self.path)
+        base = "/vademecum"
+        category = query.get("categoria", [None])[0]
+        options = "".join(
+            f'<li role="option">{html_lib.escape(name)}</li>' for name in server.catalog
+        )
+        articles = pagination = ""
+        if category is not None:
+            products = server.catalog.get(category, [])
+            pages = max(1, math.ceil(len(products) / server.page_size))
+            try:
+                page_num = int(query.get("page", ["1"])[0])
+            except ValueError:
+                page_num = 1
+            if page_num > pages or page_num < 1:
+                # Como el sitio: fuera de rango se redirige a la última página
+                url = f"{base}?categoria={quote(category)}&page={pages}"
+                self.send_response(302)
+                self.send_header("Location", url)
+                self.end_headers()
+                return
+            start = (page_num - 1) * server.page_size
+            articles = "\n".join(
+                ARTICLE_TEMPLATE.format(
+                    key=p.data_key, title=html_lib.escape(p.title), updated=p.updated
+                )
+                for p in products[start : start + server.page_size]
+            )
+            pagination = self._pagination(base, category, page_num, pages)
+        body = PAGE_TEMPLATE.format(
+            base=base, options=options, articles=articles, pagination=pagination
+        )
+        self._send(200, body.encode("utf-8"), "text/html; charset=utf-8")
+
+    @staticmethod
+    def _pagination(base: str, category: str, page_num: int, pages: int) -> str:
+        if page_num < pages:
+            url = f"{base}?categoria={quote(category)}&page={page_num + 1}"
+            next_item = f'<li class="next"><a href="{url}">&raquo;</a></li>'
+        else:
+            next_item = '<li class="next disabled"><span>&raquo;</span></li>'
+        return (
+            '<ul class="pagination">'
+            f'<li class="page-item active"><a href="#">{page_num}</a></li>'
+            f"{next_item}</ul>"
+        )
+
+    def _item(self, data_key: str) -> None:
+        product = self.server.by_key.get(data_key)
+        if self.server.delay_and_fail("item", self.path, can_fail=True):
+            self._send(500, b"error inyectado", "text/plain")
+        elif product is None:
+            self._send(404, b"producto inexistente", "text/plain")
+        else:
+            self._send(200, product.html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def _send(self, status: int, body: bytes, content_type: str) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextmanager
+def replay_server(
+    catalog: dict[str, list[ReplayProduct]], port: int = 0, **options: Any
+) -> Iterator[ReplayServer]:
+    """Levanta la réplica en un thread y la apaga al salir del bloque."""
+    server = ReplayServer(catalog, ("127.0.0.1", port), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def run_bench(
+    catalog: dict[str, list[ReplayProduct]],
+    workers: int = 1,
+    engine: str = "click",
+    lean: bool = True,
+    **options: Any,
+) -> dict[str, Any]:
+    """
+    Crawl completo contra la réplica; devuelve el resumen de CrawlMetrics.
+
+    Con más de una categoría en el catálogo se recorren todas con el
+    scheduler de categorías. Store, archivo y métricas van a un directorio
+    temporal, así cada corrida arranca de cero.
+    """
+    from playwright.sync_api import sync_playwright
+
+    from lean_profile import LeanProfile
+    from simple_automation import run_simple_automation
+
+    with (
+        replay_server(catalog, **options) as server,
+        tempfile.TemporaryDirectory() as tmp,
+    ):
+        prefix = os.path.join(tmp, "metrics")
+        with sync_playwright() as playwright:
+            run_simple_automation(
+                playwright,
+                workers=workers,
+                engine=engine,
+                store_path=os.path.join(tmp, "store.sqlite"),
+                archive_path=os.path.join(tmp, "modals.pack"),
+                metrics_prefix=prefix,
+                lean=LeanProfile() if lean else None,
+                base_url=server.base_url,
+                output_csv=os.path.join(tmp, "productos.csv"),
+                categories=list(catalog) if len(catalog) > 1 else None,
+            )
+        with open(prefix + ".summary.json", "r", encoding="utf-8") as f:
+            summary = json.load(f)
+        summary["server"] = dict(server.counts)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Réplica local del vademecum para probar y medir el crawler."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Modales a servir (default: debug_modal_*.html)",
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument(
+        "--categories",
+        default=DEFAULT_CATEGORY,
+        help="Categorías separadas por coma (los productos se reparten entre ellas)",
+    )
+    parser.add_argument(
+        "--shared-every",
+        type=int,
+        default=0,
+        help="Uno de cada N productos figura también en la categoría siguiente",
+    )
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument(
+        "--latency", type=float, default=0, help="Latencia fija por request (ms)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0, help="Latencia aleatoria extra (ms)"
+    )
+    parser.add_argument(
+        "--fail-rate",
+        type=float,
+        default=0,
+        help="Fracción de XHR de modales que responden 500",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--bench",
+        action="store_true",
+        help="Correr un crawl completo contra la réplica e imprimir el resumen",
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--engine", choices=["click", "direct"], default="click")
+    args = parser.parse_args()
+
+    categories = [c.strip() for c in args.categories.split(",") if c.strip()]
+    catalog = load_catalog(
+        args.inputs or ["debug_modal_*.html"], categories, args.shared_every
+    )
+    options = dict(
+        page_size=args.page_size,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        fail_rate=args.fail_rate,
+        seed=args.seed,
+    )
+
+    if args.bench:
+        summary = run_bench(catalog, args.workers, args.engine, **options)
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    with replay_server(catalog, args.port, **options) as server:
+        total = sum(len(items) for items in catalog.values())
+        print(f"🛰️  Réplica con {total} productos en {server.base_url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            print(f"🧹 Cerrando réplica: {server.counts}")
+
+
+if __name__ == "__main__":
+    main()
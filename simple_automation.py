@@ -3,12 +3,58 @@ Script simple de automatización con Playwright para Nutrinfo
 Basado en el código original del usuario, pero con mejoras
 """
 
-from playwright.sync_api import Playwright, sync_playwright
-import time
-import pandas as pd
+from playwright.sync_api import (
+    APIRequestContext,
+    Browser,
+    BrowserContext,
+    Locator,
+    Page,
+    Playwright,
+    sync_playwright,
+)
+import argparse
+import html as html_lib
+import os
+import itertools
+import threading
 import re
-from bs4 import BeautifulSoup
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Container, Optional
+from urllib.parse import urljoin, urlsplit
+
+import parse_cache
+from context_recycler import (
+    DEFAULT_RECYCLE_EVERY,
+    DEFAULT_RECYCLING,
+    ContextRecycler,
+    RecycleOptions,
+    StorageState,
+)
+from crawl_pipeline import DEFAULT_PARSE_WORKERS, CrawlPipeline, PipelineItem
+from crawl_metrics import DEFAULT_METRICS, NO_METRICS, CrawlMetrics, metrics_paths
+from crawl_scheduler import (
+    COMBINED_CSV,
+    UNKNOWN,
+    CrawlScheduler,
+    WorkUnit,
+    export_outputs,
+    parse_categories,
+)
+from incremental import (
+    DeltaWriter,
+    ListingEntry,
+    default_delta_path,
+    is_changed,
+    needs_fetch,
+    removed_keys,
+)
+from lean_profile import LeanProfile
+from modal_archive import DEFAULT_ARCHIVE, ModalArchive
+from modal_parser import parse_modal_html
+from nutrient_names import nutrient_key
+from product_store import ProductStore
+from wait_policy import DEFAULT_WAITS, WaitPolicy
 
 
 def parse_nutrition_table(modal) -> dict:
@@ -57,8 +103,7 @@ def parse_nutrition_table(modal) -> dict:
                 left,
             )
             if m:
-                name = m.group("name").strip().lower()
-                name_key = re.sub(r"\s+", "_", name)
+                name_key = nutrient_key(m.group("name"))
                 val_s = m.group("value").replace(",", ".")
                 try:
                     value = float(val_s) if "." in val_s else int(val_s)
@@ -77,8 +122,7 @@ def parse_nutrition_table(modal) -> dict:
                     left,
                 )
                 if m2:
-                    name = m2.group("name").strip().lower()
-                    name_key = re.sub(r"\s+", "_", name)
+                    name_key = nutrient_key(m2.group("name"))
                     val_s = m2.group("value").replace(",", ".")
                     try:
                         value = float(val_s) if "." in val_s else int(val_s)
@@ -100,121 +144,1009 @@ def parse_nutrition_table(modal) -> dict:
     return result
 
 
-def run_simple_automation(playwright: Playwright) -> None:
+BASE_URL = "https://www.nutrinfo.com/vademecum"
+DEFAULT_CATEGORY = "Galletitas"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+OUTPUT_CSV = "productos_galletitas.csv"
+DEFAULT_STORE = "productos_galletitas.sqlite"
+
+PAGE_PARAM_RE = re.compile(r"([?&]page=)\d+")
+
+
+@dataclass
+class ModalCapture:
+    """HTML de un modal capturado junto con su posición en el listado."""
+
+    page_num: int
+    position: int
+    data_key: Optional[str]
+    html: str
+
+
+# True cuando el primer card del listado ya no es el de antes del click
+LISTING_CHANGED_JS = """(previous) => {
+    const first = document.querySelector("article[data-key]");
+    return first !== null && first.dataset.key !== previous;
+}"""
+
+
+def open_listing(
+    page: Page,
+    category: str = DEFAULT_CATEGORY,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    base_url: str = BASE_URL,
+) -> None:
     """
-    Ejecuta una automatización simple en Nutrinfo
+    Navega al vademecum y aplica el filtro de categoría.
 
     Args:
-        playwright: Instancia de Playwright
+        page: Página de Playwright
+        category: Nombre de la categoría tal como aparece en el filtro
+        metrics: Métricas donde se registran las etapas "navigate" y "filter"
+        waits: Política de timeouts de las esperas
+        base_url: URL del vademecum (otra para usar la réplica local)
     """
-    print("🚀 Iniciando navegador...")
+    print("📍 Navegando a Nutrinfo...")
+    with metrics.stage("navigate", url=base_url):
+        with waits.waiting("navigate") as timeout:
+            page.goto(base_url, timeout=timeout)
 
-    # Configurar navegador
-    browser = playwright.chromium.launch(headless=False)
+    # Esperar a que la página cargue
+    # page.wait_for_load_state("networkidle")
+    print("✅ Página cargada")
+
+    print("🔍 Aplicando filtro de categoría...")
+    with metrics.stage("filter", category=category):
+        # Hacer clic en el filtro de categorías
+        page.get_by_placeholder("Filtrar por categorias").click()
+
+        # Seleccionar la categoría
+        page.get_by_role("option", name=category, exact=True).click()
+
+        # Esperar a que se apliquen los resultados del filtro
+        with waits.waiting("listing") as timeout:
+            page.wait_for_selector("article[data-key]", timeout=timeout)
+    print(f"✅ Filtro aplicado: {category}")
+
+
+def discover_categories(
+    page: Page,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    base_url: str = BASE_URL,
+) -> list[str]:
+    """Lee los nombres de las opciones de "Filtrar por categorias"."""
+    with metrics.stage("navigate", url=base_url):
+        with waits.waiting("navigate") as timeout:
+            page.goto(base_url, timeout=timeout)
+    page.get_by_placeholder("Filtrar por categorias").click()
+    options = page.get_by_role("option")
+    with waits.waiting("listing") as timeout:
+        options.first.wait_for(timeout=timeout)
+    names = [name.strip() for name in options.all_inner_texts()]
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def listing_url_template(page: Page) -> Optional[str]:
+    """
+    Deduce la URL de cualquier página del listado a partir del link "siguiente".
+
+    Devuelve un template con el placeholder ``{page}`` o None si el listado
+    no tiene paginación (una sola página).
+    """
+    next_locator = page.locator("li.next a")
+    if next_locator.count() == 0:
+        return None
+    href = next_locator.first.get_attribute("href")
+    if not href:
+        return None
+    url = urljoin(page.url, href)
+    if not PAGE_PARAM_RE.search(url):
+        return None
+    return PAGE_PARAM_RE.sub(lambda m: m.group(1) + "{page}", url)
+
+
+def current_page_number(page: Page) -> Optional[int]:
+    """Número de página activo según la paginación (None si no hay paginación)."""
+    active = page.locator("ul.pagination li.active")
+    if active.count() == 0:
+        return None
+    try:
+        return int(active.first.inner_text().strip())
+    except ValueError:
+        return None
+
+
+def goto_listing_page(
+    page: Page,
+    template: str,
+    page_num: int,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+) -> bool:
+    """
+    Navega directamente a la página ``page_num`` del listado.
+
+    Devuelve False si la página no existe (el sitio redirige a la última
+    página válida cuando se pide una fuera de rango).
+    """
+    with metrics.stage("navigate", page=page_num):
+        with waits.waiting("navigate") as timeout:
+            page.goto(template.format(page=page_num), timeout=timeout)
+        with waits.waiting("listing") as timeout:
+            page.wait_for_selector("article[data-key]", timeout=timeout)
+    return current_page_number(page) == page_num
+
+
+def has_next_page(page: Page) -> bool:
+    """True si la paginación de ``page`` tiene un link a la página siguiente."""
+    return page.locator("li.next:not(.disabled) a").count() > 0
+
+
+def click_next_page(
+    page: Page,
+    page_num: int,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+) -> bool:
+    """
+    Avanza a la página siguiente con el link de la paginación.
+
+    Espera a que los cards del listado se reemplacen (los de la página
+    anterior siguen en el DOM hasta que llega la respuesta). Devuelve False
+    si no hay página siguiente.
+    """
+    next_locator = page.locator("li.next:not(.disabled) a")
+    if next_locator.count() == 0:
+        return False
+    previous = page.locator("article[data-key]").first.get_attribute("data-key")
+    with metrics.stage("next_page", page=page_num):
+        with waits.deadline("listing") as deadline:
+            next_locator.first.click(timeout=deadline.left())
+            page.wait_for_function(
+                LISTING_CHANGED_JS, arg=previous, timeout=deadline.left()
+            )
+    return True
+
+
+class ListingPrefetcher:
+    """
+    Precarga la página siguiente del listado en una segunda pestaña del mismo
+    contexto mientras se procesan los productos de la actual.
+
+    ``goto(wait_until="commit")`` vuelve apenas el servidor empieza a
+    responder y el navegador sigue cargando en paralelo al trabajo sobre la
+    página actual. Al terminarla se intercambian las pestañas: la precargada
+    pasa a ser la de trabajo y la anterior queda de repuesto para la próxima.
+    Sin template de URL (listado de una sola página o paginación sin
+    ``page=``) se avanza con el click de siempre.
+    """
+
+    def __init__(
+        self,
+        context: BrowserContext,
+        template: Optional[str],
+        metrics: CrawlMetrics = NO_METRICS,
+        waits: WaitPolicy = DEFAULT_WAITS,
+    ):
+        self.context = context
+        self.template = template
+        self.metrics = metrics
+        self.waits = waits
+        self._spare: Optional[Page] = None
+        self._pending: Optional[int] = None
+
+    def reset(self, context: BrowserContext) -> None:
+        """Pasa a un contexto nuevo (tras reciclar); la precarga en curso se pierde."""
+        self.context = context
+        self._spare, self._pending = None, None
+
+    def prefetch(self, page: Page, page_num: int) -> None:
+        """Empieza a cargar la página ``page_num + 1`` si ``page`` tiene siguiente."""
+        self._pending = None
+        if self.template is None:
+            return
+        if not has_next_page(page):
+            return
+        if self._spare is None:
+            self._spare = self.context.new_page()
+        with self.metrics.stage("prefetch", page=page_num + 1):
+            # Muestras propias: el commit tarda mucho menos que una carga completa
+            # y achicaría el timeout de "navigate"
+            with self.waits.waiting("prefetch") as timeout:
+                self._spare.goto(
+                    self.template.format(page=page_num + 1),
+                    wait_until="commit",
+                    timeout=timeout,
+                )
+        self._pending = page_num + 1
+
+    def advance(self, page: Page, page_num: int) -> Optional[Page]:
+        """Pestaña posicionada en la página ``page_num + 1``, o None si no hay más."""
+        if self.template is None:
+            if click_next_page(page, page_num + 1, self.metrics, self.waits):
+                return page
+            return None
+        if self._pending != page_num + 1 or self._spare is None:
+            return None
+        ready = self._spare
+        with self.metrics.stage("next_page", page=page_num + 1, prefetched=True):
+            # Casi siempre ya cargó: no se registra como muestra de "listing"
+            ready.wait_for_selector(
+                "article[data-key]", timeout=self.waits.timeout("listing")
+            )
+        if current_page_number(ready) != page_num + 1:
+            return None
+        self._spare, self._pending = page, None
+        return ready
+
+
+# Esqueleto mínimo de modal con los elementos que usa parse_modal_html
+MODAL_SHELL = """<div class="modal fade show" id="vademecum-item" role="dialog">
+    <div class="modal-dialog"><div class="modal-content">
+        <div class="modal-header">
+            <h5 class="modal-title" id="vademecum-item-title">{title}</h5>
+        </div>
+        <div class="modal-body"><div id="vademecum-item-content">{content}</div></div>
+    </div></div>
+</div>"""
+
+# Devuelve el selector CSS del elemento del card cuyo texto coincide con el título
+TITLE_SELECTOR_JS = """(article, title) => {
+    const match = [...article.querySelectorAll("*")].reverse()
+        .find(el => el.textContent.trim() === title);
+    if (!match) return null;
+    const classes = [...match.classList].map(c => "." + CSS.escape(c)).join("");
+    return match.tagName.toLowerCase() + classes;
+}"""
+
+# Devuelve [data-key, título, texto completo del card] por cada artículo
+LISTING_KEYS_JS = """(articles, selector) => articles.map(a => {
+    const el = selector ? a.querySelector(selector) : null;
+    const text = a.innerText || "";
+    const title = el ? el.textContent : text.split("\\n")[0];
+    return [a.dataset.key, title.trim(), text];
+})"""
+
+
+@dataclass
+class ModalEndpoint:
+    """
+    Request que usa el sitio para cargar el contenido de un modal.
+
+    Se aprende interceptando el XHR/fetch del primer click, reemplazando el
+    ``data-key`` por el placeholder ``{key}`` en la URL y/o el body.
+    """
+
+    method: str
+    url_template: str
+    post_template: Optional[str] = None
+    title_selector: Optional[str] = None
+
+    def fetch(
+        self, api: APIRequestContext, data_key: str, timeout: Optional[float] = None
+    ) -> str:
+        url = self.url_template.replace("{key}", data_key)
+        if self.method == "POST":
+            data = (self.post_template or "").replace("{key}", data_key)
+            response = api.post(
+                url,
+                data=data,
+                headers={
+                    "Content-Type": "application/x-www-form-urlencoded",
+                    "X-Requested-With": "XMLHttpRequest",
+                },
+                timeout=timeout,
+            )
+        else:
+            response = api.get(
+                url, headers={"X-Requested-With": "XMLHttpRequest"}, timeout=timeout
+            )
+        if not response.ok:
+            raise RuntimeError(f"HTTP {response.status} al pedir {url}")
+        return response.text()
+
+
+def build_modal_html(title: str, content: str) -> str:
+    """Arma un modal equivalente al del sitio a partir del contenido descargado."""
+    if "vademecum-item-title" in content:
+        # El endpoint ya devuelve el modal completo
+        return content
+    return MODAL_SHELL.format(title=html_lib.escape(title), content=content)
+
+
+def learn_modal_endpoint(
+    page: Page, article: Locator, waits: WaitPolicy = DEFAULT_WAITS
+) -> Optional[ModalEndpoint]:
+    """
+    Abre un modal por UI una única vez y captura el request que lo llena.
+
+    Returns:
+        El endpoint aprendido, o None si el modal no dispara un request que
+        contenga el ``data-key`` del producto.
+    """
+    data_key = article.get_attribute("data-key")
+    if not data_key:
+        return None
+
+    def carries_key(response) -> bool:
+        request = response.request
+        return request.resource_type in ("xhr", "fetch") and (
+            data_key in request.url or data_key in (request.post_data or "")
+        )
+
+    try:
+        with waits.deadline("modal_open") as deadline:
+            with page.expect_response(
+                carries_key, timeout=deadline.left()
+            ) as response_info:
+                article.locator("div.vademecum-item-card").click(
+                    timeout=deadline.left()
+                )
+            request = response_info.value.request
+            page.wait_for_selector(
+                "div.modal.show", state="visible", timeout=deadline.left()
+            )
+        title = page.locator("div.modal.show .modal-title").first.inner_text().strip()
+        title_selector = article.evaluate(TITLE_SELECTOR_JS, title)
+    except Exception as e:
+        print(f"⚠️  No se pudo aprender el endpoint del modal: {e}")
+        return None
+    finally:
+        page.keyboard.press("Escape")
+
+    endpoint = ModalEndpoint(
+        method=request.method,
+        url_template=_key_template(request.url, data_key),
+        post_template=(
+            request.post_data.replace(data_key, "{key}") if request.post_data else None
+        ),
+        title_selector=title_selector,
+    )
+    print(f"🔗 Endpoint del modal: {endpoint.method} {endpoint.url_template}")
+    return endpoint
+
+
+def _key_template(url: str, data_key: str) -> str:
+    """Reemplaza el ``data-key`` por ``{key}`` fuera del host (y del puerto)."""
+    parts = urlsplit(url)
+    origin = f"{parts.scheme}://{parts.netloc}"
+    return origin + url[len(origin) :].replace(data_key, "{key}")
+
+
+def prepare_engine(
+    page: Page, engine: str, waits: WaitPolicy = DEFAULT_WAITS
+) -> Optional[ModalEndpoint]:
+    """
+    Prepara el motor de extracción sobre un listado ya cargado.
+
+    ``engine="click"`` no necesita preparación. ``engine="direct"`` aprende el
+    endpoint del modal y vuelve al modo click si no lo consigue.
+    """
+    if engine != "direct":
+        return None
+    endpoint = learn_modal_endpoint(
+        page, page.locator("article[data-key]").first, waits
+    )
+    if endpoint is None:
+        print("↩️  Usando el motor click como alternativa")
+    else:
+        wait_modal_gone(page, waits)
+    return endpoint
+
+
+def deliver_capture(
+    capture: ModalCapture,
+    productos: list[dict[str, Any]],
+    on_product: Optional[Callable[[ModalCapture, dict[str, Any]], None]] = None,
+    on_capture: Optional[Callable[[ModalCapture], None]] = None,
+    metrics: CrawlMetrics = NO_METRICS,
+    **ctx: Any,
+) -> None:
+    """
+    Entrega un modal capturado: a ``on_capture`` sin parsear (el pipeline lo
+    parsea fuera del thread del navegador) o, si no hay, lo parsea acá.
+    """
+    if on_capture is not None:
+        on_capture(capture)
+        return
+    with metrics.stage("parse", **ctx):
+        parsed = parse_modal_html(capture.html)
+    productos.append(parsed)
+    if on_product:
+        with metrics.stage("save", **ctx):
+            on_product(capture, parsed)
+
+
+def fetch_listing_page(
+    page: Page,
+    page_num: int,
+    endpoint: ModalEndpoint,
+    on_product: Optional[Callable[[ModalCapture, dict[str, Any]], None]] = None,
+    skip_keys: Container[str] = (),
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    on_capture: Optional[Callable[[ModalCapture], None]] = None,
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """
+    Descarga el contenido del modal de cada producto sin interactuar con la UI.
+
+    Los ``data-key`` y títulos se leen del listado en un solo round-trip y
+    cada modal se pide con el ``APIRequestContext`` de la página (comparte
+    cookies y conexiones con el navegador). Los pedidos fallidos se
+    reintentan con backoff.
+
+    Devuelve lo mismo que ``scrape_listing_page``.
+    """
+    productos: list[dict[str, Any]] = []
+    failed: list[str] = []
+    items = page.locator("article[data-key]").evaluate_all(
+        LISTING_KEYS_JS, endpoint.title_selector
+    )
+    print(f"🔎 Página {page_num}: Se encontraron {len(items)} productos (directo).")
+
+    for idx, (data_key, title, _) in enumerate(items):
+        if data_key in skip_keys:
+            continue
+        ctx = {"page": page_num, "key": data_key}
+        try:
+            content = waits.retry(
+                lambda: fetch_modal(page, endpoint, data_key, metrics, waits, **ctx),
+                metrics,
+                **ctx,
+            )
+            deliver_capture(
+                ModalCapture(page_num, idx, data_key, build_modal_html(title, content)),
+                productos,
+                on_product,
+                on_capture,
+                metrics,
+                **ctx,
+            )
+            metrics.count("products_ok")
+        except Exception as e:
+            print(f"⚠️  Error procesando producto {idx + 1} ({data_key}): {e}")
+            metrics.count("products_failed", **ctx)
+            failed.append(data_key)
+
+    return productos, failed
+
+
+def fetch_modal(
+    page: Page,
+    endpoint: ModalEndpoint,
+    data_key: str,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    **ctx: Any,
+) -> str:
+    """Pide el contenido del modal de ``data_key`` con el endpoint aprendido."""
+    with metrics.stage("modal_fetch", **ctx):
+        with waits.waiting("modal_fetch") as timeout:
+            return endpoint.fetch(page.request, data_key, timeout=timeout)
+
+
+def open_modal(
+    page: Page,
+    article: Locator,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    **ctx: Any,
+) -> tuple[Locator, str]:
+    """Abre por UI el modal de un card del listado y devuelve (modal, outerHTML)."""
+    with metrics.stage("modal_open", **ctx):
+        # Click en el card interno (zona clickeable)
+        clickable = article.locator("div.vademecum-item-card")
+        # Asegurar visibilidad antes del click
+        clickable.scroll_into_view_if_needed()
+        with waits.deadline("modal_open") as deadline:
+            clickable.click(timeout=deadline.left())
+            # Esperar a que el modal visible aparezca
+            page.wait_for_selector(
+                "div.modal.show", state="visible", timeout=deadline.left()
+            )
+        modal = page.locator("div.modal.show").first
+
+    # Guardar el HTML completo del modal para parseo posterior
+    with metrics.stage("modal_html", **ctx):
+        modal_html = modal.evaluate("el => el.outerHTML") if modal else ""
+    return modal, modal_html
+
+
+def wait_modal_gone(page: Page, waits: WaitPolicy = DEFAULT_WAITS) -> None:
+    """
+    Espera a que el modal se oculte y a que Bootstrap desmonte el backdrop,
+    que es lo que tapa el click sobre el card siguiente.
+    """
+    with waits.deadline("modal_close") as deadline:
+        page.wait_for_selector(
+            "div.modal.show", state="hidden", timeout=deadline.left()
+        )
+        page.wait_for_selector(
+            "div.modal-backdrop", state="detached", timeout=deadline.left()
+        )
+
+
+def close_modal(
+    page: Page,
+    modal: Locator,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    **ctx: Any,
+) -> None:
+    with metrics.stage("modal_close", **ctx):
+        # Cerrar el modal
+        close_btn = modal.locator("button.btn-close")
+        if close_btn.count() > 0:
+            close_btn.first.click()
+        else:
+            # Alternativa: presionar Escape
+            page.keyboard.press("Escape")
+        # Esperar a que el modal desaparezca para evitar overlay sobre siguientes clicks
+        wait_modal_gone(page, waits)
+
+
+def dismiss_modal(
+    page: Page, metrics: CrawlMetrics = NO_METRICS, waits: WaitPolicy = DEFAULT_WAITS
+) -> None:
+    """Cierra con Escape un modal que haya quedado abierto tras un error."""
+    try:
+        page.keyboard.press("Escape")
+        wait_modal_gone(page, waits)
+        metrics.count("escape_recoveries")
+    except Exception:
+        pass
+
+
+def scrape_listing_page(
+    page: Page,
+    page_num: int,
+    on_product: Optional[Callable[[ModalCapture, dict[str, Any]], None]] = None,
+    endpoint: Optional[ModalEndpoint] = None,
+    skip_keys: Container[str] = (),
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    on_capture: Optional[Callable[[ModalCapture], None]] = None,
+) -> tuple[list[dict[str, Any]], list[str]]:
+    """
+    Abre el modal de cada producto de la página actual del listado y lo parsea.
+
+    Args:
+        page: Página de Playwright posicionada en el listado
+        page_num: Número de página (solo para logs y ``ModalCapture``)
+        on_product: Callback opcional invocado con cada modal capturado
+        endpoint: Si se indica, descarga los modales directamente
+            (ver ``fetch_listing_page``) en lugar de abrirlos por UI
+        skip_keys: ``data-key`` de productos ya guardados que no se reprocesan
+        metrics: Métricas donde se registra cada etapa de cada producto
+        waits: Política de timeouts y reintentos (la apertura del modal se
+            reintenta con backoff)
+        on_capture: Si se indica, recibe cada modal sin parsear (ver
+            crawl_pipeline.py) en lugar de parsearlo en este thread
+
+    Returns:
+        Lista de productos parseados, en el orden del listado (vacía con
+        ``on_capture``), y los ``data-key`` de los productos que fallaron
+        (ver ``finish_page``)
+    """
+    if endpoint is not None:
+        return fetch_listing_page(
+            page, page_num, endpoint, on_product, skip_keys, metrics, waits, on_capture
+        )
+
+    productos: list[dict[str, Any]] = []
+    failed: list[str] = []
+
+    # Usar Locator para evitar problemas de elementos "detached"
+    items_locator = page.locator("article[data-key]")
+    items_count = items_locator.count()
+    print(
+        f"🔎 Página {page_num}: Se encontraron {items_count} productos. Procesando todos."
+    )
+
+    for idx in range(items_count):
+        data_key = None
+        try:
+            article_nth = items_locator.nth(idx)
+            data_key = article_nth.get_attribute("data-key")
+            if data_key in skip_keys:
+                continue
+            print(
+                f"➡️  Procesando producto {idx + 1}/{items_count} (Página {page_num})"
+            )
+            ctx = {"page": page_num, "key": data_key}
+            modal, modal_html = waits.retry(
+                lambda: open_modal(page, article_nth, metrics, waits, **ctx),
+                metrics,
+                on_retry=lambda e: dismiss_modal(page, metrics, waits),
+                **ctx,
+            )
+
+            # Cerrar antes de entregar: el próximo click no espera al parseo
+            close_modal(page, modal, metrics, waits, **ctx)
+            deliver_capture(
+                ModalCapture(page_num, idx, data_key, modal_html),
+                productos,
+                on_product,
+                on_capture,
+                metrics,
+                **ctx,
+            )
+            metrics.count("products_ok")
+        except Exception as e:
+            print(f"⚠️  Error procesando producto {idx + 1}: {e}")
+            metrics.count("products_failed", page=page_num, position=idx)
+            failed.append(data_key or f"#{idx}")
+            # Intentar cerrar modal si quedó abierto
+            dismiss_modal(page, metrics, waits)
+
+    return productos, failed
+
+
+def finish_page(
+    pipeline: CrawlPipeline,
+    page_num: int,
+    failed: list[str],
+    metrics: CrawlMetrics = NO_METRICS,
+    category: str = "",
+) -> bool:
+    """
+    Marca la página como terminada solo si no falló ningún producto. Con
+    fallas queda pendiente: ``--resume`` la vuelve a recorrer y, como los
+    productos guardados se saltean, solo reintenta los que fallaron.
+    """
+    ctx = {"category": category, "page": page_num} if category else {"page": page_num}
+    if failed:
+        print(
+            f"⚠️  Página {page_num}: {len(failed)} productos fallaron, queda pendiente"
+        )
+        metrics.count("pages_incomplete", failed=len(failed), **ctx)
+        return False
+    pipeline.page_done(page_num, category)
+    metrics.count("pages_done", **ctx)
+    return True
+
+
+def new_context(
+    browser: Browser,
+    lean: Optional[LeanProfile] = None,
+    storage_state: StorageState = None,
+) -> BrowserContext:
+    """
+    Crea un contexto de scraping, con las cookies y el storage de
+    ``storage_state``: un dict ya cargado o un path, si el archivo existe.
+    """
+    state = storage_state
+    if isinstance(state, str) and not os.path.exists(state):
+        state = None
+    if lean is None:
+        return browser.new_context(user_agent=USER_AGENT, storage_state=state)
+    # Sin service workers todos los requests pasan por context.route
     context = browser.new_context(
-        user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        user_agent=USER_AGENT, service_workers="block", storage_state=state
+    )
+    lean.install(context)
+    return context
+
+
+def launch_context(
+    playwright: Playwright,
+    headless: bool = False,
+    lean: Optional[LeanProfile] = None,
+    storage_state: Optional[str] = None,
+) -> tuple[Browser, BrowserContext]:
+    """
+    Lanza Chromium y crea el contexto de scraping.
+
+    Con ``lean`` el navegador corre siempre headless y el contexto bloquea
+    imágenes, media, fuentes y analytics/publicidad (ver lean_profile.py).
+    """
+    browser = playwright.chromium.launch(headless=headless or lean is not None)
+    return browser, new_context(browser, lean, storage_state)
+
+
+def launch_recycler(
+    playwright: Playwright,
+    headless: bool = False,
+    lean: Optional[LeanProfile] = None,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+    metrics: CrawlMetrics = NO_METRICS,
+) -> tuple[Browser, ContextRecycler]:
+    """
+    Como ``launch_context`` pero con el contexto a cargo de un
+    ``ContextRecycler`` (ver context_recycler.py); su página es
+    ``recycler.page``.
+    """
+    browser = playwright.chromium.launch(headless=headless or lean is not None)
+    recycler = ContextRecycler(
+        lambda state: new_context(browser, lean, state),
+        recycling,
+        metrics,
+    )
+    return browser, recycler
+
+
+def finish_lean_report(lean: Optional[LeanProfile], metrics: CrawlMetrics) -> None:
+    """Imprime lo que ahorró el perfil liviano y lo suma a las métricas."""
+    if lean is None:
+        return
+    report = lean.print_report()
+    metrics.event("network", **report)
+    for name in ("requests_blocked", "bytes_loaded", "bytes_saved_est"):
+        metrics.count(name, report[name])
+
+
+def product_key(capture: ModalCapture) -> str:
+    """Clave del producto en el store (posicional si el card no trae data-key)."""
+    return capture.data_key or f"p{capture.page_num}_{capture.position}"
+
+
+def capture_sink(
+    pipeline: CrawlPipeline, category: str = ""
+) -> Callable[[ModalCapture], None]:
+    """Callback ``on_capture`` que entrega cada modal al pipeline de parseo."""
+
+    def submit(capture: ModalCapture) -> None:
+        pipeline.submit(
+            PipelineItem(
+                product_key(capture),
+                capture.html,
+                capture.page_num,
+                capture.position,
+                category,
+            )
+        )
+
+    return submit
+
+
+def run_simple_automation(
+    playwright: Playwright,
+    workers: int = 1,
+    engine: str = "click",
+    store_path: str = DEFAULT_STORE,
+    resume: bool = False,
+    archive_path: str = DEFAULT_ARCHIVE,
+    metrics_prefix: Optional[str] = DEFAULT_METRICS,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    output_csv: str = OUTPUT_CSV,
+    categories: Optional[list[str]] = None,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+    parse_processes: bool = False,
+    prefetch: bool = False,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+    headless: Optional[bool] = None,
+) -> None:
+    """
+    Ejecuta una automatización simple en Nutrinfo
+
+    Args:
+        playwright: Instancia de Playwright
+        workers: Cantidad de navegadores en paralelo. Con más de uno se
+            delega en ``run_parallel_automation`` (cada worker usa su propia
+            instancia de Playwright, por lo que ``playwright`` no se usa).
+        engine: "click" abre cada modal por UI; "direct" descarga el
+            contenido de los modales sin interactuar con la página
+        store_path: Base SQLite donde se guarda cada producto al parsearlo
+        resume: Si es True, saltea los productos ya guardados y retoma desde
+            la última página terminada
+        archive_path: Archivo pack donde se guarda el HTML crudo de cada modal
+        metrics_prefix: Prefijo del log de eventos (``.jsonl``) y del resumen
+            por etapa (``.summary.json``); None desactiva la instrumentación
+        lean: Perfil liviano (headless y sin imágenes/fuentes/ads); None usa
+            el navegador completo con ventana
+        base_url: URL del vademecum (p. ej. la de replay_server.py)
+        output_csv: CSV donde se exporta el store al terminar
+        categories: Si se indica, recorre esas categorías con
+            ``run_category_crawl`` ([] para descubrirlas todas) y exporta
+            además un CSV por categoría
+        parse_workers: Parsers del pipeline captura → parseo → escritura
+            (0 parsea y guarda en el thread del navegador)
+        parse_processes: Parsear en procesos en lugar de threads
+        prefetch: Precargar la página siguiente del listado en otra pestaña
+            (modo secuencial; en paralelo los workers ya cargan páginas
+            distintas a la vez)
+        recycling: Cuándo reciclar el contexto del navegador (productos o
+            RSS) y dónde guardar su ``storage_state``
+        headless: Navegadores sin ventana; None usa el default de cada modo
+            (con ventana el secuencial, headless con varios workers o
+            categorías). ``lean`` siempre es headless.
+    """
+    # Varios navegadores con ventana no sirven de nada: en paralelo, headless
+    parallel_headless = True if headless is None else headless
+    store = ProductStore(store_path)
+    archive = ModalArchive(archive_path)
+    events_path, summary_path = metrics_paths(metrics_prefix or "")
+    metrics = CrawlMetrics(events_path) if metrics_prefix else NO_METRICS
+    # Una sola política para todos los workers: aprenden de las mismas esperas
+    waits = WaitPolicy()
+    if not resume:
+        store.reset_pages()
+    pipeline = CrawlPipeline(
+        store, archive, parse_workers, parse_processes, metrics=metrics
     )
-    page = context.new_page()
 
     try:
-        print("📍 Navegando a Nutrinfo...")
-        page.goto("https://www.nutrinfo.com/vademecum")
+        if categories is not None:
+            crawled = run_category_crawl(
+                playwright,
+                categories,
+                workers,
+                headless=parallel_headless,
+                engine=engine,
+                store=store,
+                archive=archive,
+                resume=resume,
+                metrics=metrics,
+                waits=waits,
+                lean=lean,
+                base_url=base_url,
+                pipeline=pipeline,
+                recycling=recycling,
+            )
+            pipeline.close()
+            export_outputs(store, crawled, output_csv)
+            return
+        if workers > 1:
+            run_parallel_automation(
+                workers,
+                headless=parallel_headless,
+                engine=engine,
+                store=store,
+                archive=archive,
+                resume=resume,
+                metrics=metrics,
+                waits=waits,
+                lean=lean,
+                base_url=base_url,
+                pipeline=pipeline,
+                recycling=recycling,
+                output_csv=output_csv,
+            )
+        else:
+            _run_sequential(
+                playwright,
+                engine,
+                store,
+                pipeline,
+                resume,
+                metrics,
+                waits,
+                lean,
+                base_url,
+                prefetch,
+                recycling,
+                bool(headless),
+            )
 
-        # Esperar a que la página cargue
-        # page.wait_for_load_state("networkidle")
-        print("✅ Página cargada")
+        # Exportar todo lo guardado (incluye lo de corridas anteriores)
+        pipeline.close()
+        total = store.export(output_csv)
+        print(f"💾 {total} productos guardados en {output_csv}")
+    finally:
+        pipeline.close()
+        store.close()
+        archive.close()
+        # El resumen se escribe también si la corrida se cortó
+        finish_lean_report(lean, metrics)
+        metrics.event("timeouts", **waits.snapshot())
+        metrics.write_summary(summary_path)
+        metrics.close()
 
-        print("🔍 Aplicando filtro de categoría...")
-        # Hacer clic en el filtro de categorías
-        page.get_by_placeholder("Filtrar por categorias").click()
 
-        # Seleccionar "Galletitas"
-        page.get_by_role("option", name="Galletitas", exact=True).click()
+def recycle_to_next_page(
+    recycler: ContextRecycler,
+    reason: str,
+    page: Page,
+    template: str,
+    page_num: int,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+) -> Optional[Page]:
+    """
+    Recicla el contexto entre dos páginas del listado y deja la página nueva
+    en ``page_num + 1`` (None si ``page`` era la última).
+    """
+    has_next = has_next_page(page)
+    page = recycler.recycle(reason)
+    if has_next and goto_listing_page(page, template, page_num + 1, metrics, waits):
+        return page
+    return None
+
 
-        # Esperar a que se apliquen los resultados del filtro
-        page.wait_for_selector("article[data-key]", timeout=15000)
-        print("✅ Filtro aplicado: Galletitas")
+def _run_sequential(
+    playwright: Playwright,
+    engine: str,
+    store: ProductStore,
+    pipeline: CrawlPipeline,
+    resume: bool,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    prefetch: bool = False,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+    headless: bool = False,
+) -> None:
+    print("🚀 Iniciando navegador...")
+
+    # Configurar navegador
+    browser, recycler = launch_recycler(
+        playwright, headless, lean=lean, recycling=recycling, metrics=metrics
+    )
+    page = recycler.page
+
+    try:
+        open_listing(page, metrics=metrics, waits=waits, base_url=base_url)
+        endpoint = prepare_engine(page, engine, waits)
+
+        skip_keys = store.keys() if resume else set()
+        template = listing_url_template(page)
+        prefetcher = (
+            ListingPrefetcher(recycler.context, template, metrics, waits)
+            if prefetch
+            else None
+        )
 
-        productos: list[dict[str, Any]] = []
         page_num = 1
+        last_done = store.last_finished_page() if resume else 0
+        if last_done:
+            print(f"⏩ Retomando desde la página {last_done + 1}...")
+            page_num = last_done + 1
+            if template is None or not goto_listing_page(
+                page, template, page_num, metrics, waits
+            ):
+                print("✅ Todas las páginas ya estaban completas.")
+                return
 
         while True:
-            # Usar Locator para evitar problemas de elementos "detached"
-            items_locator = page.locator("article[data-key]")
-            items_count = items_locator.count()
-            print(
-                f"🔎 Página {page_num}: Se encontraron {items_count} productos. Procesando todos."
+            if prefetcher is not None:
+                prefetcher.prefetch(page, page_num)
+            _, failed = scrape_listing_page(
+                page,
+                page_num,
+                endpoint=endpoint,
+                skip_keys=skip_keys,
+                metrics=metrics,
+                waits=waits,
+                on_capture=recycler.track(capture_sink(pipeline)),
             )
+            finish_page(pipeline, page_num, failed, metrics)
 
-            for idx in range(items_count):
-                try:
-                    print(
-                        f"➡️  Procesando producto {idx + 1}/{items_count} (Página {page_num})"
-                    )
-                    article_nth = items_locator.nth(idx)
-                    # Click en el card interno (zona clickeable)
-                    clickable = article_nth.locator("div.vademecum-item-card")
-                    # Asegurar visibilidad antes del click
-                    clickable.scroll_into_view_if_needed()
-                    clickable.click()
-
-                    # Esperar a que el modal visible aparezca
-                    page.wait_for_selector(
-                        "div.modal.show", state="visible", timeout=12000
-                    )
-                    modal = page.locator("div.modal.show").first
-
-                    # Guardar el HTML completo del modal para parseo posterior
-                    modal_html = modal.evaluate("el => el.outerHTML") if modal else ""
-
-                    # Guardar el archivo debug para tests
-                    with open(
-                        f"debug_modal_{len(productos)}.html", "w", encoding="utf-8"
-                    ) as f:
-                        f.write(modal_html)
-
-                    # Parsear el modal HTML
-                    parsed = parse_modal_html(modal_html)
-                    productos.append(parsed)
-
-                    # Cerrar el modal
-                    close_btn = modal.locator("button.btn-close")
-                    if close_btn.count() > 0:
-                        close_btn.first.click()
-                    else:
-                        # Alternativa: presionar Escape
-                        page.keyboard.press("Escape")
-                    # Esperar a que el modal desaparezca para evitar overlay sobre siguientes clicks
-                    page.wait_for_selector(
-                        "div.modal.show", state="hidden", timeout=8000
-                    )
-                    time.sleep(0.3)
-                except Exception as e:
-                    print(f"⚠️  Error procesando producto {idx + 1}: {e}")
-                    # Intentar cerrar modal si quedó abierto
-                    try:
-                        page.keyboard.press("Escape")
-                    except Exception:
-                        pass
-                    time.sleep(0.5)
-
-            # Verificar si hay una página siguiente
-            next_locator = page.locator("li.next:not(.disabled) a")
-            if next_locator.count() > 0:
-                print("➡️  Avanzando a la página siguiente...")
-                next_locator.first.click()
-                # Esperar a que se carguen los nuevos productos
-                page.wait_for_selector("article[data-key]", timeout=15000)
+            # Reciclar el contexto entre páginas y seguir en la siguiente
+            reason = recycler.should_recycle() if template is not None else None
+            if reason:
+                next_page = recycle_to_next_page(
+                    recycler, reason, page, template, page_num, metrics, waits
+                )
+                if prefetcher is not None:
+                    prefetcher.reset(recycler.context)
+                if next_page is None:
+                    print("✅ No hay más páginas. Finalizando extracción.")
+                    break
+                page = next_page
+                page_num += 1
+                continue
+
+            # Avanzar si hay una página siguiente
+            if prefetcher is not None:
+                next_page = prefetcher.advance(page, page_num)
+                if next_page is not None:
+                    page = next_page
+                    print("➡️  Página siguiente (precargada) lista")
+                    page_num += 1
+                    continue
+                print("✅ No hay más páginas. Finalizando extracción.")
+                break
+            if click_next_page(page, page_num + 1, metrics, waits):
+                print("➡️  Página siguiente cargada")
                 page_num += 1
             else:
                 print("✅ No hay más páginas. Finalizando extracción.")
                 break
 
-        # Guardar resultados en un DataFrame
-        df = pd.DataFrame(productos)
-        df.to_csv("productos_galletitas.csv", index=False, encoding="utf-8")
-        print("💾 Datos guardados en productos_galletitas.csv")
-
         print("✅ Automatización completada exitosamente")
 
     except Exception as e:
@@ -222,140 +1154,720 @@ def run_simple_automation(playwright: Playwright) -> None:
         raise
     finally:
         print("🧹 Cerrando navegador...")
-        context.close()
+        recycler.close()
         browser.close()
 
 
-def parse_modal_html(html: str) -> dict[str, Any]:
-    soup = BeautifulSoup(html, "html.parser")
-    result: dict[str, Any] = {
-        "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "",
-        "MARCA": "",
-        "DENOMINACIÓN DE VENTA": "",
-        "CANTIDAD PORCIÓN (g)": None,
-        "VALOR ENERGÉTICO (Kcal/ porción)": None,
-        "CARBOHIDRATOS (g/porción)": None,
-        "AZÚCARES TOTALES  (g/ porción)": None,
-        "AZÚCARES AÑADIDOS (g/ porción)": None,
-        "PROTEÍNAS  (g/ porción)": None,
-        "GRASAS TOTALES (g/ porción)": None,
-        "GRASAS SATURADAS (g/ porción)": None,
-        "GRASAS TRANS (g/ porción)": None,
-        "GRASAS MONOINSATURADAS (g/ porción)": None,
-        "GRASAS POLINSATURADAS (g/ porción)": None,
-        "COLESTEROL (g/ porción)": None,
-        "FIBRA ALIMENTARIA  (g/ porción)": None,
-        "SODIO  (mg/ porción)": None,
-        "Ingredientes": "",
-        "Actualizado": "",
-        "Fuente": "",
-    }
-
-    # Title
-    title_elem = soup.find("h5", class_="modal-title")
-    if title_elem:
-        title = title_elem.get_text().strip()
-        if " - " in title:
-            name, marca = title.split(" - ", 1)
-        else:
-            # assume last word is marca
-            parts = title.rsplit(" ", 1)
-            if len(parts) == 2:
-                name, marca = parts
-            else:
-                name = title
-                marca = ""
-        result["GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)"] = name.strip()
-        result["MARCA"] = marca.strip(".").strip()
-        # Corrección de errores comunes en el HTML
-        if result["MARCA"] == "Golsfish":
-            result["MARCA"] = "Goldfish"
-
-    # Description
-    desc_elem = soup.find("div", id="vademecum-item-content")
-    if desc_elem:
-        p = desc_elem.find("p")
-        if p:
-            result["DENOMINACIÓN DE VENTA"] = p.get_text().strip()
-
-    # Ingredientes, Actualizado, Fuente
-    for p in soup.find_all("p"):
-        text = p.get_text()
-        if "INGREDIENTES:" in text:
-            result["Ingredientes"] = re.sub(
-                r"\s+", " ", text.replace("INGREDIENTES:", "").strip()
+def run_incremental_update(
+    playwright: Playwright,
+    store_path: str = DEFAULT_STORE,
+    engine: str = "direct",
+    delta_path: Optional[str] = None,
+    archive_path: str = DEFAULT_ARCHIVE,
+    metrics_prefix: Optional[str] = DEFAULT_METRICS,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    output_csv: str = OUTPUT_CSV,
+    prefetch: bool = False,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+    headless: bool = False,
+) -> None:
+    """
+    Actualiza el store pidiendo solo los productos nuevos o modificados.
+
+    Recorre el listado completo leyendo ``data-key``/título de cada card (y la
+    fecha, si el card la muestra). Un modal se pide solo si el producto es
+    nuevo o si su fecha de actualización no coincide con la guardada, y se
+    re-parsea solo si su "Actualizado" cambió. Los productos de la categoría
+    que ya no están en el listado se eliminan, pero solo si se llegó a la
+    última página: si la paginación falla a mitad de camino no se elimina
+    nada. Los cambios se escriben en un delta JSONL.
+    Con ``prefetch`` la página siguiente se carga mientras se procesa la
+    actual (ver ``ListingPrefetcher``); el contexto se recicla según
+    ``recycling`` (ver context_recycler.py).
+    """
+    delta_path = delta_path or default_delta_path()
+    store = ProductStore(store_path)
+    archive = ModalArchive(archive_path)
+    # El crawl secuencial guarda los productos de la categoría por defecto sin
+    # categoría (""); los de otras categorías no se tocan
+    stored_keys = store.listing_keys(DEFAULT_CATEGORY, "")
+    seen: set[str] = set()
+    events_path, summary_path = metrics_paths(metrics_prefix or "")
+    metrics = CrawlMetrics(events_path) if metrics_prefix else NO_METRICS
+    waits = WaitPolicy()
+
+    print("🚀 Iniciando navegador (modo incremental)...")
+    browser, recycler = launch_recycler(
+        playwright, headless, lean=lean, recycling=recycling, metrics=metrics
+    )
+    page = recycler.page
+
+    try:
+        with DeltaWriter(delta_path) as delta:
+            open_listing(page, metrics=metrics, waits=waits, base_url=base_url)
+            endpoint = prepare_engine(page, engine, waits)
+            template = listing_url_template(page)
+            prefetcher = (
+                ListingPrefetcher(recycler.context, template, metrics, waits)
+                if prefetch
+                else None
             )
-        elif "Actualizado:" in text:
-            result["Actualizado"] = text.replace("Actualizado:", "").strip()
-        elif "Fuente:" in text:
-            result["Fuente"] = text.replace("Fuente:", "").strip()
-
-    # Portion
-    portion_p = None
-    for p in soup.find_all("p"):
-        if "Porción" in p.get_text():
-            portion_p = p
-            break
-    if portion_p:
-        m = re.search(r"Porción[:\s]*(\d+)\s*g", portion_p.get_text())
-        if m:
-            result["CANTIDAD PORCIÓN (g)"] = int(m.group(1))
-
-    # Table
-    table = soup.find("table")
-    if table:
-        rows = table.find_all("tr")
-        for row in rows:
-            tds = row.find_all("td")
-            if len(tds) == 2:
-                left = tds[0].get_text().strip()
-                right = tds[1].get_text().strip()
-                # normalize
-                left = re.sub(r"\s+", " ", left)
-                right = re.sub(r"\s+", " ", right)
-                # extract name from left, remove "de las cuales:" if present
-                name_part = left.split("de las cuales:")[0].strip()
-                # text = name_part + " " + right
-                text = name_part + " " + right
-                # parse
-                m = re.search(
-                    r"([A-Za-zÁÉÍÓÚáéíóúÑñ\s]+?)\s+(\d+(?:[.,]\d+)?)\s*(kcal|g|mg)?",
-                    text,
-                    re.IGNORECASE,
+            page_num = 1
+            complete = False
+
+            while True:
+                if prefetcher is not None:
+                    prefetcher.prefetch(page, page_num)
+                items = page.locator("article[data-key]").evaluate_all(
+                    LISTING_KEYS_JS, endpoint.title_selector if endpoint else None
                 )
-                if m:
-                    nut_name = m.group(1).strip().lower()
-                    val_str = m.group(2).replace(",", ".")
+                print(f"🔎 Página {page_num}: {len(items)} productos en el listado")
+
+                for idx, (data_key, title, card_text) in enumerate(items):
+                    entry = ListingEntry.from_card(data_key, title, card_text)
+                    seen.add(entry.data_key)
+                    stored = store.get(entry.data_key)
+                    if not needs_fetch(entry, stored):
+                        metrics.count("products_skipped")
+                        continue
+                    ctx = {"page": page_num, "key": entry.data_key}
                     try:
-                        val = float(val_str) if "." in val_str else int(val_str)
-                    except Exception:
-                        val = val_str
-                    mapping = {
-                        "valor energético": "VALOR ENERGÉTICO (Kcal/ porción)",
-                        "carbohidratos": "CARBOHIDRATOS (g/porción)",
-                        "hidratos de carbono disponibles": "CARBOHIDRATOS (g/porción)",
-                        "azúcares": "AZÚCARES TOTALES  (g/ porción)",
-                        "azucares": "AZÚCARES TOTALES  (g/ porción)",
-                        "azúcares añadidos": "AZÚCARES AÑADIDOS (g/ porción)",
-                        "azucares añadidos": "AZÚCARES AÑADIDOS (g/ porción)",
-                        "proteínas": "PROTEÍNAS  (g/ porción)",
-                        "grasas totales": "GRASAS TOTALES (g/ porción)",
-                        "grasas saturadas": "GRASAS SATURADAS (g/ porción)",
-                        "grasas trans": "GRASAS TRANS (g/ porción)",
-                        "grasas monoinsaturadas": "GRASAS MONOINSATURADAS (g/ porción)",
-                        "grasas poliinsaturadas": "GRASAS POLINSATURADAS (g/ porción)",
-                        "colesterol": "COLESTEROL (g/ porción)",
-                        "fibra": "FIBRA ALIMENTARIA  (g/ porción)",
-                        "sodio": "SODIO  (mg/ porción)",
-                    }
-                    if nut_name in mapping:
-                        result[mapping[nut_name]] = val
+                        if endpoint is not None:
+                            content = waits.retry(
+                                lambda: fetch_modal(
+                                    page,
+                                    endpoint,
+                                    entry.data_key,
+                                    metrics,
+                                    waits,
+                                    **ctx,
+                                ),
+                                metrics,
+                                **ctx,
+                            )
+                            modal_html = build_modal_html(entry.title, content)
+                        else:
+                            article = page.locator("article[data-key]").nth(idx)
+                            modal, modal_html = waits.retry(
+                                lambda: open_modal(
+                                    page, article, metrics, waits, **ctx
+                                ),
+                                metrics,
+                                on_retry=lambda e: dismiss_modal(page, metrics, waits),
+                                **ctx,
+                            )
+                            close_modal(page, modal, metrics, waits, **ctx)
+                        with metrics.stage("save", **ctx):
+                            archive.put(modal_html, entry.data_key)
+                        metrics.count("products_ok")
+                        recycler.products += 1
+                        if not is_changed(modal_html, stored):
+                            continue
+                        with metrics.stage("parse", **ctx):
+                            parsed = parse_modal_html(modal_html)
+                        if parsed == stored:
+                            # Sin fecha en el modal: solo cuenta si el contenido cambió
+                            continue
+                        # El card no trae categoría: se conserva la que guardó
+                        # un crawl por categorías
+                        category = store.category_of(entry.data_key) or ""
+                        store.add(entry.data_key, parsed, page_num, idx, category)
+                        change = "added" if stored is None else "changed"
+                        delta.write(change, entry.data_key, parsed, stored)
+                        print(f"✏️  {change}: {entry.data_key} {entry.title}")
+                    except Exception as e:
+                        print(f"⚠️  Error actualizando producto {entry.data_key}: {e}")
+                        metrics.count("products_failed", **ctx)
+                        if endpoint is None:
+                            dismiss_modal(page, metrics, waits)
 
-    return result
+                metrics.count("pages_done", page=page_num)
+                # Sin página siguiente el listado se recorrió completo; si la
+                # hay y no se llega a ella (redirección, timeout) queda a medias
+                if not has_next_page(page):
+                    complete = True
+                    break
+                reason = recycler.should_recycle() if template is not None else None
+                if reason:
+                    next_page = recycle_to_next_page(
+                        recycler, reason, page, template, page_num, metrics, waits
+                    )
+                    if prefetcher is not None:
+                        prefetcher.reset(recycler.context)
+                    if next_page is None:
+                        break
+                    page = next_page
+                elif prefetcher is not None:
+                    next_page = prefetcher.advance(page, page_num)
+                    if next_page is None:
+                        break
+                    page = next_page
+                elif not click_next_page(page, page_num + 1, metrics, waits):
+                    break
+                page_num += 1
 
+            if complete:
+                for data_key in removed_keys(stored_keys, seen):
+                    delta.write("removed", data_key, previous=store.get(data_key))
+                    store.remove(data_key)
+            else:
+                print(
+                    f"⚠️  El listado se cortó en la página {page_num}: "
+                    "no se elimina ningún producto"
+                )
+                metrics.count("removals_skipped", page=page_num)
+
+            print(f"📝 Delta en {delta_path}: {delta.counts}")
+
+        total = store.export(output_csv)
+        print(f"💾 {total} productos guardados en {output_csv}")
+    finally:
+        print("🧹 Cerrando navegador...")
+        recycler.close()
+        browser.close()
+        store.close()
+        archive.close()
+        finish_lean_report(lean, metrics)
+        metrics.event("timeouts", **waits.snapshot())
+        metrics.write_summary(summary_path)
+        metrics.close()
+
+
+def _parallel_worker(
+    worker_id: int,
+    next_page: Callable[[], Optional[int]],
+    mark_last_page: Callable[[int], None],
+    pipeline: CrawlPipeline,
+    skip_keys: set[str],
+    headless: bool,
+    engine: str,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+) -> None:
+    """
+    Worker del modo paralelo: toma números de página hasta que se agotan.
+
+    Cada worker corre en su propio thread con su propia instancia de
+    Playwright (la API sync no se puede compartir entre threads).
+    """
+    with sync_playwright() as playwright:
+        browser, recycler = launch_recycler(
+            playwright, headless, lean, recycling, metrics
+        )
+        page = recycler.page
+        try:
+            open_listing(page, metrics=metrics, waits=waits, base_url=base_url)
+            template = listing_url_template(page)
+            endpoint = prepare_engine(page, engine, waits)
+
+            while (page_num := next_page()) is not None:
+                if page_num > 1 and template is not None:
+                    if reason := recycler.should_recycle():
+                        page = recycler.recycle(reason)
+                if page_num > 1:
+                    if template is None or not goto_listing_page(
+                        page, template, page_num, metrics, waits
+                    ):
+                        # Página fuera de rango: no hay más trabajo
+                        mark_last_page(page_num - 1)
+                        continue
+                elif template is None:
+                    # Listado de una sola página
+                    mark_last_page(1)
+                print(f"🧵 Worker {worker_id}: página {page_num}")
+                _, failed = scrape_listing_page(
+                    page,
+                    page_num,
+                    endpoint=endpoint,
+                    skip_keys=skip_keys,
+                    metrics=metrics,
+                    waits=waits,
+                    on_capture=recycler.track(capture_sink(pipeline)),
+                )
+                finish_page(pipeline, page_num, failed, metrics)
+        finally:
+            recycler.close()
+            browser.close()
+
+
+def run_parallel_automation(
+    workers: int,
+    headless: bool = True,
+    engine: str = "click",
+    store: Optional[ProductStore] = None,
+    archive: Optional[ModalArchive] = None,
+    resume: bool = False,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: Optional[WaitPolicy] = None,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    pipeline: Optional[CrawlPipeline] = None,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+    output_csv: str = OUTPUT_CSV,
+) -> None:
+    """
+    Reparte las páginas del listado entre ``workers`` navegadores.
+
+    Cada worker aplica el filtro de categoría en su propio contexto y luego
+    navega directo a las páginas que le tocan. Los productos van al store
+    con su (página, posición), por lo que la exportación final respeta el
+    orden original del listado. Todos los workers entregan sus modales al
+    mismo ``pipeline`` (se crea uno si no se pasa). Con un store propio lo
+    exporta al terminar a ``output_csv`` (.csv o .parquet).
+    """
+    print(f"🚀 Iniciando {workers} workers en paralelo...")
+
+    own_store = store is None
+    store = store or ProductStore()
+    own_archive = archive is None
+    archive = archive or ModalArchive()
+    done_pages = store.finished_pages() if resume else set()
+    skip_keys = store.keys() if resume else set()
+    waits = waits or WaitPolicy()
+    own_pipeline = pipeline is None
+    pipeline = pipeline or CrawlPipeline(store, archive, metrics=metrics)
+
+    lock = threading.Lock()
+    counter = itertools.count(1)
+    last_page: list[Optional[int]] = [None]
+
+    def next_page() -> Optional[int]:
+        with lock:
+            page_num = next(counter)
+            while page_num in done_pages:
+                page_num = next(counter)
+            if last_page[0] is not None and page_num > last_page[0]:
+                return None
+            return page_num
+
+    def mark_last_page(page_num: int) -> None:
+        with lock:
+            if last_page[0] is None or page_num < last_page[0]:
+                last_page[0] = page_num
+
+    try:
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="worker"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _parallel_worker,
+                    i,
+                    next_page,
+                    mark_last_page,
+                    pipeline,
+                    skip_keys,
+                    headless,
+                    engine,
+                    metrics,
+                    waits,
+                    lean,
+                    base_url,
+                    recycling,
+                )
+                for i in range(workers)
+            ]
+            for future in futures:
+                future.result()
+
+        if own_pipeline:
+            pipeline.close()
+        print(f"✅ {store.count()} productos en el store")
+        if own_store:
+            total = store.export(output_csv)
+            print(f"💾 {total} productos guardados en {output_csv}")
+    finally:
+        if own_pipeline:
+            pipeline.close()
+        if own_store:
+            store.close()
+        if own_archive:
+            archive.close()
+
+
+LISTING_DATA_KEYS_JS = "articles => articles.map(a => a.dataset.key)"
 
-if __name__ == "__main__":
-    from playwright.sync_api import sync_playwright
 
+def goto_work_unit(
+    page: Page,
+    unit: WorkUnit,
+    scheduler: CrawlScheduler,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    base_url: str = BASE_URL,
+) -> bool:
+    """
+    Deja la página en el listado de ``unit``; False si esa página no existe.
+
+    La página 1 (o cualquiera, si todavía no se conoce la URL de las páginas
+    de la categoría) se abre aplicando el filtro; el resto se navega directo
+    con el template compartido por el scheduler.
+    """
+    template = scheduler.template(unit.category)
+    if unit.page_num == 1 or template is UNKNOWN:
+        open_listing(page, unit.category, metrics, waits, base_url)
+        template = listing_url_template(page)
+        scheduler.set_template(unit.category, template)
+        if unit.page_num == 1:
+            return True
+    if template is None:
+        # Listado de una sola página
+        return False
+    return goto_listing_page(page, template, unit.page_num, metrics, waits)
+
+
+def _category_worker(
+    worker_id: int,
+    scheduler: CrawlScheduler,
+    store: ProductStore,
+    pipeline: CrawlPipeline,
+    headless: bool,
+    engine: str,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: WaitPolicy = DEFAULT_WAITS,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+) -> None:
+    """
+    Worker del crawl por categorías: consume unidades (categoría, página)
+    hasta que el scheduler se queda sin trabajo.
+
+    Apenas carga una página encola la siguiente, y solo descarga los
+    productos que logra reclamar (los demás ya los tomó otra categoría o
+    estaban guardados). Una unidad que falla no frena al worker: su página
+    queda sin marcar y ``--resume`` la retoma.
+    """
     with sync_playwright() as playwright:
-        run_simple_automation(playwright)
+        browser, recycler = launch_recycler(
+            playwright, headless, lean, recycling, metrics
+        )
+        page = recycler.page
+        endpoint: Optional[ModalEndpoint] = None
+        prepared = False
+        try:
+            while (unit := scheduler.next_unit()) is not None:
+                ctx = {"category": unit.category, "page": unit.page_num}
+                try:
+                    # Cada unidad navega a su página: se puede reciclar antes
+                    if reason := recycler.should_recycle():
+                        page = recycler.recycle(reason)
+                    if not goto_work_unit(
+                        page, unit, scheduler, metrics, waits, base_url
+                    ):
+                        continue
+                    if not prepared:
+                        endpoint = prepare_engine(page, engine, waits)
+                        prepared = True
+                    if has_next_page(page):
+                        scheduler.put(WorkUnit(unit.category, unit.page_num + 1))
+
+                    keys = page.locator("article[data-key]").evaluate_all(
+                        LISTING_DATA_KEYS_JS
+                    )
+                    store.add_memberships(unit.category, unit.page_num, keys)
+                    skip_keys = set(keys) - scheduler.claim(keys)
+                    metrics.count("products_shared", len(skip_keys), **ctx)
+                    print(
+                        f"🧵 Worker {worker_id}: {unit.category}, página "
+                        f"{unit.page_num} ({len(keys) - len(skip_keys)} nuevos)"
+                    )
+                    _, failed = scrape_listing_page(
+                        page,
+                        unit.page_num,
+                        endpoint=endpoint,
+                        skip_keys=skip_keys,
+                        metrics=metrics,
+                        waits=waits,
+                        on_capture=recycler.track(
+                            capture_sink(pipeline, unit.category)
+                        ),
+                    )
+                    finish_page(pipeline, unit.page_num, failed, metrics, unit.category)
+                except Exception as e:
+                    print(
+                        f"⚠️  Worker {worker_id}: error en {unit.category}, "
+                        f"página {unit.page_num}: {e}"
+                    )
+                    metrics.count("pages_failed", **ctx)
+                finally:
+                    scheduler.done(unit)
+        finally:
+            recycler.close()
+            browser.close()
+
+
+def run_category_crawl(
+    playwright: Playwright,
+    categories: list[str],
+    workers: int = 1,
+    headless: bool = True,
+    engine: str = "click",
+    store: Optional[ProductStore] = None,
+    archive: Optional[ModalArchive] = None,
+    resume: bool = False,
+    metrics: CrawlMetrics = NO_METRICS,
+    waits: Optional[WaitPolicy] = None,
+    lean: Optional[LeanProfile] = None,
+    base_url: str = BASE_URL,
+    pipeline: Optional[CrawlPipeline] = None,
+    recycling: RecycleOptions = DEFAULT_RECYCLING,
+) -> list[str]:
+    """
+    Recorre varias categorías con ``workers`` navegadores sobre una cola
+    compartida de unidades (categoría, página) (ver crawl_scheduler.py).
+
+    Con ``categories`` vacío las descubre del filtro del sitio (con
+    ``playwright``; los workers usan cada uno su propia instancia). Devuelve
+    las categorías recorridas; con un ``pipeline`` propio hay que cerrarlo
+    antes de exportar.
+    """
+    store = store or ProductStore()
+    archive = archive or ModalArchive()
+    waits = waits or WaitPolicy()
+    if not categories:
+        print("🔍 Descubriendo categorías...")
+        browser, context = launch_context(
+            playwright, headless, lean, recycling.storage_state
+        )
+        try:
+            categories = discover_categories(
+                context.new_page(), metrics, waits, base_url
+            )
+        finally:
+            context.close()
+            browser.close()
+    print(f"📂 {len(categories)} categorías: {', '.join(categories)}")
+
+    if not resume:
+        for category in categories:
+            store.reset_pages(category)
+    scheduler = CrawlScheduler(
+        categories,
+        done_pages=(
+            {category: store.finished_pages(category) for category in categories}
+            if resume
+            else None
+        ),
+        claimed=store.keys() if resume else (),
+    )
+
+    print(f"🚀 Iniciando {workers} workers sobre la cola de categorías...")
+    own_pipeline = pipeline is None
+    pipeline = pipeline or CrawlPipeline(store, archive, metrics=metrics)
+    try:
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="worker"
+        ) as executor:
+            futures = [
+                executor.submit(
+                    _category_worker,
+                    i,
+                    scheduler,
+                    store,
+                    pipeline,
+                    headless,
+                    engine,
+                    metrics,
+                    waits,
+                    lean,
+                    base_url,
+                    recycling,
+                )
+                for i in range(workers)
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        if own_pipeline:
+            pipeline.close()
+    print(f"✅ {store.count()} productos en el store")
+    return scheduler.categories
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Extrae productos del vademecum de Nutrinfo."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Navegadores en paralelo (cada uno procesa páginas distintas del listado)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=["click", "direct"],
+        default="click",
+        help="click: abre cada modal por UI; direct: descarga el HTML de los modales sin UI",
+    )
+    parser.add_argument(
+        "--store",
+        default=DEFAULT_STORE,
+        help="Base SQLite donde se guarda cada producto apenas se parsea",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Retoma un crawl interrumpido salteando los productos ya guardados",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Solo pide y re-parsea productos nuevos o con otra fecha 'Actualizado'",
+    )
+    parser.add_argument(
+        "--delta",
+        default=None,
+        help="Archivo JSONL con los cambios del modo incremental (default: delta_<fecha>.jsonl)",
+    )
+    parser.add_argument(
+        "--archive",
+        default=DEFAULT_ARCHIVE,
+        help="Archivo pack donde se guarda el HTML crudo de cada modal",
+    )
+    parser.add_argument(
+        "--parse-cache",
+        default=None,
+        help="Base SQLite del cache de parseo (no re-parsea modales que no cambiaron)",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=DEFAULT_METRICS,
+        help="Prefijo del log de eventos y del resumen por etapa ('' para desactivar)",
+    )
+    parser.add_argument(
+        "--lean",
+        action="store_true",
+        help="Perfil liviano: headless, sin imágenes, media, fuentes ni analytics/ads",
+    )
+    parser.add_argument(
+        "--headless",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Navegadores sin ventana (default: con ventana salvo con --workers > 1 o --categories)",
+    )
+    parser.add_argument(
+        "--allow",
+        action="append",
+        default=[],
+        help="Con --lean, no bloquear URLs que contengan este texto (repetible)",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=BASE_URL,
+        help="URL del vademecum (p. ej. la réplica local de replay_server.py)",
+    )
+    parser.add_argument(
+        "--categories",
+        default=None,
+        help=(
+            "Categorías a recorrer separadas por coma, o 'all' para todas las del "
+            "filtro (default: solo Galletitas)"
+        ),
+    )
+    parser.add_argument(
+        "--output",
+        default=None,
+        help=(
+            f"CSV (o .parquet) donde se exporta el store (default: {OUTPUT_CSV}, "
+            f"o {COMBINED_CSV} con --categories)"
+        ),
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        default=DEFAULT_PARSE_WORKERS,
+        help="Parsers en paralelo al navegador (0: parsear en el thread del navegador)",
+    )
+    parser.add_argument(
+        "--parse-processes",
+        action="store_true",
+        help="Parsear en procesos en lugar de threads",
+    )
+    parser.add_argument(
+        "--prefetch",
+        action="store_true",
+        help="Precargar la página siguiente del listado mientras se procesa la actual",
+    )
+    parser.add_argument(
+        "--recycle-every",
+        type=int,
+        default=DEFAULT_RECYCLE_EVERY,
+        help="Reciclar el contexto del navegador cada N productos (0: nunca)",
+    )
+    parser.add_argument(
+        "--max-rss-mb",
+        type=float,
+        default=0,
+        help="Reciclar el contexto si el RSS del navegador supera estos MB (0: sin techo)",
+    )
+    parser.add_argument(
+        "--storage-state",
+        default=None,
+        help="JSON con cookies/storage: se carga al arrancar y se guarda al reciclar y al terminar",
+    )
+    args = parser.parse_args()
+    categories = parse_categories(args.categories)
+    recycling = RecycleOptions(args.recycle_every, args.max_rss_mb, args.storage_state)
+    if args.incremental:
+        # El modo incremental recorre el listado con un solo navegador y
+        # parsea en el mismo thread
+        ignored = {
+            "--categories": categories is not None,
+            "--workers": args.workers != 1,
+            "--resume": args.resume,
+            "--parse-workers": args.parse_workers != DEFAULT_PARSE_WORKERS,
+            "--parse-processes": args.parse_processes,
+        }
+        for flag, given in ignored.items():
+            if given:
+                parser.error(f"{flag} no se puede combinar con --incremental")
+    output_csv = args.output or (OUTPUT_CSV if categories is None else COMBINED_CSV)
+    if args.parse_cache:
+        parse_cache.configure(args.parse_cache)
+    lean = LeanProfile(allow=args.allow) if args.lean else None
+
+    with sync_playwright() as playwright:
+        if args.incremental:
+            run_incremental_update(
+                playwright,
+                store_path=args.store,
+                engine=args.engine,
+                delta_path=args.delta,
+                archive_path=args.archive,
+                metrics_prefix=args.metrics,
+                lean=lean,
+                base_url=args.base_url,
+                output_csv=output_csv,
+                prefetch=args.prefetch,
+                recycling=recycling,
+                headless=bool(args.headless),
+            )
+            return
+        run_simple_automation(
+            playwright,
+            workers=args.workers,
+            engine=args.engine,
+            store_path=args.store,
+            resume=args.resume,
+            archive_path=args.archive,
+            metrics_prefix=args.metrics,
+            lean=lean,
+            base_url=args.base_url,
+            output_csv=output_csv,
+            categories=categories,
+            parse_workers=args.parse_workers,
+            parse_processes=args.parse_processes,
+            prefetch=args.prefetch,
+            recycling=recycling,
+            headless=args.headless,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Tests del benchmark de parsers.
+Ejecuta con: python -m pytest test_bench_parsers.py
+"""
+
+import copy
+
+import parse_cache
+from bench_parsers import compare, load_corpus, percentile, run_benchmarks
+
+
+def test_percentile_interpolates():
+    assert percentile([5.0], 99) == 5.0
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([4.0, 1.0, 3.0, 2.0], 100) == 4.0
+
+
+def test_run_benchmarks_reports_metrics():
+    docs = load_corpus(["debug_modal_100.html", "debug_modal_2.html"])
+    report = run_benchmarks(
+        docs, ["parse_modal_html[lxml]", "process_csv"], repeat=2, browser=False
+    )
+    assert report["meta"]["documents"] == 2
+    assert set(report["results"]) == {"parse_modal_html[lxml]", "process_csv"}
+    per_doc = report["results"]["parse_modal_html[lxml]"]
+    assert per_doc["samples"] == 4
+    assert per_doc["p50_ms"] <= per_doc["p99_ms"] <= per_doc["max_ms"]
+    assert per_doc["docs_per_s"] > 0
+    assert per_doc["peak_kib_max"] > 0
+    # process_csv se mide como una corrida por pasada sobre todo el corpus
+    assert report["results"]["process_csv"]["samples"] == 2
+
+
+def test_run_benchmarks_leaves_the_shared_cache_alone(tmp_path):
+    parse_cache.configure(str(tmp_path / "shared.sqlite"))
+    try:
+        shared = parse_cache.default_cache()
+        docs = load_corpus(["debug_modal_2.html"])
+        report = run_benchmarks(docs, ["parse_document"], repeat=1, browser=False)
+        assert report["results"]["parse_document"]["samples"] == 1
+        # el benchmark no usó el cache compartido ni lo apagó
+        assert len(shared) == 0
+        assert parse_cache.default_cache() is shared
+    finally:
+        parse_cache.configure(None)
+
+
+def test_compare_flags_regressions():
+    baseline = {
+        "meta": {},
+        "results": {"x": {"p50_ms": 1.0, "p99_ms": 2.0, "docs_per_s": 100.0}},
+    }
+    current = copy.deepcopy(baseline)
+    assert compare(current, baseline) == []
+    current["results"]["x"]["p50_ms"] = 1.5
+    current["results"]["x"]["docs_per_s"] = 50.0
+    assert compare(current, baseline) == ["x.p50_ms", "x.docs_per_s"]
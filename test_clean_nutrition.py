@@ -0,0 +1,90 @@
+"""
+Tests del pipeline de limpieza de tablas nutricionales.
+Ejecuta con: python -m pytest test_clean_nutrition.py
+"""
+
+import pandas as pd
+
+from clean_nutrition import (
+    parse_document,
+    parse_table_from_html,
+    process_csv,
+    process_csv_streaming,
+)
+
+
+def load(name: str) -> str:
+    with open(name, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_parse_document_single_tree():
+    html = load("debug_modal_100.html")
+    portion, title, nutrients = parse_document(html)
+    assert portion == "Porción: 30 g (5 unidades)"
+    assert title == "Galletitas Integrales Sabor Vainilla Zafranito"
+    assert nutrients and nutrients == parse_table_from_html(html)
+    assert parse_document("") == (None, None, [])
+
+
+def test_parse_table_from_bare_table_fragment():
+    html = (
+        "<table><tr><td><p>Sodio</p></td><td>390 mg</td></tr>"
+        "<tr><td>Proteínas 16 g</td><td>20%</td></tr></table>"
+    )
+    assert parse_table_from_html(html) == [
+        {"Nutriente": "Proteínas", "Cantidad": "16", "Unidad": "g", "%VD": 20}
+    ]
+
+
+def test_process_csv_long_and_wide(tmp_path):
+    html = load("debug_modal_100.html")
+    src = tmp_path / "productos.csv"
+    pd.DataFrame(
+        [
+            # descripcion vacía: el producto igual debe aparecer en el wide
+            {"titulo": "A", "descripcion": None, "modal_html": html},
+            {"titulo": "B", "descripcion": "x", "modal_html": ""},
+            {"titulo": "C", "descripcion": "y", "tabla_nutricional": html},
+        ]
+    ).to_csv(src, index=False)
+    out_long, out_wide = tmp_path / "long.csv", tmp_path / "wide.csv"
+    info = process_csv(str(src), str(out_long), str(out_wide))
+
+    long_df = pd.read_csv(out_long)
+    per_product = len(parse_table_from_html(html))
+    assert info["rows_long"] == str(2 * per_product)
+    assert list(long_df["_origen_html"].unique()) == ["modal_html", "tabla_nutricional"]
+    assert long_df["Cantidad_num"].notna().all()
+
+    wide_df = pd.read_csv(out_wide)
+    assert list(wide_df["_row"]) == [0, 2]
+    assert wide_df.loc[0, "Sodio [mg]"] == 34
+    assert wide_df.loc[0, "Sodio (%VD)"] == 1
+    # Azúcares no informa %VD en ningún producto: no se genera la columna
+    assert "Azúcares (%VD)" not in wide_df.columns
+
+
+def test_streaming_matches_in_memory(tmp_path):
+    src = tmp_path / "productos.csv"
+    pd.DataFrame(
+        [
+            {"titulo": f"T{i}", "modal_html": load(f"debug_modal_{i}.html")}
+            for i in range(100, 106)
+        ]
+    ).to_csv(src, index=False)
+
+    outputs = {}
+    for mode in ("memoria", "stream"):
+        out_long, out_wide = (
+            tmp_path / f"{mode}_long.csv",
+            tmp_path / f"{mode}_wide.csv",
+        )
+        if mode == "memoria":
+            info = process_csv(str(src), str(out_long), str(out_wide))
+        else:
+            info = process_csv_streaming(
+                str(src), str(out_long), str(out_wide), chunksize=1
+            )
+        outputs[mode] = (info["rows_long"], out_long.read_text(), out_wide.read_text())
+    assert outputs["memoria"] == outputs["stream"]
@@ -0,0 +1,138 @@
+"""
+Tests de la salida Parquet normalizada (productos + nutrientes).
+Ejecuta con: python -m pytest test_columnar.py
+"""
+
+import pandas as pd
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+import columnar
+from clean_nutrition import build_long, finish_long, process_csv
+from product_store import ProductStore
+
+
+def load(name: str) -> str:
+    with open(name, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def source_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "titulo": f"T{i}",
+                "ingredientes": "harina de trigo, azúcar " * 20,
+                "modal_html": load(f"debug_modal_{i}.html"),
+            }
+            for i in range(100, 104)
+        ]
+    )
+
+
+def long_frame() -> pd.DataFrame:
+    keep = ["titulo", "ingredientes"]
+    return finish_long(build_long(source_frame(), keep), keep)
+
+
+def test_split_long_normalizes_products():
+    long_df = long_frame()
+    products, nutrients = columnar.split_long(long_df)
+
+    assert list(products[columnar.PRODUCT_ID]) == [0, 1, 2, 3]
+    assert list(products["titulo"]) == ["T100", "T101", "T102", "T103"]
+    assert "Nutriente" not in products.columns
+    assert list(nutrients.columns) == [columnar.PRODUCT_ID] + columnar.NUTRIENT_COLUMNS
+    assert nutrients[columnar.PRODUCT_ID].dtype == "int32"
+    assert len(nutrients) == len(long_df)
+    rebuilt = products.set_index(columnar.PRODUCT_ID).loc[
+        nutrients[columnar.PRODUCT_ID], "titulo"
+    ]
+    assert list(rebuilt) == list(long_df["titulo"])
+
+
+def test_write_and_load_long_roundtrip(tmp_path):
+    long_df = long_frame()
+    path = str(tmp_path / "long.parquet")
+    assert columnar.write_long(long_df, path) == 4
+
+    schema = pq.read_schema(path)
+    assert "ingredientes" not in schema.names
+    assert pa.types.is_dictionary(schema.field("Nutriente").type)
+    assert pa.types.is_dictionary(schema.field("Unidad").type)
+
+    loaded = columnar.load_long(path)
+    assert list(loaded.columns) == list(long_df.columns)
+    pd.testing.assert_frame_equal(
+        loaded.astype(str), long_df.astype(str), check_categorical=False
+    )
+
+
+def test_load_long_projection(tmp_path, monkeypatch):
+    path = str(tmp_path / "long.parquet")
+    columnar.write_long(long_frame(), path)
+
+    read = []
+    original = columnar.read_table
+
+    def spy(p, columns=None):
+        read.append((p, list(columns)))
+        return original(p, columns)
+
+    monkeypatch.setattr(columnar, "read_table", spy)
+    only_nutrients = columnar.load_long(path, ["Nutriente", "Cantidad_num"])
+    assert list(only_nutrients.columns) == ["Nutriente", "Cantidad_num"]
+    # sin columnas del producto no se abre la tabla de productos
+    assert read == [(path, ["product_id", "Nutriente", "Cantidad_num"])]
+
+    read.clear()
+    mixed = columnar.load_long(path, ["titulo", "Nutriente_unidad"])
+    assert list(mixed.columns) == ["titulo", "Nutriente_unidad"]
+    assert read[1] == (columnar.products_path(path), ["product_id", "titulo"])
+    assert "Sodio [mg]" in set(mixed["Nutriente_unidad"])
+
+    with pytest.raises(KeyError):
+        columnar.load_long(path, ["no_existe"])
+
+
+def test_process_csv_parquet_matches_csv(tmp_path):
+    src = tmp_path / "productos.csv"
+    source_frame().to_csv(src, index=False)
+    process_csv(str(src), str(tmp_path / "long.csv"), str(tmp_path / "wide.csv"))
+    info = process_csv(
+        str(src), str(tmp_path / "long.parquet"), str(tmp_path / "wide.parquet")
+    )
+
+    csv_long = pd.read_csv(tmp_path / "long.csv")
+    parquet_long = columnar.load_long(str(tmp_path / "long.parquet"))
+    assert info["rows_long"] == str(len(csv_long))
+    assert list(parquet_long["Cantidad_num"]) == list(csv_long["Cantidad_num"])
+    assert list(parquet_long["titulo"]) == list(csv_long["titulo"])
+
+    csv_wide = pd.read_csv(tmp_path / "wide.csv")
+    parquet_wide = columnar.read_table(str(tmp_path / "wide.parquet"))
+    assert list(parquet_wide.columns) == list(csv_wide.columns)
+
+    # la entrada también puede ser Parquet
+    src_parquet = str(tmp_path / "productos.parquet")
+    columnar.write_table(source_frame(), src_parquet)
+    again = process_csv(
+        src_parquet, str(tmp_path / "long2.csv"), str(tmp_path / "wide2.csv")
+    )
+    assert again["rows_long"] == info["rows_long"]
+    assert (tmp_path / "long2.csv").read_text() == (tmp_path / "long.csv").read_text()
+
+
+def test_store_export_parquet(tmp_path):
+    store = ProductStore(str(tmp_path / "productos.sqlite"))
+    store.add("10", {"MARCA": "A", "SODIO  (mg/ porción)": 12.5}, 1, 0)
+    store.add("11", {"MARCA": "B", "SODIO  (mg/ porción)": None}, 1, 1)
+    out = str(tmp_path / "productos.parquet")
+    assert store.export(out) == 2
+    store.close()
+
+    df = columnar.read_table(out, ["data_key", "SODIO  (mg/ porción)"])
+    assert list(df["data_key"]) == ["10", "11"]
+    assert df["SODIO  (mg/ porción)"].dtype == "float64"
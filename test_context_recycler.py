@@ -0,0 +1,125 @@
+"""
+Tests del reciclado de contextos (con contextos simulados).
+Ejecuta con: python -m pytest test_context_recycler.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from context_recycler import (
+    ContextRecycler,
+    RecycleOptions,
+    _proc_tree_rss,
+    process_tree_rss,
+)
+from simple_automation import new_context
+
+
+class FakeContext:
+    def __init__(self, cookies: list):
+        self.cookies = cookies
+        self.closed = False
+        self.pages = 0
+
+    def new_page(self) -> str:
+        self.pages += 1
+        return f"page-{id(self)}"
+
+    def storage_state(self) -> dict:
+        return {"cookies": self.cookies, "origins": []}
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.kwargs: list[dict] = []
+
+    def new_context(self, **kwargs) -> FakeContext:
+        self.kwargs.append(kwargs)
+        state = kwargs.get("storage_state")
+        if isinstance(state, dict):
+            return FakeContext(list(state["cookies"]))
+        return FakeContext([{"name": "consent", "value": "1"}])
+
+
+def test_recycles_after_n_products_and_keeps_storage_state(tmp_path):
+    state = str(tmp_path / "state.json")
+    browser = FakeBrowser()
+    recycler = ContextRecycler(
+        lambda s: new_context(browser, storage_state=s),
+        RecycleOptions(max_products=3, storage_state=state),
+    )
+    seen = []
+    on_capture = recycler.track(seen.append)
+    for i in range(2):
+        on_capture(i)
+    assert recycler.should_recycle() is None
+    on_capture(2)
+    assert recycler.should_recycle() == "products"
+
+    first = recycler.context
+    page = recycler.recycle("products")
+    assert first.closed and page == recycler.page != f"page-{id(first)}"
+    assert recycler.products == 0 and seen == [0, 1, 2]
+    # El primer contexto arrancó en frío; el segundo con el estado del anterior
+    assert browser.kwargs[0]["storage_state"] is None
+    assert browser.kwargs[1]["storage_state"]["cookies"] == first.cookies
+    with open(state, "r", encoding="utf-8") as f:
+        assert json.load(f)["cookies"] == [{"name": "consent", "value": "1"}]
+    recycler.close()
+    assert recycler.context.closed
+
+
+def test_recycle_keeps_session_without_storage_state_file():
+    browser = FakeBrowser()
+    recycler = ContextRecycler(
+        lambda s: new_context(browser, storage_state=s),
+        RecycleOptions(max_products=1),
+    )
+    recycler.context.cookies.append({"name": "session", "value": "abc"})
+    recycler.recycle("products")
+    assert {"name": "session", "value": "abc"} in recycler.context.cookies
+    recycler.close()
+
+
+def test_rss_ceiling_needs_work_since_last_recycle():
+    rss = [900 * 2**20]
+    recycler = ContextRecycler(
+        lambda state: FakeContext([]),
+        RecycleOptions(max_products=0, max_rss_mb=512),
+        rss=lambda: rss[0],
+    )
+    # Sin productos procesados no se recicla aunque el RSS esté arriba
+    assert recycler.should_recycle() is None
+    recycler.products = 1
+    assert recycler.should_recycle() == "rss"
+    recycler.recycle("rss")
+    recycler.products = 1
+    rss[0] = 100 * 2**20
+    assert recycler.should_recycle() is None
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="requiere /proc")
+def test_process_tree_rss_includes_children():
+    alone = _proc_tree_rss(os.getpid())
+    assert alone and alone > 0
+    child = subprocess.Popen(
+        [sys.executable, "-c", "import time; x = b'x' * 30_000_000; time.sleep(5)"]
+    )
+    try:
+        for _ in range(50):
+            with_child = process_tree_rss()
+            if with_child > alone + 20_000_000:
+                break
+            subprocess.run([sys.executable, "-c", "pass"])
+        assert with_child > alone + 20_000_000
+    finally:
+        child.kill()
+        child.wait()
@@ -0,0 +1,71 @@
+"""
+Tests de la instrumentación del crawler.
+Ejecuta con: python -m pytest test_crawl_metrics.py
+"""
+
+import json
+import threading
+
+import pytest
+
+from crawl_metrics import NO_METRICS, CrawlMetrics, histogram
+
+
+def test_histogram_buckets():
+    buckets = histogram([0.5, 1.0, 3.0, 250.0, 20000.0])
+    assert buckets["<=1ms"] == 2
+    assert buckets["<=5ms"] == 1
+    assert buckets["<=500ms"] == 1
+    assert buckets[">10000ms"] == 1
+    assert sum(buckets.values()) == 5
+
+
+def test_stages_counters_and_event_log(tmp_path):
+    events = tmp_path / "crawl.jsonl"
+    with CrawlMetrics(str(events)) as metrics:
+        for _ in range(3):
+            with metrics.stage("parse", page=1, key="10"):
+                pass
+        with pytest.raises(RuntimeError):
+            with metrics.stage("modal_open", page=1):
+                raise RuntimeError("timeout")
+        metrics.count("products_ok", 3)
+        metrics.count("products_failed")
+        summary = metrics.write_summary(str(tmp_path / "summary.json"))
+
+    assert summary["counters"] == {"products_ok": 3, "products_failed": 1}
+    assert summary["stages"]["parse"]["count"] == 3
+    assert summary["stages"]["modal_open"]["failed"] == 1
+    assert sum(summary["stages"]["parse"]["histogram"].values()) == 3
+    assert json.loads((tmp_path / "summary.json").read_text()) == summary
+
+    lines = [json.loads(line) for line in events.read_text().splitlines()]
+    stages = [e for e in lines if e["event"] == "stage"]
+    assert len(stages) == 4
+    assert stages[0]["key"] == "10" and stages[0]["thread"] == "MainThread"
+    assert stages[-1]["error"] == "RuntimeError: timeout"
+
+
+def test_metrics_are_thread_safe():
+    metrics = CrawlMetrics()
+
+    def work():
+        for _ in range(200):
+            with metrics.stage("save"):
+                metrics.count("products_ok")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    summary = metrics.summary()
+    assert summary["counters"]["products_ok"] == 800
+    assert summary["stages"]["save"]["count"] == 800
+
+
+def test_disabled_metrics_record_nothing():
+    with NO_METRICS.stage("parse"):
+        NO_METRICS.count("products_ok")
+    assert NO_METRICS.summary()["stages"] == {}
+    assert NO_METRICS.summary()["counters"] == {}
@@ -0,0 +1,214 @@
+"""
+Tests del pipeline captura → parseo → escritura.
+Ejecuta con: python -m pytest test_crawl_pipeline.py
+"""
+
+import threading
+
+import pytest
+
+import crawl_pipeline
+import simple_automation
+from crawl_pipeline import CrawlPipeline, PipelineItem
+from modal_archive import ModalArchive
+from modal_parser import parse_modal_html
+from product_store import ProductStore
+from simple_automation import ModalEndpoint, fetch_listing_page, finish_page
+from wait_policy import WaitPolicy
+
+FILES = [f"debug_modal_{n}.html" for n in range(1, 7)]
+
+
+def _docs() -> list[str]:
+    docs = []
+    for path in FILES:
+        with open(path, "r", encoding="utf-8") as f:
+            docs.append(f.read())
+    return docs
+
+
+def _items(docs: list[str], per_page: int = 3) -> list[PipelineItem]:
+    return [
+        PipelineItem(
+            str(10000 + i), html, i // per_page + 1, i % per_page, "Galletitas"
+        )
+        for i, html in enumerate(docs)
+    ]
+
+
+@pytest.mark.parametrize("parse_workers,processes", [(0, False), (3, False), (2, True)])
+def test_pipeline_stores_everything_in_listing_order(
+    tmp_path, parse_workers, processes
+):
+    docs = _docs()
+    with (
+        ProductStore(str(tmp_path / "store.sqlite")) as store,
+        ModalArchive(str(tmp_path / "modals.pack")) as archive,
+    ):
+        with CrawlPipeline(
+            store, archive, parse_workers, processes, batch_size=4
+        ) as pipeline:
+            for item in _items(docs):
+                pipeline.submit(item)
+            pipeline.page_done(1, "Galletitas")
+            pipeline.page_done(2, "Galletitas")
+
+        assert store.records("Galletitas") == [parse_modal_html(html) for html in docs]
+        assert store.finished_pages("Galletitas") == {1, 2}
+        assert archive.latest("10005") == docs[5]
+
+
+def test_page_is_marked_only_after_its_products_are_written(tmp_path):
+    docs = _docs()
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        archive = ModalArchive(str(tmp_path / "modals.pack"))
+        pipeline = CrawlPipeline(
+            store, archive, parse_workers=2, batch_size=100, flush_interval_s=60
+        )
+        for item in _items(docs, per_page=6):
+            pipeline.submit(item)
+        pipeline.page_done(1, "Galletitas")
+        # El lote todavía está en memoria: la página no puede figurar terminada
+        assert store.finished_pages("Galletitas") == set()
+        pipeline.close()
+        archive.close()
+        assert store.finished_pages("Galletitas") == {1}
+        assert store.count() == 6
+
+
+class _BlockingStore:
+    def __init__(self, fail: bool = False):
+        self.release = threading.Event()
+        self.fail = fail
+        self.rows: list = []
+        self.pages: list = []
+
+    def add_many(self, rows):
+        self.release.wait(5)
+        if self.fail:
+            raise OSError("disco lleno")
+        self.rows += rows
+
+    def mark_page_done(self, page_num, category=""):
+        self.pages.append((category, page_num))
+
+
+class _NullArchive:
+    def put_many(self, items):
+        return []
+
+
+def test_full_queues_block_the_browser():
+    store = _BlockingStore()
+    pipeline = CrawlPipeline(
+        store, _NullArchive(), parse_workers=1, queue_size=1, batch_size=1
+    )
+    html = _docs()[0]
+    submitted = threading.Event()
+
+    def browser():
+        for i in range(10):
+            pipeline.submit(PipelineItem(str(i), html, 1, i))
+        submitted.set()
+
+    thread = threading.Thread(target=browser)
+    thread.start()
+    # El writer está trabado: las colas se llenan y submit bloquea
+    assert not submitted.wait(0.5)
+    store.release.set()
+    thread.join(5)
+    assert submitted.is_set()
+    pipeline.page_done(1)
+    pipeline.close()
+    assert len(store.rows) == 10
+    assert store.pages == [("", 1)]
+
+
+def test_write_errors_surface_and_keep_the_page_pending():
+    store = _BlockingStore(fail=True)
+    store.release.set()
+    pipeline = CrawlPipeline(store, _NullArchive(), parse_workers=1)
+    pipeline.submit(PipelineItem("1", _docs()[0], 1, 0))
+    pipeline.page_done(1)
+    with pytest.raises(OSError):
+        pipeline.close()
+    assert store.pages == []
+
+
+def test_unparseable_modals_are_still_archived(tmp_path, monkeypatch):
+    docs = _docs()[:3]
+
+    def parse(html):
+        if html == docs[1]:
+            raise ValueError("modal inesperado")
+        return parse_modal_html(html)
+
+    monkeypatch.setattr(crawl_pipeline, "parse_modal_html", parse)
+    with (
+        ProductStore(str(tmp_path / "store.sqlite")) as store,
+        ModalArchive(str(tmp_path / "modals.pack")) as archive,
+    ):
+        with CrawlPipeline(store, archive, parse_workers=1) as pipeline:
+            for item in _items(docs):
+                pipeline.submit(item)
+            pipeline.page_done(1, "Galletitas")
+        assert store.keys() == {"10000", "10002"}
+        # la página queda pendiente, pero el HTML está para re-parsearlo
+        assert store.finished_pages("Galletitas") == set()
+        assert archive.latest("10001") == docs[1]
+
+
+class _ListingPage:
+    def __init__(self, items: list):
+        self.items = items
+
+    def locator(self, selector: str) -> "_ListingPage":
+        return self
+
+    def evaluate_all(self, script: str, *args) -> list:
+        return self.items
+
+
+def test_failed_product_keeps_the_page_pending(tmp_path, monkeypatch):
+    docs = _docs()[:3]
+    keys = [str(10000 + i) for i in range(len(docs))]
+
+    def fetch_modal(browser_page, endpoint, data_key, *args, **ctx):
+        if data_key == keys[1]:
+            raise TimeoutError("modal")
+        return docs[keys.index(data_key)]
+
+    monkeypatch.setattr(simple_automation, "fetch_modal", fetch_modal)
+    page = _ListingPage([(key, f"Producto {key}", None) for key in keys])
+    endpoint = ModalEndpoint("GET", "/item?id={key}")
+    waits = WaitPolicy(backoff_base_s=0, max_attempts=1)
+
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        with CrawlPipeline(store, _NullArchive()) as pipeline:
+            _, failed = fetch_listing_page(
+                page,
+                1,
+                endpoint,
+                waits=waits,
+                on_capture=simple_automation.capture_sink(pipeline),
+            )
+            assert failed == [keys[1]]
+            assert not finish_page(pipeline, 1, failed)
+        assert store.keys() == {keys[0], keys[2]}
+        assert store.last_finished_page() == 0
+
+        # --resume: solo se reintenta el que falló y la página se completa
+        monkeypatch.setattr(simple_automation, "fetch_modal", lambda *a, **k: docs[1])
+        with CrawlPipeline(store, _NullArchive()) as pipeline:
+            _, failed = fetch_listing_page(
+                page,
+                1,
+                endpoint,
+                skip_keys=store.keys(),
+                waits=waits,
+                on_capture=simple_automation.capture_sink(pipeline),
+            )
+            assert failed == []
+            assert finish_page(pipeline, 1, failed)
+        assert store.count() == 3
+        assert store.last_finished_page() == 1
@@ -0,0 +1,101 @@
+"""
+Tests del scheduler de categorías.
+Ejecuta con: python -m pytest test_crawl_scheduler.py
+"""
+
+import threading
+
+import pandas as pd
+
+from crawl_scheduler import (
+    UNKNOWN,
+    CrawlScheduler,
+    WorkUnit,
+    category_csv_path,
+    category_slug,
+    export_outputs,
+    parse_categories,
+)
+from product_store import ProductStore
+
+
+def test_category_names():
+    assert category_slug("Panes y Tostadas") == "panes_y_tostadas"
+    assert category_slug("Lácteos / Yogures") == "lacteos_yogures"
+    assert category_csv_path("out/todo.csv", "Galletitas") == (
+        "out/productos_galletitas.csv"
+    )
+    assert parse_categories(None) is None
+    assert parse_categories("all") == []
+    assert parse_categories(" Galletitas, Cereales ,") == ["Galletitas", "Cereales"]
+
+
+def test_workers_drain_the_queue_and_follow_next_pages():
+    pages = {"Galletitas": 3, "Cereales": 1, "Snacks": 2}
+    scheduler = CrawlScheduler(pages)
+    processed = []
+    lock = threading.Lock()
+
+    def worker():
+        while (unit := scheduler.next_unit()) is not None:
+            try:
+                # Como el worker real: encola la siguiente antes de procesar
+                if unit.page_num < pages[unit.category]:
+                    scheduler.put(WorkUnit(unit.category, unit.page_num + 1))
+                with lock:
+                    processed.append(unit)
+            finally:
+                scheduler.done(unit)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+    assert not any(thread.is_alive() for thread in threads)
+    assert sorted(processed, key=lambda u: (u.category, u.page_num)) == [
+        WorkUnit("Cereales", 1),
+        WorkUnit("Galletitas", 1),
+        WorkUnit("Galletitas", 2),
+        WorkUnit("Galletitas", 3),
+        WorkUnit("Snacks", 1),
+        WorkUnit("Snacks", 2),
+    ]
+
+
+def test_resume_skips_finished_pages_and_claimed_keys():
+    scheduler = CrawlScheduler(
+        ["Galletitas"], done_pages={"Galletitas": {1, 2}}, claimed={"10"}
+    )
+    assert scheduler.next_unit() == WorkUnit("Galletitas", 3)
+    assert scheduler.claim(["10", "11", "12"]) == {"11", "12"}
+    assert scheduler.claim(["11", "13"]) == {"13"}
+    assert scheduler.template("Galletitas") is UNKNOWN
+    scheduler.set_template("Galletitas", None)
+    assert scheduler.template("Galletitas") is None
+    scheduler.done(WorkUnit("Galletitas", 3))
+    assert scheduler.next_unit() is None
+
+
+def test_shared_products_export_per_category_and_combined(tmp_path):
+    with ProductStore(str(tmp_path / "productos.sqlite")) as store:
+        store.add("1", {"MARCA": "A"}, 1, 0, "Galletitas")
+        store.add("2", {"MARCA": "B"}, 1, 1, "Galletitas")
+        store.add("3", {"MARCA": "C"}, 1, 1, "Cereales")
+        store.add_memberships("Galletitas", 1, ["1", "2"])
+        # "2" figura primero en Cereales pero ya se descargó desde Galletitas
+        store.add_memberships("Cereales", 1, ["2", "3"])
+        counts = export_outputs(
+            store, ["Galletitas", "Cereales"], str(tmp_path / "todo.csv")
+        )
+
+    assert counts == {"Galletitas": 2, "Cereales": 2}
+    cereales = pd.read_csv(tmp_path / "productos_cereales.csv", dtype=str)
+    assert list(cereales["MARCA"]) == ["B", "C"]
+    combined = pd.read_csv(tmp_path / "todo.csv", dtype=str)
+    assert list(combined["data_key"]) == ["1", "2", "3"]
+    assert list(combined["categorias"]) == [
+        "Galletitas",
+        "Cereales|Galletitas",
+        "Cereales",
+    ]
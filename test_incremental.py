@@ -0,0 +1,173 @@
+"""
+Tests de la detección de cambios del modo incremental.
+Ejecuta con: python -m pytest test_incremental.py
+"""
+
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import simple_automation
+from incremental import (
+    DeltaWriter,
+    ListingEntry,
+    extract_updated,
+    is_changed,
+    needs_fetch,
+    removed_keys,
+)
+from product_store import ProductStore
+from simple_automation import parse_modal_html
+
+
+def test_extract_updated_matches_parser():
+    with open("debug_modal_1.html", "r", encoding="utf-8") as f:
+        html = f.read()
+    assert extract_updated(html) == parse_modal_html(html)["Actualizado"]
+
+
+def test_needs_fetch_and_is_changed():
+    stored = {"Actualizado": "26-07-2025"}
+    assert needs_fetch(ListingEntry("1"), None)
+    # Sin fecha en el card hay que mirar el modal
+    assert needs_fetch(ListingEntry("1"), stored)
+    assert not needs_fetch(ListingEntry("1", updated="26-07-2025"), stored)
+    assert needs_fetch(ListingEntry("1", updated="30-07-2025"), stored)
+
+    html = "<p><strong>Actualizado:</strong> 26-07-2025</p>"
+    assert not is_changed(html, stored)
+    assert is_changed(html.replace("26-07", "27-07"), stored)
+    assert is_changed(html, None)
+
+
+def test_listing_entry_reads_date_from_card():
+    entry = ListingEntry.from_card(
+        "7", "Galletitas", "Galletitas\nActualizado 01-10-2025"
+    )
+    assert entry.updated == "01-10-2025"
+    assert ListingEntry.from_card("7", "Galletitas", "Galletitas").updated is None
+
+
+def test_delta_writer(tmp_path):
+    path = tmp_path / "delta.jsonl"
+    with DeltaWriter(str(path)) as delta:
+        delta.write("added", "1", {"MARCA": "A"})
+        for key in removed_keys({"1", "2", "3"}, {"1"}):
+            delta.write("removed", key)
+    events = [
+        json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()
+    ]
+    assert [(e["change"], e["data_key"]) for e in events] == [
+        ("added", "1"),
+        ("removed", "2"),
+        ("removed", "3"),
+    ]
+    assert delta.counts == {"added": 1, "changed": 0, "removed": 2}
+
+
+class _Listing:
+    """Página del listado con un card por producto y, opcionalmente, siguiente."""
+
+    def __init__(self, keys: list[str], has_next: bool):
+        self.items = [(k, f"P{k}", f"P{k}\nActualizado 01-10-2025") for k in keys]
+        self.has_next = has_next
+
+    def locator(self, selector: str) -> "_Listing":
+        self.selector = selector
+        return self
+
+    def count(self) -> int:
+        return int(self.has_next)
+
+    def nth(self, index: int) -> "_Listing":
+        return self
+
+    def evaluate_all(self, script: str, *args) -> list:
+        return self.items
+
+
+class _Recycler:
+    def __init__(self, page: _Listing):
+        self.page = page
+        self.context = None
+        self.products = 0
+
+    def should_recycle(self) -> None:
+        return None
+
+    def close(self) -> None:
+        pass
+
+
+def _run_update(monkeypatch, tmp_path, page: _Listing) -> list[dict]:
+    monkeypatch.setattr(
+        simple_automation,
+        "launch_recycler",
+        lambda *a, **k: (SimpleNamespace(close=lambda: None), _Recycler(page)),
+    )
+    monkeypatch.setattr(simple_automation, "open_listing", lambda *a, **k: None)
+    monkeypatch.setattr(simple_automation, "prepare_engine", lambda *a, **k: None)
+    monkeypatch.setattr(simple_automation, "listing_url_template", lambda p: None)
+    # La página siguiente no carga (el sitio redirigió o se agotó el timeout)
+    monkeypatch.setattr(simple_automation, "click_next_page", lambda *a, **k: False)
+    delta = tmp_path / "delta.jsonl"
+    simple_automation.run_incremental_update(
+        None,
+        str(tmp_path / "store.sqlite"),
+        delta_path=str(delta),
+        archive_path=str(tmp_path / "modals.pack"),
+        metrics_prefix=None,
+        output_csv=str(tmp_path / "productos.csv"),
+    )
+    return [json.loads(line) for line in delta.read_text("utf-8").splitlines()]
+
+
+def test_removals_only_after_a_complete_walk(tmp_path, monkeypatch):
+    record = {"Actualizado": "01-10-2025"}
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        for key in ("1", "2"):
+            store.add(key, record, 1, int(key))
+        store.add("3", record, 1, 0, category="Cereales")
+
+    # El recorrido se corta en la página 1: no se elimina nada
+    assert _run_update(monkeypatch, tmp_path, _Listing(["1"], has_next=True)) == []
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        assert store.keys() == {"1", "2", "3"}
+
+    # Completo: se elimina el que ya no está, pero no el de otra categoría
+    events = _run_update(monkeypatch, tmp_path, _Listing(["1"], has_next=False))
+    assert [(e["change"], e["data_key"]) for e in events] == [("removed", "2")]
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        assert store.keys() == {"1", "3"}
+
+
+def test_update_keeps_the_stored_category(tmp_path, monkeypatch):
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        store.add("1", {"Actualizado": "30-09-2025"}, 2, 5, category="Galletitas")
+    html = "<p><strong>Actualizado:</strong> 01-10-2025</p>"
+    monkeypatch.setattr(simple_automation, "open_modal", lambda *a, **k: (None, html))
+    monkeypatch.setattr(simple_automation, "close_modal", lambda *a, **k: None)
+
+    events = _run_update(monkeypatch, tmp_path, _Listing(["1"], has_next=False))
+    assert [(e["change"], e["data_key"]) for e in events] == [("changed", "1")]
+    with ProductStore(str(tmp_path / "store.sqlite")) as store:
+        assert store.get("1")["Actualizado"] == "01-10-2025"
+        assert store.category_of("1") == "Galletitas"
+
+
+@pytest.mark.parametrize(
+    "flags",
+    [
+        ["--workers", "2"],
+        ["--resume"],
+        ["--parse-workers", "0"],
+        ["--categories", "all"],
+    ],
+)
+def test_incremental_rejects_flags_it_would_ignore(monkeypatch, capsys, flags):
+    monkeypatch.setattr(sys, "argv", ["simple_automation.py", "--incremental", *flags])
+    with pytest.raises(SystemExit):
+        simple_automation.main()
+    assert "--incremental" in capsys.readouterr().err
@@ -0,0 +1,117 @@
+"""
+Tests del índice invertido de ingredientes.
+Ejecuta con: python -m pytest test_ingredient_index.py
+"""
+
+import ingredient_index
+from ingredient_index import (
+    AhoCorasick,
+    IngredientIndex,
+    analyze,
+    contains_flags,
+    fold_text,
+    normalize_term,
+)
+from product_store import ProductStore
+
+PRODUCTS = {
+    "1": "Harina de trigo, azúcar, emulsionante (INS-471), sal.",
+    "2": "Harina de arroz, emulsionante: ins471, lecitina de soja (INS 322). Sin TACC",
+    "3": "Harina de maíz, edulcorantes (sucralosa, E955), aceite y té verde",
+    "4": "Fécula de mandioca, leudante químico INS500i, huevo",
+}
+
+
+def test_fold_text_normalizes_ins_codes():
+    assert fold_text("Emulsionante INS-471") == "emulsionante ins 471"
+    assert fold_text("ins322, E 330 y INS 500i") == "ins 322, ins 330 y ins 500i"
+    # la "e" suelta solo cuenta como código si es una palabra
+    assert fold_text("Té de 100 g") == "te de 100 g"
+    # ni la vitamina E ni una "e" suelta en el texto son aditivos
+    assert fold_text("Vitamina E 1000 UI") == "vitamina e 1000 ui"
+    assert fold_text("vitamina e-307, (e 471)") == "vitamina e-307, (ins 471)"
+    assert fold_text("tipo e 1000") == "tipo e 1000"
+    vitamin = analyze("Harina, Vitamina E 1000 UI, sal")
+    assert vitamin.codes == ()
+    assert "vitamina e 1000 ui" in vitamin.tokens
+    assert normalize_term(" INS 471 ") == "ins 471"
+
+
+def test_aho_corasick_finds_overlapping_patterns():
+    matcher = AhoCorasick(["he", "she", "his", "hers"])
+    assert sorted(matcher.find("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+    words = AhoCorasick(["te", "te verde", "aceite"])
+    assert sorted(p for _, p in words.find_words("aceite, te verde")) == [
+        "aceite",
+        "te",
+        "te verde",
+    ]
+    assert list(words.find_words("aceites")) == []
+
+
+def test_analyze_tokens_codes_and_groups():
+    result = analyze(PRODUCTS["3"])
+    assert result.tokens == (
+        "harina de maiz",
+        "edulcorantes",
+        "sucralosa",
+        "aceite",
+        "te verde",
+    )
+    assert result.codes == ("ins 955",)
+    assert result.groups == {"edulcorante", "cafeina"}
+    # "Sin TACC" no marca gluten
+    assert "gluten" not in analyze(PRODUCTS["2"]).groups
+    assert "gluten" in analyze(PRODUCTS["1"]).groups
+    assert analyze(None).terms() == set()
+    assert contains_flags(PRODUCTS["3"]) == {
+        "CONTIENE EDULCORANTE": 1,
+        "CONTIENE CAFEÍNA": 1,
+    }
+
+
+def test_index_queries(tmp_path):
+    with IngredientIndex(str(tmp_path / "ingredientes.sqlite")) as index:
+        assert index.add_many(PRODUCTS.items()) == 4
+        assert index.query(include=["INS 471"]) == ["1", "2"]
+        assert index.query(include=["INS 471"], exclude=["gluten"]) == ["2"]
+        assert index.query(any_of=["soja", "huevo"]) == ["2", "4"]
+        # el código sin sufijo encuentra las variantes ("ins 500i")
+        assert index.query(include=["INS 500"]) == ["4"]
+        assert index.query(exclude=["gluten", "edulcorante"]) == ["2", "4"]
+        assert index.products("harina de trigo") == {"1"}
+
+        index.add("1", "Harina de arroz")
+        assert index.query(include=["INS 471"]) == ["2"]
+        flags = index.flags()
+        assert list(flags.columns) == [
+            "data_key",
+            "CONTIENE EDULCORANTE",
+            "CONTIENE CAFEÍNA",
+        ]
+        assert flags.set_index("data_key").loc["3"].tolist() == [1, 1]
+
+
+def test_sync_with_store_and_reindex_on_version(tmp_path, monkeypatch):
+    store = ProductStore(str(tmp_path / "productos.sqlite"))
+    for position, (key, text) in enumerate(PRODUCTS.items()):
+        store.add(key, {"Ingredientes": text}, 1, position)
+    path = str(tmp_path / "ingredientes.sqlite")
+    with IngredientIndex(path) as index:
+        assert index.sync(store) == 4
+        assert index.sync(store) == 0
+        store.remove("4")
+        store.add("3", {"Ingredientes": "Harina de trigo"}, 1, 2)
+        assert index.sync(store) == 1
+        assert index.all_products() == {"1", "2", "3"}
+        assert index.query(include=["gluten"]) == ["1", "3"]
+    store.close()
+
+    # otra versión del analizador: se reindexa desde el texto guardado
+    monkeypatch.setattr(ingredient_index, "INDEX_VERSION", "test")
+    monkeypatch.setitem(ingredient_index.PATTERN_GROUPS, "arroz", {"arroz"})
+    monkeypatch.setattr(
+        ingredient_index, "MATCHER", AhoCorasick(ingredient_index.PATTERN_GROUPS)
+    )
+    with IngredientIndex(path) as index:
+        assert index.query(include=["arroz"]) == ["2"]
@@ -0,0 +1,75 @@
+"""
+Tests del perfil liviano del navegador.
+Ejecuta con: python -m pytest test_lean_profile.py
+"""
+
+from types import SimpleNamespace
+
+from lean_profile import AVG_BYTES, LeanProfile, block_reason
+
+SITE = "https://www.nutrinfo.com"
+
+
+def test_block_reason():
+    assert block_reason("image", f"{SITE}/img/galletita.png") == "image"
+    assert block_reason("font", f"{SITE}/fonts/roboto.woff2") == "font"
+    assert (
+        block_reason("script", "https://www.googletagmanager.com/gtag/js?id=1") == "ads"
+    )
+    assert block_reason("document", f"{SITE}/vademecum") is None
+    assert block_reason("stylesheet", f"{SITE}/css/bootstrap.css") is None
+    assert block_reason("xhr", f"{SITE}/vademecum/item?id=10") is None
+    # El allow-list gana sobre cualquier regla
+    assert block_reason("image", f"{SITE}/img/logo.svg", allow=["logo.svg"]) is None
+
+
+class FakeRoute:
+    def __init__(self, resource_type, url):
+        self.request = SimpleNamespace(resource_type=resource_type, url=url)
+        self.outcome = None
+
+    def continue_(self):
+        self.outcome = "continue"
+
+    def abort(self, error_code=None):
+        self.outcome = "abort"
+
+
+def _response(resource_type, size):
+    return SimpleNamespace(
+        request=SimpleNamespace(resource_type=resource_type),
+        headers={"content-length": str(size)},
+    )
+
+
+def test_profile_blocks_and_reports_bytes():
+    lean = LeanProfile(allow=["producto.jpg"])
+    routes = [
+        FakeRoute("image", f"{SITE}/a.png"),
+        FakeRoute("image", f"{SITE}/b.png"),
+        FakeRoute("image", f"{SITE}/producto.jpg"),
+        FakeRoute("font", f"{SITE}/f.woff2"),
+        FakeRoute("script", "https://connect.facebook.net/sdk.js"),
+        FakeRoute("document", f"{SITE}/vademecum"),
+    ]
+    for route in routes:
+        lean._handle(route)
+    assert [r.outcome for r in routes] == [
+        "abort",
+        "abort",
+        "continue",
+        "abort",
+        "abort",
+        "continue",
+    ]
+    lean._on_response(_response("document", 50_000))
+    lean._on_response(_response("image", 10_000))
+
+    report = lean.report()
+    assert report["requests_blocked"] == 4
+    assert report["bytes_loaded"] == 60_000
+    # Las imágenes usan el tamaño medio observado; las fuentes, el estimado
+    assert report["blocked"]["image"]["bytes_saved_est"] == 20_000
+    assert report["blocked"]["font"]["bytes_saved_est"] == AVG_BYTES["font"]
+    assert report["blocked"]["script"]["ads"] == 1
+    assert report["bytes_saved_est"] == 20_000 + AVG_BYTES["font"] + AVG_BYTES["script"]
@@ -0,0 +1,96 @@
+"""
+Tests de la precarga de páginas del listado (con pestañas simuladas).
+Ejecuta con: python -m pytest test_listing_prefetch.py
+"""
+
+import re
+from types import SimpleNamespace
+
+from simple_automation import ListingPrefetcher
+from wait_policy import DEFAULT_TIMEOUTS_MS, WaitPolicy
+
+TEMPLATE = "http://replay/vademecum?categoria=Galletitas&page={page}"
+
+
+class FakeTab:
+    """Pestaña sobre un listado de ``pages`` páginas (fuera de rango va a la última)."""
+
+    def __init__(self, pages: int, current: int = 0):
+        self.pages = pages
+        self.current = current
+        self.gotos: list[tuple[int, str]] = []
+
+    def goto(self, url: str, wait_until: str = "load", timeout: float = 0) -> None:
+        page_num = int(re.search(r"page=(\d+)", url).group(1))
+        self.current = min(page_num, self.pages)
+        self.gotos.append((page_num, wait_until))
+
+    def wait_for_selector(self, selector: str, timeout: float = 0) -> None:
+        assert self.current, "la pestaña todavía no navegó"
+
+    def locator(self, selector: str) -> SimpleNamespace:
+        if selector == "li.next:not(.disabled) a":
+            return SimpleNamespace(count=lambda: int(self.current < self.pages))
+        assert selector == "ul.pagination li.active"
+        active = SimpleNamespace(inner_text=lambda: str(self.current))
+        return SimpleNamespace(count=lambda: 1, first=active)
+
+
+class FakeContext:
+    def __init__(self, pages: int):
+        self.pages = pages
+        self.tabs: list[FakeTab] = []
+
+    def new_page(self) -> FakeTab:
+        self.tabs.append(FakeTab(self.pages))
+        return self.tabs[-1]
+
+
+def test_prefetch_swaps_two_tabs_until_the_last_page():
+    context = FakeContext(pages=4)
+    page = FakeTab(4, current=1)
+    prefetcher = ListingPrefetcher(context, TEMPLATE)
+    visited = []
+    page_num = 1
+    while page is not None:
+        prefetcher.prefetch(page, page_num)
+        visited.append((page_num, page.current))
+        page = prefetcher.advance(page, page_num)
+        page_num += 1
+
+    assert visited == [(1, 1), (2, 2), (3, 3), (4, 4)]
+    # Una sola pestaña extra, que se reutiliza; las cargas no esperan el load
+    assert len(context.tabs) == 1
+    assert context.tabs[0].gotos == [(2, "commit"), (4, "commit")]
+
+
+def test_redirect_out_of_range_ends_the_crawl():
+    context = FakeContext(pages=2)
+    page = FakeTab(5, current=2)
+    prefetcher = ListingPrefetcher(context, TEMPLATE)
+    prefetcher.prefetch(page, 2)
+    # El sitio redirige a la última página: no es la 3
+    assert prefetcher.advance(page, 2) is None
+
+
+def test_without_template_falls_back_to_click():
+    context = FakeContext(pages=1)
+    page = FakeTab(1, current=1)
+    prefetcher = ListingPrefetcher(context, None)
+    prefetcher.prefetch(page, 1)
+    assert context.tabs == []
+    assert prefetcher.advance(page, 1) is None
+
+
+def test_prefetch_does_not_shrink_full_load_timeouts():
+    waits = WaitPolicy(min_samples=2)
+    context = FakeContext(pages=10)
+    page = FakeTab(10, current=1)
+    prefetcher = ListingPrefetcher(context, TEMPLATE, waits=waits)
+    for page_num in range(1, 10):
+        prefetcher.prefetch(page, page_num)
+        page = prefetcher.advance(page, page_num)
+    # Los commits y los listados ya cargados no son cargas completas
+    assert waits.timeout("navigate") == DEFAULT_TIMEOUTS_MS["navigate"]
+    assert waits.timeout("listing") == DEFAULT_TIMEOUTS_MS["listing"]
+    assert waits.timeout("prefetch") == waits.floor_ms
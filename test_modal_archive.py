@@ -0,0 +1,40 @@
+"""
+Tests del archivo direccionado por contenido de modales.
+Ejecuta con: python -m pytest test_modal_archive.py
+"""
+
+from modal_archive import ModalArchive, load_modal_html
+from simple_automation import parse_modal_html
+
+
+def test_archive_dedupes_identical_modals(tmp_path):
+    path = str(tmp_path / "modals.pack")
+    with open("debug_modal_1.html", "r", encoding="utf-8") as f:
+        html = f.read()
+
+    with ModalArchive(path) as archive:
+        sha = archive.put(html, "100", fetched_at="2025-07-26T10:00:00+00:00")
+        assert archive.put(html, "200") == sha
+        archive.put("<div>otro</div>", "100")
+        stats = archive.stats()
+        assert stats["blobs"] == 2
+        assert stats["entries"] == 3
+        assert stats["packed_bytes"] < stats["raw_bytes"]
+
+    with ModalArchive(path) as archive:
+        assert archive.keys() == ["100", "200"]
+        assert archive.latest("200") == html
+        assert archive.latest("100") == "<div>otro</div>"
+        assert archive.history("100")[0] == ("2025-07-26T10:00:00+00:00", sha)
+        assert archive.latest("300") is None
+
+
+def test_parse_reads_from_archive(tmp_path):
+    path = str(tmp_path / "modals.pack")
+    with open("debug_modal_2.html", "r", encoding="utf-8") as f:
+        html = f.read()
+    with ModalArchive(path) as archive:
+        archive.put(html, "debug_modal_2")
+    assert parse_modal_html(load_modal_html("debug_modal_2", path)) == parse_modal_html(
+        html
+    )
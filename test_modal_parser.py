@@ -0,0 +1,41 @@
+"""
+Tests de paridad entre los backends de parse_modal_html.
+Ejecuta con: python -m pytest test_modal_parser.py
+"""
+
+import glob
+
+import pytest
+
+from modal_parser import parse_modal_html
+
+
+@pytest.mark.parametrize("path", sorted(glob.glob("debug_modal_*.html")))
+def test_lxml_backend_matches_html_parser(path):
+    with open(path, "r", encoding="utf-8") as f:
+        html = f.read()
+    reference = parse_modal_html(html, backend="html.parser")
+    fast = parse_modal_html(html, backend="lxml")
+    assert fast == reference
+    assert [type(v) for v in fast.values()] == [type(v) for v in reference.values()]
+
+
+@pytest.mark.parametrize(
+    "html",
+    [
+        "",
+        "<p>",
+        "<p>Porción: 30 g<div>x</div></p>",
+        "<table><tr><td>Sodio</td><td>3 mg</td></tr></table>",
+        '<h5 class="modal-title x">Galletitas - Marca.</h5>',
+    ],
+)
+def test_backends_agree_on_malformed_html(html):
+    assert parse_modal_html(html, backend="lxml") == parse_modal_html(
+        html, backend="html.parser"
+    )
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        parse_modal_html("<p></p>", backend="regex")
@@ -0,0 +1,76 @@
+"""
+Tests del índice canónico de nombres de nutrientes.
+Ejecuta con: python -m pytest test_nutrient_names.py
+"""
+
+import pytest
+
+from clean_nutrition import parse_table_from_html, standardize_name
+from modal_parser import parse_modal_html
+from nutrient_names import (
+    NUTRIENTS,
+    canonical_name,
+    fold,
+    nutrient_key,
+    resolve,
+)
+
+
+@pytest.mark.parametrize(
+    "label, expected",
+    [
+        ("Valor Energético", "Valor energético"),
+        ("VALOR ENERGETICO:", "Valor energético"),
+        ("de las cuales azúcares", "Azúcares"),
+        ("De los cuales: Grasas  Saturadas.", "Grasas saturadas"),
+        ("margen-subnutrientes grasas trans", "Grasas trans"),
+        ("Hidratos de carbono disponibles", "Carbohidratos"),
+        ("Fibra alimentaria", "Fibra"),
+        ("grasas polinsaturadas", "Grasas poliinsaturadas"),
+    ],
+)
+def test_aliases_resolve_to_canonical_name(label, expected):
+    assert canonical_name(label) == expected
+    assert standardize_name(label) == expected
+
+
+def test_unknown_names_are_cleaned_not_dropped():
+    assert resolve("Tiamina (B1)") is None
+    assert canonical_name("Tiamina (B1)") == "Tiamina (B1)"
+    assert canonical_name("de las cuales lactosa") == "Lactosa"
+    assert canonical_name("Yodo -") == "Yodo"
+    assert nutrient_key("Ácido Fólico (B9)") == "acido_folico_b9"
+    assert standardize_name("") == ""
+
+
+def test_index_is_consistent_and_cached():
+    keys = {n.key for n in NUTRIENTS}
+    assert len(keys) == len(NUTRIENTS)
+    for nutrient in NUTRIENTS:
+        assert resolve(nutrient.name) is nutrient
+        assert nutrient_key(nutrient.name.upper()) == nutrient.key
+        assert fold(nutrient.name) == fold(nutrient.name.upper())
+
+    resolve.cache_clear()
+    canonical_name("Proteínas")
+    canonical_name("Proteínas")
+    assert canonical_name.cache_info().hits >= 1
+    # nombres internados: un mismo objeto para todas las filas
+    assert canonical_name("proteinas") is canonical_name("PROTEÍNAS")
+
+
+def test_parsers_share_the_index():
+    table = (
+        "<table><tr><td>Proteinas 3 g</td><td></td></tr>"
+        "<tr><td>de las cuales azucares 1,5 g</td><td></td></tr>"
+        "<tr><td>Hidratos de carbono disponibles 20 g</td><td>7%</td></tr></table>"
+    )
+    names = [n["Nutriente"] for n in parse_table_from_html(table)]
+    assert names == ["Proteínas", "Azúcares", "Carbohidratos"]
+
+    html = f"<div class='modal show'>{table}</div>"
+    parsed = parse_modal_html(html, backend="html.parser")
+    assert parsed == parse_modal_html(html, backend="lxml")
+    # sin tilde también se reconoce la columna de la planilla
+    assert parsed["PROTEÍNAS  (g/ porción)"] == 3
+    assert parsed["CARBOHIDRATOS (g/porción)"] == 20
@@ -0,0 +1,110 @@
+"""
+Tests de la normalización de unidades de los nutrientes.
+Ejecuta con: python -m pytest test_nutrient_units.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from clean_nutrition import comma_to_dot, process_csv
+from modal_parser import parse_modal_html
+from nutrient_units import conversion, normalize_unit, to_canonical
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("1.234,56", "1234.56"),
+        ("0,8", "0.8"),
+        ("0.5", "0.5"),
+        ("12.5", "12.5"),
+        ("1.234", "1234"),
+        ("1.234.567", "1234567"),
+        ("129", "129"),
+    ],
+)
+def test_comma_to_dot_thousands_and_decimal_point(raw, expected):
+    assert comma_to_dot(raw) == expected
+
+
+def test_normalize_unit_spellings():
+    # signo micro (U+00B5) y mu griega (U+03BC) son la misma unidad
+    assert normalize_unit("µg") == normalize_unit("μg") == "µg"
+    assert normalize_unit("mcg") == "µg"
+    assert normalize_unit(" KJ ") == "kJ"
+    assert normalize_unit("Kcal") == "kcal"
+    assert normalize_unit("UI") == "UI"
+    assert normalize_unit(None) is None
+
+
+def test_conversion_to_the_nutrient_unit():
+    assert conversion("Colesterol", "mg") == (pytest.approx(1e-3), "g")
+    assert conversion("Sodio", "g") == (1000.0, "mg")
+    assert conversion("Valor energético", "kJ") == (pytest.approx(1 / 4.184), "kcal")
+    # sin unidad canónica o de otra magnitud: solo se normaliza la grafía
+    assert conversion("Vitamina D", "μg") == (1.0, "µg")
+    assert conversion("Sodio", "%") == (1.0, "%")
+
+
+def test_to_canonical_is_vectorized_over_pairs():
+    names = ["Sodio", "Sodio", "Colesterol", "Valor energético", "Hierro", "Sodio"]
+    units = ["mg", "g", "mg", "kJ", "mg", None]
+    amounts = ["390", "0.2", "10", "540", "x", "5"]
+    values, out_units = to_canonical(names, units, amounts)
+    assert values[:4].tolist() == pytest.approx([390, 200, 0.01, 129.063098])
+    assert np.isnan(values[4])
+    assert out_units.tolist() == ["mg", "mg", "g", "kcal", "mg", None]
+    empty_values, empty_units = to_canonical([], [], [])
+    assert len(empty_values) == len(empty_units) == 0
+
+
+def row(name: str, amount: str, unit: str) -> str:
+    return f"<tr><td>{name} {amount} {unit}</td><td></td></tr>"
+
+
+def test_wide_form_has_one_column_per_nutrient(tmp_path):
+    tables = [
+        row("Sodio", "390", "mg")
+        + row("Colesterol", "10", "mg")
+        + row("Vitamina D", "1,5", "µg"),
+        row("Sodio", "0,2", "g")
+        + row("Colesterol", "0", "g")
+        + row("Vitamina D", "2", "μg"),
+    ]
+    src = tmp_path / "productos.csv"
+    pd.DataFrame(
+        [
+            {"titulo": str(i), "tabla_nutricional": f"<table>{t}</table>"}
+            for i, t in enumerate(tables)
+        ]
+    ).to_csv(src, index=False)
+    out_long, out_wide = tmp_path / "long.csv", tmp_path / "wide.csv"
+    process_csv(str(src), str(out_long), str(out_wide))
+
+    long_df = pd.read_csv(out_long)
+    assert list(long_df["Unidad_original"]) == ["mg", "mg", "µg", "g", "g", "μg"]
+    assert list(long_df["Cantidad"]) == [390, 10, 1.5, 0.2, 0, 2]
+    wide_df = pd.read_csv(out_wide)
+    assert [c for c in wide_df.columns if "[" in c] == [
+        "Colesterol [g]",
+        "Sodio [mg]",
+        "Vitamina D [µg]",
+    ]
+    assert list(wide_df["Sodio [mg]"]) == [390, 200]
+    assert list(wide_df["Colesterol [g]"]) == [0.01, 0]
+
+
+def test_modal_parser_converts_to_the_workbook_unit():
+    html = (
+        "<table>"
+        + row("Colesterol", "10", "mg")
+        + row("Sodio", "0,2", "g")
+        + row("Proteínas", "3", "g")
+        + "</table>"
+    )
+    parsed = parse_modal_html(html, backend="html.parser")
+    assert parsed == parse_modal_html(html, backend="lxml")
+    assert parsed["COLESTEROL (g/ porción)"] == 0.01
+    assert parsed["SODIO  (mg/ porción)"] == 200
+    assert parsed["PROTEÍNAS  (g/ porción)"] == 3
@@ -0,0 +1,93 @@
+"""
+Tests del cálculo vectorizado de valores cada 100 g y sellos.
+Ejecuta con: python -m pytest test_nutrition_engine.py
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nutrition_engine import (
+    FLAG_COLUMNS,
+    PER_100G_COLUMNS,
+    Thresholds,
+    enrich,
+    parse_threshold,
+)
+
+
+def product(**values) -> dict:
+    row = {"CANTIDAD PORCIÓN (g)": 30.0}
+    row.update({k: None for k in PER_100G_COLUMNS})
+    aliases = {
+        "kcal": "VALOR ENERGÉTICO (Kcal/ porción)",
+        "carbs": "CARBOHIDRATOS (g/porción)",
+        "added": "AZÚCARES AÑADIDOS (g/ porción)",
+        "protein": "PROTEÍNAS  (g/ porción)",
+        "fat": "GRASAS TOTALES (g/ porción)",
+        "sat": "GRASAS SATURADAS (g/ porción)",
+        "sodium": "SODIO  (mg/ porción)",
+    }
+    for name, value in values.items():
+        row[aliases.get(name, name)] = value
+    return row
+
+
+def test_matches_workbook_columns_and_reference_rows():
+    references = []
+    for i in range(4):
+        with open(f"debug_parsed_{i}.json", encoding="utf-8") as f:
+            references.append(json.load(f))
+    df = pd.DataFrame(references)
+    out = enrich(df)
+    # mismas columnas y en el mismo orden que la planilla
+    assert list(out.columns) == list(df.columns)
+    # porción de 100 g: los valores cada 100 g son los de la porción
+    for col in PER_100G_COLUMNS.values():
+        expected = pd.to_numeric(references[0][col], errors="coerce")
+        assert out.loc[0, col] == pytest.approx(expected, nan_ok=True), col
+    # la fila 0 no informa energía ni grasas totales: se estiman con las
+    # saturadas (4*27 + 4*16 + 9*7.3 kcal) y el sello de saturadas se activa
+    assert out[FLAG_COLUMNS].to_numpy().tolist() == df[FLAG_COLUMNS].to_numpy().tolist()
+    assert out.loc[0, FLAG_COLUMNS].tolist() == [0, 0, 1, 1, 0]
+
+
+def test_per_100g_and_flags_in_one_pass():
+    df = pd.DataFrame(
+        [
+            # 150 kcal/30 g = 500 kcal/100 g; 8 g azúcar = 21% de la energía
+            product(kcal=150, added=8, fat=7, sat=1, sodium=120),
+            # sin porción ni energía: nada que evaluar por 100 g
+            product(**{"CANTIDAD PORCIÓN (g)": None, "sodium": 50}),
+            # sin energía declarada: se estima (4*20 + 4*2 + 9*1 = 97 kcal)
+            product(carbs=20, protein=2, fat=1, sodium=10, added=0),
+            # valores no numéricos quedan como faltantes
+            product(kcal="", sodium="s/d"),
+        ]
+    )
+    out = enrich(df)
+    assert out["VALOR ENERGÉTICO (Kcal/ 100 g)"].iloc[0] == pytest.approx(500)
+    assert out["SODIO  (mg/ 100 g)"].iloc[0] == pytest.approx(400)
+    assert np.isnan(out["SODIO  (mg/ 100 g)"].iloc[1])
+    assert out[FLAG_COLUMNS].to_numpy().tolist() == [
+        # azúcar, grasas (63/150 = 42%), saturadas (6%), sodio, calorías
+        [1, 1, 0, 1, 1],
+        # 50 mg de sodio sin energía ni porción: no se puede evaluar
+        [0, 0, 0, 0, 0],
+        # 97 kcal en 30 g = 323 kcal/100 g; sodio 10/97 < 1 mg/kcal
+        [0, 0, 0, 0, 1],
+        [0, 0, 0, 0, 0],
+    ]
+
+
+def test_thresholds_are_configurable():
+    df = pd.DataFrame([product(kcal=80, sat=1, sodium=60)])
+    assert enrich(df)[FLAG_COLUMNS].iloc[0].tolist() == [0, 0, 1, 0, 0]
+    strict = Thresholds(saturated_energy_pct=20, sodium_mg_100g=150, kcal_100g=250)
+    assert enrich(df, strict)[FLAG_COLUMNS].iloc[0].tolist() == [0, 0, 0, 1, 1]
+
+    assert parse_threshold("kcal_100g=300") == ("kcal_100g", 300.0)
+    with pytest.raises(Exception):
+        parse_threshold("no_existe=1")
@@ -5,12 +5,12 @@ Ejecuta con: python test_parse.py
 """
 
 import json
+from modal_archive import load_modal_html
 from simple_automation import parse_modal_html
 
 
 # def test_parse_0():
-#     with open("debug_modal_0.html", "r", encoding="utf-8") as f:
-#         html = f.read()
+#     html = load_modal_html("debug_modal_0")
 #     parsed = parse_modal_html(html)
 #     expected = {
 #         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Bizcochos Salados Tradicionales Libre de Gluten",
@@ -38,8 +38,7 @@ from simple_automation import parse_modal_html
 
 
 def test_parse_1():
-    with open("debug_modal_1.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_1")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galletitas Crackers Mix de Semillas",
@@ -67,8 +66,7 @@ def test_parse_1():
 
 
 def test_parse_2():
-    with open("debug_modal_2.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_2")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galletitas Dulces con Avena y Pasas",
@@ -96,8 +94,7 @@ def test_parse_2():
 
 
 def test_parse_3():
-    with open("debug_modal_3.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_3")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galletitas Dulces con Avena y Pasas",
@@ -125,8 +122,7 @@ def test_parse_3():
 
 
 def test_parse_4():
-    with open("debug_modal_4.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_4")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galletitas con Avena y Pasas",
@@ -154,8 +150,7 @@ def test_parse_4():
 
 
 def test_parse_5():
-    with open("debug_modal_5.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_5")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galleta Horneada de Vainilla",
@@ -183,8 +178,7 @@ def test_parse_5():
 
 
 def test_parse_6():
-    with open("debug_modal_6.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_6")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galleta Horneada sabor Queso Cheddar",
@@ -212,8 +206,7 @@ def test_parse_6():
 
 
 def test_parse_7():
-    with open("debug_modal_7.html", "r", encoding="utf-8") as f:
-        html = f.read()
+    html = load_modal_html("debug_modal_7")
     parsed = parse_modal_html(html)
     expected = {
         "GALLETITAS CON GLUTEN (NOMBRE COMERCIAL)": "Galleta Horneada Extra Cheddar",
@@ -0,0 +1,103 @@
+"""
+Tests del cache de resultados de parseo.
+Ejecuta con: python -m pytest test_parse_cache.py
+"""
+
+import sqlite3
+
+import parse_cache
+from clean_nutrition import parse_document
+from modal_parser import parse_modal_html
+from parse_cache import ParseCache
+
+
+def _html(n: int) -> str:
+    with open(f"debug_modal_{n}.html", "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_hit_returns_same_result_without_parsing(tmp_path):
+    html = _html(100)
+    calls = []
+
+    def compute(h):
+        calls.append(h)
+        return parse_modal_html(h)
+
+    with ParseCache(str(tmp_path / "cache.sqlite")) as cache:
+        first = cache.get_or_compute(html, "modal_parser", "1", compute)
+        second = cache.get_or_compute(html, "modal_parser", "1", compute)
+        assert first == second == parse_modal_html(html)
+        assert len(calls) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+        # Otra versión del parser no reusa la entrada vieja
+        cache.get_or_compute(html, "modal_parser", "2", compute)
+        assert len(calls) == 2
+
+
+def test_cache_persists_and_keeps_types(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    html = _html(100)
+    with ParseCache(path) as cache:
+        expected = parse_modal_html(html, cache=cache)
+        doc = parse_document(html, cache=cache)
+    with ParseCache(path) as cache:
+        assert parse_modal_html(html, cache=cache) == expected
+        assert parse_document(html, cache=cache) == doc
+        assert isinstance(parse_document(html, cache=cache), tuple)
+        assert cache.hits == 3
+
+
+def test_backends_do_not_share_entries(tmp_path):
+    html = _html(100)
+    with ParseCache(str(tmp_path / "cache.sqlite")) as cache:
+        lxml = parse_modal_html(html, "lxml", cache=cache)
+        soup = parse_modal_html(html, "html.parser", cache=cache)
+        assert lxml == soup
+        assert (cache.hits, cache.misses) == (0, 2)
+        assert len(cache) == 2
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    with ParseCache(str(tmp_path / "cache.sqlite"), max_entries=10) as cache:
+        cache.put("<p>0</p>", "p", "1", 0)
+        for i in range(1, 20):
+            cache.put(f"<p>{i}</p>", "p", "1", i)
+            # La primera entrada se sigue usando: no debe desalojarse
+            assert cache.get("<p>0</p>", "p", "1") == 0
+        cache.flush()
+        assert len(cache) <= 10
+        assert cache.get("<p>0</p>", "p", "1") == 0
+        assert cache.get("<p>1</p>", "p", "1") is None
+
+
+def test_hits_are_read_only_and_writes_do_not_hold_the_lock(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with ParseCache(path) as cache:
+        cache.put("<p>0</p>", "p", "1", 0)
+    with ParseCache(path, commit_interval_s=60) as cache:
+        for i in range(5):
+            assert cache.get("<p>0</p>", "p", "1") == 0
+            cache.put(f"<p>{i + 1}</p>", "p", "1", i + 1)
+        # Lo pendiente está en memoria y ya se puede leer
+        assert cache.get("<p>3</p>", "p", "1") == 3
+        assert not cache._conn.in_transaction
+        # Otro proceso escribe sin esperar al lock
+        other = sqlite3.connect(path, timeout=0)
+        with other:
+            other.execute("INSERT INTO cache VALUES ('x', 'p', '1', 0)")
+        other.close()
+        cache.flush()
+        assert len(cache) == 7
+
+
+def test_shared_cache_from_environment(tmp_path):
+    parse_cache.configure(str(tmp_path / "shared.sqlite"))
+    try:
+        html = _html(2)
+        parse_modal_html(html)
+        parse_modal_html(html)
+        assert parse_cache.default_cache().hits == 1
+    finally:
+        parse_cache.configure(None)
+    assert parse_cache.default_cache() is None
@@ -0,0 +1,39 @@
+"""
+Tests del store persistente de productos.
+Ejecuta con: python -m pytest test_product_store.py
+"""
+
+from product_store import ProductStore
+
+
+def test_store_keeps_listing_order_and_progress(tmp_path):
+    path = str(tmp_path / "productos.sqlite")
+    with ProductStore(path) as store:
+        store.add("20", {"MARCA": "B"}, page_num=2, position=0)
+        store.add("11", {"MARCA": "A2"}, page_num=1, position=1)
+        store.add("10", {"MARCA": "A1"}, page_num=1, position=0)
+        store.mark_page_done(1)
+        store.mark_page_done(3)
+
+    # Reabrir simula un crawl retomado
+    with ProductStore(path) as store:
+        assert store.keys() == {"10", "11", "20"}
+        assert [r["MARCA"] for r in store.records()] == ["A1", "A2", "B"]
+        # La página 3 no cuenta hasta que la 2 esté terminada
+        assert store.last_finished_page() == 1
+        store.reset_pages()
+        assert store.last_finished_page() == 0
+        assert store.count() == 3
+
+
+def test_store_export_csv_includes_data_key(tmp_path):
+    store = ProductStore(str(tmp_path / "productos.sqlite"))
+    store.add("10", {"MARCA": "A"}, page_num=1, position=0)
+    store.add("10", {"MARCA": "A (bis)"}, page_num=1, position=0)
+    out = tmp_path / "productos.csv"
+    assert store.export_csv(str(out)) == 1
+    store.close()
+    assert out.read_text(encoding="utf-8").splitlines() == [
+        "data_key,MARCA",
+        "10,A (bis)",
+    ]
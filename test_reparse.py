@@ -0,0 +1,33 @@
+"""
+Tests del re-parseo en lote.
+Ejecuta con: python -m pytest test_reparse.py
+"""
+
+import csv
+
+from modal_parser import parse_modal_html
+from reparse import expand_inputs, file_items, parse_all, write_csv
+
+
+def test_expand_inputs_uses_natural_order():
+    files = expand_inputs(["debug_modal_1*.html", "debug_modal_2.html"])
+    assert files[:3] == [
+        "debug_modal_1.html",
+        "debug_modal_2.html",
+        "debug_modal_10.html",
+    ]
+
+
+def test_parse_all_keeps_order_and_captures_errors(tmp_path):
+    files = ["debug_modal_3.html", "no_existe.html", "debug_modal_1.html"]
+    rows = list(parse_all(file_items(files), workers=2, chunksize=1))
+    assert [r["_source"] for r in rows] == files
+    assert rows[1]["_error"].startswith("FileNotFoundError")
+    with open("debug_modal_1.html", "r", encoding="utf-8") as f:
+        expected = parse_modal_html(f.read())
+    assert {k: rows[2][k] for k in expected} == expected
+
+    out = tmp_path / "out.csv"
+    assert write_csv(rows, str(out)) == (3, 1)
+    with open(out, newline="", encoding="utf-8") as f:
+        assert [r["_source"] for r in csv.DictReader(f)] == files
@@ -0,0 +1,101 @@
+"""
+Tests de la réplica local del vademecum.
+Ejecuta con: python -m pytest test_replay_server.py
+"""
+
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from modal_parser import parse_modal_html
+from replay_server import load_catalog, replay_server
+from simple_automation import _key_template
+
+FILES = [f"debug_modal_{n}.html" for n in range(1, 6)]
+
+
+def _get(url: str) -> str:
+    with urllib.request.urlopen(url) as response:
+        return response.read().decode("utf-8")
+
+
+def test_catalog_from_corpus():
+    catalog = load_catalog(FILES, ["Galletitas", "Cereales"])
+    assert [p.data_key for p in catalog["Galletitas"]] == ["10001", "10003", "10005"]
+    assert [p.data_key for p in catalog["Cereales"]] == ["10002", "10004"]
+    product = catalog["Galletitas"][0]
+    assert product.title and "<" not in product.title
+
+
+def test_listing_pagination_and_items():
+    catalog = load_catalog(FILES)
+    with replay_server(catalog, page_size=2) as server:
+        # Sin filtro aplicado no hay productos
+        assert "data-key" not in _get(server.base_url)
+        assert 'role="option">Galletitas' in _get(server.base_url)
+
+        page1 = _get(server.base_url + "?categoria=Galletitas&page=1")
+        assert re.findall(r'data-key="(\d+)"', page1) == ["10001", "10002"]
+        assert 'class="page-item active"><a href="#">1<' in page1
+        assert 'class="next"><a href="/vademecum?categoria=Galletitas&page=2"' in page1
+
+        page3 = _get(server.base_url + "?categoria=Galletitas&page=3")
+        assert re.findall(r'data-key="(\d+)"', page3) == ["10005"]
+        assert 'class="next disabled"' in page3
+        # Fuera de rango: redirige a la última página
+        assert _get(server.base_url + "?categoria=Galletitas&page=9") == page3
+
+        html = _get(server.base_url + "/item?id=10002")
+        with open("debug_modal_2.html", "r", encoding="utf-8") as f:
+            assert parse_modal_html(html) == parse_modal_html(f.read())
+        assert server.counts["item"] == 1
+
+
+def test_failure_injection():
+    catalog = load_catalog(FILES)
+    with replay_server(catalog, fail_rate=1.0) as server:
+        with pytest.raises(urllib.error.HTTPError) as err:
+            _get(server.base_url + "/item?id=10001")
+        assert err.value.code == 500
+        assert server.counts["item_failed"] == 1
+
+
+def _failed_items(order: list[str], attempts: int = 2) -> set[tuple[str, int]]:
+    catalog = load_catalog(FILES)
+    failed = set()
+    with replay_server(catalog, fail_rate=0.5, seed=7) as server:
+        for attempt in range(attempts):
+            for key in order:
+                try:
+                    _get(server.base_url + f"/item?id={key}")
+                except urllib.error.HTTPError:
+                    failed.add((key, attempt))
+    return failed
+
+
+def test_seeded_failures_do_not_depend_on_request_order():
+    keys = [f"1000{n}" for n in range(1, 6)]
+    failed = _failed_items(keys)
+    assert failed and failed != {(k, a) for k in keys for a in range(2)}
+    assert _failed_items(list(reversed(keys))) == failed
+
+
+def test_key_template_keeps_host_and_port():
+    url = "http://127.0.0.1:10001/vademecum/item?id=10001"
+    assert (
+        _key_template(url, "10001") == "http://127.0.0.1:10001/vademecum/item?id={key}"
+    )
+
+
+def test_catalog_shared_products():
+    catalog = load_catalog(FILES, ["Galletitas", "Cereales"], shared_every=2)
+    assert [p.data_key for p in catalog["Galletitas"]] == ["10001", "10003", "10005"]
+    assert [p.data_key for p in catalog["Cereales"]] == [
+        "10001",
+        "10002",
+        "10003",
+        "10004",
+        "10005",
+    ]
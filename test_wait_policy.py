@@ -0,0 +1,87 @@
+"""
+Tests de la política de esperas y reintentos.
+Ejecuta con: python -m pytest test_wait_policy.py
+"""
+
+import random
+
+import pytest
+
+from crawl_metrics import CrawlMetrics
+from wait_policy import DEFAULT_TIMEOUTS_MS, WaitPolicy
+
+
+def test_uses_defaults_until_enough_samples():
+    waits = WaitPolicy(min_samples=5)
+    for _ in range(4):
+        waits.observe("modal_open", 100)
+    assert waits.timeout("modal_open") == DEFAULT_TIMEOUTS_MS["modal_open"]
+    waits.observe("modal_open", 100)
+    # 3 x p99 (100 ms), pero nunca menos que el piso
+    assert waits.timeout("modal_open") == 1000
+
+
+def test_learned_timeout_tracks_p99_within_bounds():
+    waits = WaitPolicy(min_samples=10, factor=2.0, ceiling_ms=5000)
+    for ms in [800] * 9 + [1500]:
+        waits.observe("listing", ms)
+    assert 1500 < waits.timeout("listing") <= 3000
+    for _ in range(10):
+        waits.observe("listing", 10000)
+    assert waits.timeout("listing") == 5000
+
+
+def test_failed_wait_records_full_timeout():
+    waits = WaitPolicy(min_samples=1, floor_ms=0)
+    waits.observe("modal_close", 50)
+    with pytest.raises(TimeoutError):
+        with waits.waiting("modal_close") as timeout:
+            assert timeout == 150
+            raise TimeoutError
+    # El timeout sube en lugar de bajar
+    assert waits.timeout("modal_close") > 150
+
+
+def test_deadline_shares_one_timeout_between_waits(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr("wait_policy.time.perf_counter", lambda: clock[0])
+    waits = WaitPolicy(min_samples=1, floor_ms=0)
+    waits.observe("modal_close", 1000)
+    with waits.deadline("modal_close") as deadline:
+        assert deadline.left() == pytest.approx(3000)
+        clock[0] += 2.5
+        # la segunda espera recibe lo que dejó la primera, no otros 3000 ms
+        assert deadline.left() == pytest.approx(500)
+        clock[0] += 1
+        assert deadline.left() == 1
+    # una sola muestra con la etapa completa
+    assert waits._samples["modal_close"][-1] == pytest.approx(3500)
+
+
+def test_backoff_is_jittered_and_capped():
+    waits = WaitPolicy(backoff_base_s=0.5, backoff_cap_s=2.0, rng=random.Random(1))
+    delays = [waits.backoff(a) for a in range(6)]
+    assert all(0 <= d <= 2.0 for d in delays)
+    assert delays[0] <= 0.5
+    assert len(set(delays)) == len(delays)
+
+
+def test_retry_until_success_and_reraise(monkeypatch):
+    monkeypatch.setattr("wait_policy.time.sleep", lambda s: None)
+    metrics = CrawlMetrics()
+    waits = WaitPolicy(max_attempts=3)
+    calls, recovered = [], []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("modal no apareció")
+        return "ok"
+
+    assert waits.retry(flaky, metrics, on_retry=recovered.append) == "ok"
+    assert len(calls) == 3 and len(recovered) == 2
+    assert metrics.summary()["counters"]["retries"] == 2
+
+    with pytest.raises(ValueError):
+        waits.retry(lambda: (_ for _ in ()).throw(ValueError("x")), metrics)
+    assert metrics.summary()["counters"]["retries"] == 4
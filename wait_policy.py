@@ -0,0 +1,165 @@
+"""
+Timeouts adaptativos y reintentos con backoff para el crawler.
+
+En lugar de sleeps fijos y timeouts de 12/8/15 s, cada espera se hace sobre
+la condición real (modal visible, modal y backdrop desmontados, listado
+reemplazado) y su timeout se aprende de las latencias observadas: un
+múltiplo del p99 de las últimas mediciones, acotado entre un piso y un
+techo. Hasta juntar suficientes muestras se usan los timeouts históricos.
+
+Los reintentos esperan con backoff exponencial con jitter completo
+(``uniform(0, min(cap, base * 2**intento))``) para no sincronizar a los
+workers contra el sitio.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional, TypeVar
+
+from crawl_metrics import NO_METRICS, CrawlMetrics, percentile
+
+T = TypeVar("T")
+
+# Timeouts (ms) usados hasta tener muestras; son los valores fijos de antes
+DEFAULT_TIMEOUTS_MS = {
+    "navigate": 30000,
+    # goto(wait_until="commit") de la precarga del listado
+    "prefetch": 30000,
+    "listing": 15000,
+    "modal_open": 12000,
+    "modal_close": 8000,
+    "modal_fetch": 30000,
+}
+
+
+class Deadline:
+    """Un timeout repartido entre varias esperas seguidas."""
+
+    def __init__(self, timeout_ms: float):
+        self.timeout = timeout_ms
+        self._end = time.perf_counter() + timeout_ms / 1000
+
+    def left(self) -> float:
+        """Ms que quedan (al menos 1: Playwright toma 0 como "sin timeout")."""
+        return max(1.0, (self._end - time.perf_counter()) * 1000)
+
+
+class WaitPolicy:
+    """
+    Timeouts por tipo de espera aprendidos de las latencias observadas.
+
+    Es seguro compartir una instancia entre los workers del modo paralelo
+    (todos aprenden de todas las mediciones).
+    """
+
+    def __init__(
+        self,
+        defaults: Optional[dict[str, float]] = None,
+        factor: float = 3.0,
+        floor_ms: float = 1000,
+        ceiling_ms: float = 30000,
+        window: int = 200,
+        min_samples: int = 20,
+        backoff_base_s: float = 0.25,
+        backoff_cap_s: float = 8.0,
+        max_attempts: int = 3,
+        rng: Optional[random.Random] = None,
+    ):
+        self.defaults = dict(DEFAULT_TIMEOUTS_MS, **(defaults or {}))
+        self.factor = factor
+        self.floor_ms = floor_ms
+        self.ceiling_ms = ceiling_ms
+        self.window = window
+        self.min_samples = min_samples
+        self.backoff_base_s = backoff_base_s
+        self.backoff_cap_s = backoff_cap_s
+        self.max_attempts = max_attempts
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque] = {}
+
+    def observe(self, name: str, ms: float) -> None:
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=self.window)).append(ms)
+
+    def timeout(self, name: str) -> float:
+        """Timeout en ms para la espera ``name``."""
+        with self._lock:
+            samples = list(self._samples.get(name, ()))
+        if len(samples) < self.min_samples:
+            return self.defaults.get(name, self.ceiling_ms)
+        learned = percentile(samples, 99) * self.factor
+        return min(self.ceiling_ms, max(self.floor_ms, learned))
+
+    @contextmanager
+    def waiting(self, name: str) -> Iterator[float]:
+        """
+        Entrega el timeout a usar y registra cuánto tardó la espera.
+
+        Si la espera falla se registra el timeout completo, así una racha de
+        timeouts agranda los siguientes en lugar de achicarlos.
+        """
+        timeout = self.timeout(name)
+        start = time.perf_counter()
+        try:
+            yield timeout
+        except Exception:
+            self.observe(name, timeout)
+            raise
+        self.observe(name, (time.perf_counter() - start) * 1000)
+
+    @contextmanager
+    def deadline(self, name: str) -> Iterator[Deadline]:
+        """
+        Como ``waiting`` para una etapa hecha de varias esperas: cada una
+        recibe ``deadline.left()``, así la etapa entera no pasa del timeout
+        y la muestra registrada es la de la etapa completa.
+        """
+        with self.waiting(name) as timeout:
+            yield Deadline(timeout)
+
+    def backoff(self, attempt: int) -> float:
+        """Segundos a esperar antes del reintento ``attempt`` (0 = primero)."""
+        ceiling = min(self.backoff_cap_s, self.backoff_base_s * 2**attempt)
+        return self._rng.uniform(0, ceiling)
+
+    def retry(
+        self,
+        fn: Callable[[], T],
+        metrics: CrawlMetrics = NO_METRICS,
+        on_retry: Optional[Callable[[Exception], None]] = None,
+        **ctx,
+    ) -> T:
+        """
+        Ejecuta ``fn`` hasta ``max_attempts`` veces.
+
+        Entre intentos llama a ``on_retry`` (para dejar la página en un estado
+        conocido) y espera el backoff. Si se agotan los intentos relanza la
+        última excepción.
+        """
+        attempt = 0
+        while True:
+            try:
+                return fn()
+            except Exception as e:
+                attempt += 1
+                if attempt >= self.max_attempts:
+                    raise
+                metrics.count("retries", error=type(e).__name__, **ctx)
+                if on_retry is not None:
+                    on_retry(e)
+                with metrics.stage("backoff", **ctx):
+                    time.sleep(self.backoff(attempt - 1))
+
+    def snapshot(self) -> dict[str, float]:
+        """Timeouts vigentes por tipo de espera (para logs y resumen)."""
+        with self._lock:
+            names = set(self.defaults) | set(self._samples)
+        return {name: round(self.timeout(name)) for name in sorted(names)}
+
+
+# Política por defecto de las funciones del crawler cuando no se pasa una
+DEFAULT_WAITS = WaitPolicy()